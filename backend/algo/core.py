@@ -3,107 +3,220 @@
 import numpy as np
 from typing import List, Dict, Tuple
 from ..utils.Database import Idea
-from ..utils.vectorize import get_embedding, model
+from ..utils.vectorize import embed_texts
 from qdrant_client import QdrantClient
 from ..utils.db_log import setup_logger
 import os
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from backend.utils.env_checker import get_environment_config
 
 # Get logger for this module
 load_dotenv()
 logger = setup_logger(__name__)
 
-def _kmeans_plus_plus_init(X: np.ndarray, k: int) -> np.ndarray:
+ENV_CONFIG = get_environment_config()
+
+# Rows per block when computing point-to-centroid similarities, bounds peak memory
+_ASSIGN_BLOCK_SIZE = 65536
+
+def _normalize_rows(X: np.ndarray) -> np.ndarray:
+    """Return a float32 copy of X with every row scaled to unit length"""
+    X = np.array(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    X /= norms
+    return X
+
+def _assign(X: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Initialize cluster centers using k-means++ algorithm.
+    Assign every point to its most similar centroid.
     
     Args:
-        X: numpy array of shape (n_samples, n_features)
+        X: unit-length points of shape (n_samples, n_features)
+        centroids: unit-length centroids of shape (k, n_features)
+    
+    Returns:
+        labels: index of the closest centroid for each point
+        similarities: cosine similarity of each point to that centroid
+    """
+    n_samples = X.shape[0]
+    labels = np.empty(n_samples, dtype=np.int64)
+    similarities = np.empty(n_samples, dtype=np.float32)
+    for start in range(0, n_samples, _ASSIGN_BLOCK_SIZE):
+        block = X[start:start + _ASSIGN_BLOCK_SIZE] @ centroids.T
+        block_labels = np.argmax(block, axis=1)
+        labels[start:start + _ASSIGN_BLOCK_SIZE] = block_labels
+        similarities[start:start + _ASSIGN_BLOCK_SIZE] = block[np.arange(block.shape[0]), block_labels]
+    return labels, similarities
+
+def _update_centroids(X: np.ndarray, labels: np.ndarray, similarities: np.ndarray, k: int) -> np.ndarray:
+    """
+    Recompute centroids as the normalized sum of their members.
+    Empty clusters are re-seeded with the points that are furthest from their centroid.
+    """
+    sums = np.zeros((k, X.shape[1]), dtype=np.float32)
+    np.add.at(sums, labels, X)
+    counts = np.bincount(labels, minlength=k)
+    empty = np.flatnonzero(counts == 0)
+    if len(empty) > 0:
+        furthest = np.argsort(similarities)[:len(empty)]
+        sums[empty] = X[furthest]
+    return _normalize_rows(sums)
+
+def _kmeans_plus_plus_init(X: np.ndarray, k: int, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Initialize cluster centers using k-means++ algorithm with cosine distance.
+    
+    Args:
+        X: unit-length points of shape (n_samples, n_features)
         k: number of clusters
+        rng: random generator used for sampling
     
     Returns:
         centroids: numpy array of shape (k, n_features)
     """
+    rng = rng if rng is not None else np.random.default_rng()
     n_samples, n_features = X.shape
-    centroids = np.zeros((k, n_features))
+    centroids = np.empty((k, n_features), dtype=np.float32)
     
     # Choose first centroid randomly
-    first_centroid_idx = np.random.randint(n_samples)
-    centroids[0] = X[first_centroid_idx]
+    centroids[0] = X[rng.integers(n_samples)]
+    # Cosine distance from every point to its closest centroid so far
+    min_distances = np.maximum(1.0 - X @ centroids[0], 0.0)
     
     for i in range(1, k):
-        distances = np.min([np.linalg.norm(X - centroid, axis=1)**2 
-                          for centroid in centroids[:i]], axis=0)
-        
         # Choose next centroid with probability proportional to distance squared
-        probabilities = distances / distances.sum()
-        next_centroid_idx = np.random.choice(n_samples, p=probabilities)
+        weights = min_distances ** 2
+        total = weights.sum()
+        if total > 0:
+            next_centroid_idx = rng.choice(n_samples, p=weights / total)
+        else:
+            next_centroid_idx = rng.integers(n_samples)
         centroids[i] = X[next_centroid_idx]
+        np.minimum(min_distances, np.maximum(1.0 - X @ centroids[i], 0.0), out=min_distances)
     
     return centroids
 
-def cluster_ideas(ideas: List[Idea], client: QdrantClient = None) -> Tuple[Dict[int, List[Idea]], np.ndarray]:
+def _spherical_kmeans(X: np.ndarray, k: int, rng: np.random.Generator,
+                      max_iters: int = 100, tolerance: float = 1e-4) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Run one full-batch spherical k-means from a k-means++ initialization.
+    
+    Returns:
+        centroids, labels and inertia (sum of cosine distances to the assigned centroid)
+    """
+    centroids = _kmeans_plus_plus_init(X, k, rng)
+    for iteration in range(max_iters):
+        labels, similarities = _assign(X, centroids)
+        prev_centroids = centroids
+        centroids = _update_centroids(X, labels, similarities, k)
+        
+        # Check convergence: largest angular movement of any centroid
+        shift = float(np.max(1.0 - np.sum(centroids * prev_centroids, axis=1)))
+        if shift < tolerance:
+            logger.debug(f"K-means converged after {iteration + 1} iterations")
+            break
+    
+    labels, similarities = _assign(X, centroids)
+    return centroids, labels, float(np.sum(1.0 - similarities))
+
+def _minibatch_spherical_kmeans(X: np.ndarray, k: int, rng: np.random.Generator, batch_size: int,
+                                max_iters: int = 100, tolerance: float = 1e-4) -> Tuple[np.ndarray, np.ndarray, float]:
     """
-    Cluster ideas using k-means++ algorithm.
+    Run one mini-batch spherical k-means (per-center learning rates, as in Sculley 2010).
+    The initialization is drawn from a sample so it stays cheap for large N.
+    
+    Returns:
+        centroids, labels and inertia over the full data set
+    """
+    n_samples = X.shape[0]
+    init_size = min(n_samples, max(3 * batch_size, 10 * k))
+    init_sample = X[rng.choice(n_samples, size=init_size, replace=False)]
+    centroids = _kmeans_plus_plus_init(init_sample, k, rng)
+    counts = np.zeros(k, dtype=np.float32)
+    
+    for iteration in range(max_iters):
+        batch = X[rng.choice(n_samples, size=batch_size, replace=False)]
+        labels, _ = _assign(batch, centroids)
+        prev_centroids = centroids.copy()
+        
+        batch_counts = np.bincount(labels, minlength=k).astype(np.float32)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, batch)
+        
+        # Move each center towards the mean of its batch members with step 1 / total count
+        updated = batch_counts > 0
+        counts += batch_counts
+        rates = (batch_counts[updated] / counts[updated])[:, None]
+        means = sums[updated] / batch_counts[updated][:, None]
+        centroids[updated] = (1.0 - rates) * centroids[updated] + rates * means
+        centroids = _normalize_rows(centroids)
+        
+        shift = float(np.max(1.0 - np.sum(centroids * prev_centroids, axis=1)))
+        if shift < tolerance:
+            logger.debug(f"Mini-batch k-means converged after {iteration + 1} iterations")
+            break
+    
+    labels, similarities = _assign(X, centroids)
+    return centroids, labels, float(np.sum(1.0 - similarities))
+
+def cluster_ideas(ideas: List[Idea], client: QdrantClient = None, embeddings: np.ndarray = None) -> Tuple[Dict[int, List[Idea]], np.ndarray]:
+    """
+    Cluster ideas using spherical (cosine) k-means with k-means++ initialization.
+    
+    Several restarts run in parallel from seeds derived from K_MEANS_SEED, and the run
+    with the lowest inertia wins, so the result is reproducible. Above
+    K_MEANS_MINIBATCH_THRESHOLD ideas each restart uses mini-batch updates.
     
     Args:
         ideas: List of Idea objects to cluster
         client: QdrantClient instance (optional, not used for clustering but returned for convenience)
+        embeddings: Precomputed embedding matrix with one row per idea, e.g. from index_ideas.
+            The main points are embedded here if it is not given.
     
     Returns:
         clusters: Dictionary mapping cluster IDs to lists of Ideas
-        centroids: Final centroid positions
+        centroids: Final centroid positions (unit length, float32)
     """
     # Get k from environment variable
     k = int(os.getenv('K_MEANS_CLUSTERS'))
     logger.info(f"Clustering {len(ideas)} ideas into {k} clusters")
     
     # Get embeddings for all ideas
-    logger.info("Generating embeddings for clustering...")
-    embeddings = []
-    with tqdm(total=len(ideas), desc="Generating embeddings", unit="idea") as pbar:
-        for idea in ideas:
-            embedding = get_embedding(idea.main_point)
-            embeddings.append(embedding)
-            pbar.update(1)
-    
-    # Convert to numpy array
-    X = np.array(embeddings)
-    
-    # Initialize centroids using k-means++
-    logger.info("Initializing cluster centers with k-means++...")
-    centroids = _kmeans_plus_plus_init(X, k)
-    
-    # K-means iteration
-    max_iters = 100
-    tolerance = 1e-4
-    prev_centroids = None
-    
-    logger.info("Starting k-means iterations...")
-    for iteration in tqdm(range(max_iters), desc="K-means iterations"):
-        # Assign points to nearest centroid
-        distances = np.array([np.linalg.norm(X - centroid, axis=1) 
-                            for centroid in centroids])
-        labels = np.argmin(distances, axis=0)
-        
-        # Update centroids
-        prev_centroids = centroids.copy()
-        for i in range(k):
-            if np.sum(labels == i) > 0:  # Only update if cluster is not empty
-                centroids[i] = np.mean(X[labels == i], axis=0)
-        
-        # Check convergence
-        if prev_centroids is not None:
-            diff = np.linalg.norm(centroids - prev_centroids)
-            if diff < tolerance:
-                logger.info(f"K-means converged after {iteration + 1} iterations")
-                break
+    if embeddings is None:
+        logger.info("Generating embeddings for clustering...")
+        embeddings = embed_texts([idea.main_point for idea in ideas])
+    
+    X = _normalize_rows(embeddings)
+    if len(ideas) == 0:
+        return {}, np.zeros((0, X.shape[1]), dtype=np.float32)
+    if k > len(ideas):
+        logger.warning(f"Only {len(ideas)} ideas, reducing number of clusters from {k}")
+        k = len(ideas)
+    
+    n_init = ENV_CONFIG['k_means_n_init']
+    seeds = np.random.SeedSequence(ENV_CONFIG['k_means_seed']).spawn(n_init)
+    minibatch = len(ideas) > ENV_CONFIG['k_means_minibatch_threshold']
+    
+    def run(seed):
+        rng = np.random.default_rng(seed)
+        if minibatch:
+            batch_size = min(len(ideas), ENV_CONFIG['k_means_batch_size'])
+            return _minibatch_spherical_kmeans(X, k, rng, batch_size)
+        return _spherical_kmeans(X, k, rng)
+    
+    logger.info(f"Starting {n_init} {'mini-batch ' if minibatch else ''}k-means runs...")
+    # The matrix products release the GIL, so restarts run in parallel threads
+    with ThreadPoolExecutor(max_workers=n_init) as executor:
+        runs = list(executor.map(run, seeds))
+    centroids, labels, inertia = min(runs, key=lambda result: result[2])
+    logger.info(f"Best k-means run has inertia {inertia:.4f}")
     
     # Create clusters dictionary
     clusters = {i: [] for i in range(k)}
     for idea, label in zip(ideas, labels):
-        clusters[label].append(idea)
+        clusters[int(label)].append(idea)
     
     # Log cluster sizes
     for cluster_id, cluster_ideas in clusters.items():
@@ -1,17 +1,30 @@
 #Function declarations
 import os
+import asyncio
+import json
+import threading
+import time
+from contextlib import nullcontext
+import numpy as np
 from backend.utils.preprocessing import Preprocessor
 from backend.utils.Database import Chunk
-from backend.utils.vectorize import create_vector_db, find_similar_idea_from_embedding
+from backend.utils.idea_cache import IdeaCache
+from backend.utils.response_cache import ResponseCache
+from backend.utils.vectorize import index_ideas, find_similar_ideas_batch, get_model, point_ids
+from backend.utils.corpus_cache import Corpus, CorpusCache, collection_name, corpus_fingerprint
 from backend.utils.LLMRequest import LLMRequest
 from fastapi import FastAPI, UploadFile, File, Request, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, Response
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from backend.utils.env_checker import get_environment_config
 from backend.utils.db_log import setup_logger
 from backend.algo.core import cluster_ideas, get_cluster_summaries
 from backend.utils.env_checker import check_environment
-from backend.utils.env_checker import check_environment
+from backend.utils.jobs import JobManager
+from backend.utils.pipeline import run_streaming
+from backend.utils.retrieval import retrieve_context
+from backend.utils import metrics
 from pydantic import BaseModel
 
 # Initialize environment once at startup
@@ -31,9 +44,58 @@ app.add_middleware(
 
 UPLOAD_DIR = "backend/files"
 
-ENV_CONFIG = get_environment_config()
 logger = setup_logger(__name__)
 
+# Background runs of generate() submitted through /api/jobs
+job_manager = JobManager()
+
+def warmup():
+    """
+    Load the resources the first request would otherwise wait for: hardware detection,
+    the embedding model and the LLM client. Each is loaded once per process, so calling
+    this again is cheap. A resource that fails to load is logged and left for the first request.
+
+    Returns:
+        Seconds spent on each resource, or None for the ones that failed
+    """
+    steps = [
+        ("preprocessor", Preprocessor),
+        ("embedding_model", lambda: get_model().encode(["warm-up"])),
+        ("llm_client", LLMRequest.initialize_client),
+    ]
+    timings = {}
+    for name, load in steps:
+        start = time.perf_counter()
+        try:
+            load()
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            timings[name] = None
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+
+    logger.info(f"Warm-up finished: {timings}")
+    return timings
+
+def _warmup_in_background():
+    try:
+        warmup()
+    except Exception:
+        logger.exception("Warm-up failed; resources will load on the first request")
+
+@app.on_event("startup")
+async def warmup_on_startup():
+    # Warm up in the background so the server accepts requests right away;
+    # a request that arrives first waits on the same model lock
+    if ENV_CONFIG['warmup_on_startup']:
+        threading.Thread(target=_warmup_in_background, name="warmup", daemon=True).start()
+
+@app.post("/api/warmup")
+async def warmup_endpoint():
+    seconds = await run_in_threadpool(warmup)
+    status = "warm" if all(value is not None for value in seconds.values()) else "partial"
+    return {"status": status, "seconds": seconds}
+
 @app.get("/api/uploaded-files")
 async def list_uploaded_files():
     files = []
@@ -53,9 +115,83 @@ async def upload_pdf(file: UploadFile = File(...)):
 def edit_response():
     pass 
 
-def generate(source_dir: str, prompt: str, debug: bool = os.getenv("DEBUG", "true").lower() == "true"):
+def generate(source_dir: str, prompt: str, debug: bool = os.getenv("DEBUG", "true").lower() == "true", progress=None, on_token=None, request_id=None):
+    # Every stage below is timed as a span of this request; see /metrics
+    with metrics.trace_request(request_id) as request_id:
+        logger.info(f"Request {request_id}: generating from {source_dir}")
+        with metrics.span("generate"):
+            return _generate(source_dir, prompt, debug, progress, on_token)
+
+def _staged_ideas(preprocessor: Preprocessor, sources, chunk_obj: Chunk, debug: bool, report,
+                  collection_name: str = "ideas"):
+    """Extract, chunk, extract ideas from and index the PDFs one stage after the other"""
+    report("extraction", total=len(sources))
+    with metrics.span("process_pdfs", pdfs=len(sources)) as span:
+        pdf_texts = preprocessor.process_pdfs(sources)
+        span.tag(pages=len(pdf_texts))
+    report("extraction", done=len(sources))
+    report("chunking", total=len(pdf_texts))
+    with metrics.span("text_to_chunks", pages=len(pdf_texts)) as span:
+        chunks = preprocessor.text_to_chunks(pdf_texts)
+        span.tag(chunks=len(chunks))
+    report("chunking", done=len(pdf_texts))
+
+    # extract ideas from all chunks in parallel
+    report("idea_extraction", done=0, total=len(chunks))
+    with metrics.span("chunk_to_idea", chunks=len(chunks)) as span:
+        ideas = chunk_obj.process_chunks_concurrently(
+            chunks, debug=debug, on_done=lambda done: report("idea_extraction", done=done)
+        )
+        span.tag(ideas=len(ideas))
+    
+    # create a vector database; each main point is embedded at most once
+    report("indexing", total=len(ideas))
+    with metrics.span("create_vector_db", ideas=len(ideas)):
+        store, embeddings = index_ideas(ideas, collection_name=collection_name)
+    return ideas, store, embeddings
+
+def _cluster(ideas, store, embeddings, report):
+    # Run k-means clustering on all ideas
+    # nodes for the bubble map
+    report("clustering", total=len(ideas))
+    with metrics.span("cluster_ideas", ideas=len(ideas)) as span:
+        clusters, centroids = cluster_ideas(ideas, store, embeddings=embeddings)
+        span.tag(clusters=len(centroids))
+    return clusters, centroids
+
+def _build_corpus(preprocessor: Preprocessor, sources, chunk_obj: Chunk, debug: bool, report,
+                  fingerprint: str, collection: str) -> Corpus:
+    """Extract, index and cluster the ideas of the PDFs"""
+    if ENV_CONFIG['pipeline_mode'] == 'streaming':
+        ideas, store, embeddings = run_streaming(preprocessor, sources, chunk_obj, debug=debug, progress=report,
+                                                 collection_name=collection)
+    else:
+        ideas, store, embeddings = _staged_ideas(preprocessor, sources, chunk_obj, debug, report, collection)
+    logger.info(f"Idea cache: {IdeaCache.stats()}")
+    clusters, centroids = _cluster(ideas, store, embeddings, report)
+    return Corpus(fingerprint, store, ideas, chunk_obj.quotation, clusters, centroids)
+
+def _reuse_corpus(corpus: Corpus, chunk_obj: Chunk, report) -> bool:
+    """
+    Prepare an indexed corpus for a new prompt: make its quotations available to the
+    response, and cluster it again if the clustering settings changed.
+    Returns True if the clusters were recomputed.
+    """
+    chunk_obj.quotation.update(corpus.quotations)
+    if corpus.clusters is not None:
+        return False
+    ids = point_ids(corpus.ideas)
+    vectors = corpus.store.vectors(list(dict.fromkeys(ids)))
+    embeddings = np.stack([vectors[point_id] for point_id in ids]) if ids else None
+    corpus.clusters, corpus.centroids = _cluster(corpus.ideas, corpus.store, embeddings, report)
+    return True
+
+def _generate(source_dir: str, prompt: str, debug: bool, progress=None, on_token=None):
     # Use the global environment config instead of checking again
     debug = ENV_CONFIG['debug_mode'] if debug is None else debug
+    # progress(stage, done=None, total=None) is called as the pipeline advances
+    # on_token(text), if given, receives the final response as it is streamed
+    report = progress or (lambda stage, done=None, total=None: None)
     # process the pdfs
     preprocessor = Preprocessor()
     # create list of pdfs from the source_dir
@@ -69,28 +205,39 @@ def generate(source_dir: str, prompt: str, debug: bool = os.getenv("DEBUG", "tru
 
     print("Processing PDF files:", sources)
     print()
-    pdf_texts = preprocessor.process_pdfs(sources)
-    chunks = preprocessor.text_to_chunks(pdf_texts)
-
     # create a chunk object
     chunk_obj = Chunk(sources, "Quentin Kniep")
-    ideas = []
-    for chunk_dict in chunks:
-        # Extend the ideas list with the list returned by chunk_to_idea
-        ideas.extend(chunk_obj.chunk_to_idea(chunk_dict, debug=debug))
-    
-    # create a vector database
-    client = create_vector_db(ideas)
-    
-    # Run k-means clustering on all ideas
-    # nodes for the bubble map
-    clusters, centroids = cluster_ideas(ideas, client)
-    
-    # Find similar ideas for each cluster centroid
-    similar_ideas = []
-    for centroid in centroids:
-        cluster_similar_ideas = find_similar_idea_from_embedding(client, centroid.tolist(), limit=3)
-        similar_ideas.extend(cluster_similar_ideas)
+
+    # A corpus that is already indexed goes straight to retrieval
+    corpus_cache, fingerprint, collection = None, None, "ideas"
+    if ENV_CONFIG['corpus_cache_enabled']:
+        corpus_cache = CorpusCache()
+        fingerprint = corpus_fingerprint(sources, preprocessor.chunker)
+        collection = collection_name(fingerprint)
+    with corpus_cache.lease(fingerprint) if corpus_cache else nullcontext():
+        with metrics.span("load_corpus") as span:
+            corpus = corpus_cache.load(fingerprint) if corpus_cache else None
+            span.tag(hit=corpus is not None)
+        if corpus is None:
+            corpus = _build_corpus(preprocessor, sources, chunk_obj, debug, report, fingerprint, collection)
+            if corpus_cache:
+                corpus_cache.save(corpus)
+        elif _reuse_corpus(corpus, chunk_obj, report):
+            corpus_cache.save(corpus)
+        store, ideas, clusters, centroids = corpus.store, corpus.ideas, corpus.clusters, corpus.centroids
+
+        if ENV_CONFIG['retrieval_mode'] == 'hybrid':
+            # The ideas most relevant to the prompt, spread over the clusters
+            with metrics.span("retrieve_context", ideas=len(ideas)) as span:
+                similar_ideas = retrieve_context(store, prompt, clusters)
+                span.tag(selected=len(similar_ideas))
+        else:
+            # Find the ideas nearest to each cluster centroid among that cluster's members,
+            # so that a dense cluster cannot take the places of the others
+            with metrics.span("find_similar_ideas", clusters=len(centroids)):
+                members = [point_ids(clusters[cluster_id]) for cluster_id in clusters]
+                nearest = find_similar_ideas_batch(store, centroids, limit=3, candidates=members)
+                similar_ideas = [idea for cluster_similar_ideas in nearest for idea in cluster_similar_ideas]
 
     # Print similar ideas and their quotations
     print("\nSimilar Ideas and Quotations:")
@@ -126,7 +273,6 @@ def generate(source_dir: str, prompt: str, debug: bool = os.getenv("DEBUG", "tru
     }
 
     # Save bubble map to file for frontend access
-    import json
     bubble_map_path = os.path.join(UPLOAD_DIR, "bubble-map.json")
     with open(bubble_map_path, "w") as f:
         json.dump(bubble_map, f)
@@ -161,7 +307,17 @@ Write your response as a well-structured paragraph that:
 Your response should be approximately 10 pages long."""
 
     # get response from Llama
-    response = LLMRequest.inference(llama_prompt, debug=debug)
+    report("synthesis")
+    with metrics.span("inference", prompt_chars=len(llama_prompt), streamed=on_token is not None) as span:
+        if on_token is None:
+            response = LLMRequest.inference(llama_prompt, debug=debug)
+        else:
+            parts = []
+            for text in LLMRequest.stream_inference(llama_prompt, debug=debug):
+                parts.append(text)
+                on_token(text)
+            response = "".join(parts)
+        span.tag(response_chars=len(response))
     logger.info(f"Response: {response}")
     return {"response": response, "bubble_map": bubble_map}
 
@@ -189,9 +345,67 @@ async def generate_endpoint(request: Request):
     data = await request.json()
     prompt = data.get("prompt", "")
     source_dir = data.get("source_dir", "backend/files")
-    response = generate(source_dir=source_dir, prompt=prompt)
+    # Run the blocking pipeline off the event loop so other endpoints stay responsive
+    response = await run_in_threadpool(generate, source_dir=source_dir, prompt=prompt)
     return {"response": response}
 
+@app.post("/api/jobs", status_code=202)
+async def create_job(request: Request):
+    data = await request.json()
+    job = job_manager.submit(
+        generate,
+        source_dir=data.get("source_dir", "backend/files"),
+        prompt=data.get("prompt", "")
+    )
+    return {"job_id": job.job_id, "status": job.status}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return job.to_dict()
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+
+    async def event_stream():
+        seen = 0
+        while True:
+            finished = job.done
+            events = job.events_since(seen)
+            seen += len(events)
+            for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                break
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    if job.status == "failed":
+        return JSONResponse(status_code=500, content={"job_id": job_id, "status": job.status, "error": job.error})
+    if not job.done:
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": job.status})
+    return {"job_id": job_id, "status": job.status, "response": job.result}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(content=metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache-stats")
+async def cache_stats():
+    return JSONResponse(content={"ideas": IdeaCache.stats(), "llm_responses": ResponseCache.stats()})
+
 class OutlineContent(BaseModel):
     content: str
 
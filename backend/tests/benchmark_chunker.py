@@ -0,0 +1,115 @@
+"""
+Chunker microbenchmark.
+
+Compares StreamingChunker with the previous per-page implementation, which
+recompiled the split pattern for every page and built chunks by string
+concatenation. Checks that both produce the same chunks, then prints the
+timings for pages of increasing size.
+
+Usage:
+    python backend/tests/benchmark_chunker.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# Get the absolute path to the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, project_root)
+
+from backend.utils.chunker import StreamingChunker, SECTION_BREAKS, SEMANTIC_MARKERS
+
+WORDS = (
+    "policy trade security alliance economy technology competition cooperation strategy "
+    "influence growth market power region state government institution diplomacy conflict"
+).split()
+OPENERS = ["However, ", "Moreover, ", "For example, ", "Therefore, ", "In contrast, ", ""]
+
+
+def make_page(num_chars: int, rng: random.Random) -> str:
+    """Random prose with sentence ends, markers, questions and line breaks"""
+    parts, length = [], 0
+    while length < num_chars:
+        sentence = rng.choice(OPENERS) + " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30)))
+        sentence = sentence[0].upper() + sentence[1:] + rng.choice([". ", ". ", "? ", ".\n", ".\n\n"])
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)
+
+
+def legacy_chunks(text: str, min_chunk_size: int, max_chunk_size: int, source: str = 'unknown', page_num: int = 0):
+    """The chunking loop of Preprocessor._process_single_text before StreamingChunker"""
+    text = str(text).strip()
+    if not text:
+        return []
+    all_patterns = '|'.join(SECTION_BREAKS + SEMANTIC_MARKERS)
+    chunks = []
+    text = re.sub(r'\s+', ' ', text).strip()
+    potential_chunks = re.split(f'({all_patterns})', text)
+    current_chunk = ""
+    for i in range(0, len(potential_chunks), 2):
+        chunk = potential_chunks[i]
+        if i + 1 < len(potential_chunks):
+            chunk += potential_chunks[i + 1]
+        if len(current_chunk) + len(chunk) > max_chunk_size and current_chunk:
+            if len(current_chunk) >= min_chunk_size:
+                chunks.append({'text': current_chunk.strip(), 'type': 'section', 'size': len(current_chunk),
+                               'source': source, 'page': page_num})
+            current_chunk = chunk
+        else:
+            current_chunk += chunk
+    if current_chunk and len(current_chunk) >= min_chunk_size:
+        chunks.append({'text': current_chunk.strip(), 'type': 'section', 'size': len(current_chunk),
+                       'source': source, 'page': page_num})
+    return chunks
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StreamingChunker against the previous chunking loop")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Page sizes in characters")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per size")
+    parser.add_argument("--min-chunk", type=int, default=int(os.getenv("MIN_CHUNK_SIZE", 500)))
+    parser.add_argument("--max-chunk", type=int, default=int(os.getenv("MAX_CHUNK_SIZE", 2000)))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best one is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chunker = StreamingChunker(args.min_chunk, args.max_chunk)
+    print(f"min_chunk_size={args.min_chunk} max_chunk_size={args.max_chunk}, best of {args.repeat}")
+    print(f"{'page chars':>12} {'pages':>6} {'chunks':>8} {'legacy s':>10} {'streaming s':>12} {'speedup':>8}")
+    for size in args.sizes:
+        pages = [make_page(size, rng) for _ in range(args.pages)]
+
+        expected = [legacy_chunks(page, args.min_chunk, args.max_chunk, page_num=i) for i, page in enumerate(pages)]
+        actual = [chunker.chunk_text(page, page=i) for i, page in enumerate(pages)]
+        if actual != expected:
+            print(f"Output differs from the previous implementation for {size}-character pages")
+            sys.exit(1)
+        streamed = list(chunker.iter_chunks({'text': page, 'source': 'unknown', 'page': i}
+                                            for i, page in enumerate(pages)))
+        if streamed != [chunk for page_chunks in expected for chunk in page_chunks]:
+            print(f"iter_chunks output differs for {size}-character pages")
+            sys.exit(1)
+
+        legacy = best_of(lambda: [legacy_chunks(page, args.min_chunk, args.max_chunk) for page in pages], args.repeat)
+        streaming = best_of(lambda: [chunker.chunk_text(page) for page in pages], args.repeat)
+        num_chunks = sum(len(page_chunks) for page_chunks in expected)
+        print(f"{size:>12} {args.pages:>6} {num_chunks:>8} {legacy:>10.4f} {streaming:>12.4f} {legacy / streaming:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+PDF extraction benchmark.
+
+Compares the previous extraction, one PdfReader per file on a thread pool, with
+page-range extraction on the shared process pool for several worker counts.
+Checks that every run returns the same pages, then prints the timings. The
+extraction cache is not used, so every run extracts every page.
+
+Usage:
+    python backend/tests/benchmark_extraction.py --workers 1 2 4 8
+    python backend/tests/benchmark_extraction.py --pdfs "path/to/*.pdf" --repeat 3
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Get the absolute path to the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, project_root)
+
+from PyPDF2 import PdfReader
+
+from backend.utils import pdf_extraction, worker_pool
+from backend.utils.chunker import StreamingChunker
+
+
+def threaded_extraction(sources, num_threads: int):
+    """process_pdfs before page-range extraction: whole files on a thread pool"""
+    def extract(source):
+        reader = PdfReader(source)
+        title = pdf_extraction.pdf_title(reader, source)
+        return [{'text': page.extract_text() or '', 'title': title} for page in reader.pages]
+
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        documents = list(pool.map(extract, sources))
+    return [(i, j, page) for i, pages in enumerate(documents) for j, page in enumerate(pages)]
+
+
+def process_extraction(sources, num_workers: int, chunker: StreamingChunker):
+    return list(pdf_extraction.iter_pages(
+        sources, None, num_workers, pool_factory=lambda: worker_pool.get_pool(chunker, num_workers)
+    ))
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process-pool PDF extraction against threads")
+    parser.add_argument("--pdfs", default=os.path.join(project_root, "backend", "tests", "data", "*.pdf"),
+                        help="Glob of the PDFs to extract")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per measurement; the best one is reported")
+    args = parser.parse_args()
+
+    sources = sorted(glob.glob(args.pdfs))
+    if not sources:
+        print(f"No PDFs match {args.pdfs}")
+        sys.exit(1)
+
+    chunker = StreamingChunker(500, 2000)
+    expected = threaded_extraction(sources, len(sources))
+    print(f"{len(sources)} PDFs, {len(expected)} pages, {os.cpu_count()} CPUs, best of {args.repeat}")
+    threaded = best_of(lambda: threaded_extraction(sources, len(sources)), args.repeat)
+    print(f"{'mode':>10} {'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+    print(f"{'threads':>10} {len(sources):>8} {threaded:>9.3f} {len(expected) / threaded:>9.1f} {1.0:>7.2f}x")
+    for num_workers in sorted(set(args.workers)):
+        # Start the pool outside the measurement; it lives for the whole process in the API
+        if num_workers > 1:
+            worker_pool.get_pool(chunker, num_workers)
+        if process_extraction(sources, num_workers, chunker) != expected:
+            print(f"Output with {num_workers} workers differs from the threaded extraction")
+            sys.exit(1)
+        seconds = best_of(lambda: process_extraction(sources, num_workers, chunker), args.repeat)
+        print(f"{'processes':>10} {num_workers:>8} {seconds:>9.3f} {len(expected) / seconds:>9.1f} "
+              f"{threaded / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
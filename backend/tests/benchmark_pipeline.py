@@ -0,0 +1,288 @@
+"""
+End-to-end pipeline benchmark.
+
+Generates a synthetic PDF corpus, replaces the LLM provider with a deterministic
+local stand-in and runs generate() on it, then prints per-stage wall time,
+throughput and peak RSS as JSON. Runs offline and without a GPU, as long as
+the sentence transformer model is in the local cache. The pipeline logs to
+stdout, so use --output to get the report in a file of its own.
+
+Usage:
+    python backend/tests/benchmark_pipeline.py --pdfs 20 --pages 10 --llm-latency 0.05
+    python backend/tests/benchmark_pipeline.py --pdfs 20 --pages 10 --llm-latency 0.05 --pipeline-mode staged
+"""
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+# Get the absolute path to the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, project_root)
+
+WORDS = (
+    "policy trade security alliance economy technology competition cooperation strategy "
+    "influence growth market power region state government institution diplomacy conflict "
+    "interest stability order rivalry dialogue investment export import sanction tariff "
+    "agreement network supply chain innovation research energy climate finance currency"
+).split()
+CONNECTIVES = ["However,", "Moreover,", "Therefore,", "In contrast,", "For example,", "This", "These", "Their"]
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    if rng.random() < 0.3:
+        words.insert(0, rng.choice(CONNECTIVES).lower())
+    return " ".join(words).capitalize() + "."
+
+
+def _page_lines(rng: random.Random, words_per_page: int, width: int = 90):
+    text = []
+    while sum(len(s.split()) for s in text) < words_per_page:
+        text.append(_sentence(rng))
+    lines, line = [], ""
+    for word in " ".join(text).split():
+        if len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    lines.append(line)
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_synthetic_pdf(path: str, num_pages: int, words_per_page: int, rng: random.Random) -> None:
+    """Write a minimal PDF with Helvetica text pages that PyPDF2 can extract"""
+    page_ids = [4 + 2 * i for i in range(num_pages)]
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {num_pages} >>",
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id in page_ids:
+        lines = _page_lines(rng, words_per_page)
+        body = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        objects[page_id] = (
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        )
+        objects[page_id + 1] = f"<< /Length {len(body)} >>\nstream\n{body}\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n{objects[obj_id]}\nendobj\n".encode("latin-1")
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode("latin-1")
+    for obj_id in range(1, size):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+
+def generate_corpus(directory: str, num_pdfs: int, pages_per_pdf: int, words_per_page: int, seed: int = 0) -> int:
+    """Write num_pdfs synthetic PDFs into directory and return the total number of pages"""
+    rng = random.Random(seed)
+    for i in range(num_pdfs):
+        write_synthetic_pdf(os.path.join(directory, f"synthetic_{i:04d}.pdf"), pages_per_pdf, words_per_page, rng)
+    return num_pdfs * pages_per_pdf
+
+
+class FakeLLM:
+    """
+    Deterministic stand-in for the LLM provider.
+    Idea-extraction prompts get points built from the chunk's own sentences, tagged
+    with their section for packed prompts; any other prompt gets a fixed-length text. Every call sleeps for `latency` seconds.
+    """
+
+    def __init__(self, latency: float = 0.0, response_words: int = 500):
+        self.latency = latency
+        self.response_words = response_words
+        self.calls = 0
+        self._lock = Lock()
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def complete(self, prompt, debug=False):
+        self._count()
+        time.sleep(self.latency)
+        sections = re.findall(r"\[Section (\d+)\]\n(.*?)\n(?=\n\[Section|\n\nPlease format)", prompt, re.S)
+        if sections:
+            return [dict(point, section=int(index)) for index, text in sections for point in self._points(text)]
+        match = re.search(r"Text to summarize:\n(.*?)\n\nPlease format", prompt, re.S)
+        if match is None:
+            return self._text(prompt)
+        return self._points(match.group(1))
+
+    @staticmethod
+    def _points(text):
+        sentences = [s.strip() for s in re.split(r"(?<=\.)\s+", text) if len(s.split()) >= 5]
+        return [
+            {"point": "The text argues that " + " ".join(s.split()[:10]).lower(), "quotation": s}
+            for s in sentences[:3]
+        ]
+
+    def stream(self, prompt):
+        self._count()
+        time.sleep(self.latency)
+        return iter(word + " " for word in self._text(prompt).split())
+
+    def _text(self, prompt):
+        rng = random.Random(len(prompt))
+        return " ".join(rng.choice(WORDS) for _ in range(self.response_words))
+
+
+@contextmanager
+def fake_llm(llm: FakeLLM):
+    """Route LLMRequest through the stand-in for the duration of the block"""
+    from backend.utils.LLMRequest import LLMRequest
+    saved = LLMRequest.__dict__["_complete"], LLMRequest.__dict__["_open_stream"], LLMRequest.client
+    LLMRequest._complete = classmethod(lambda cls, prompt, debug=False: llm.complete(prompt, debug))
+    LLMRequest._open_stream = classmethod(lambda cls, prompt: llm.stream(prompt))
+    LLMRequest.client = object()
+    try:
+        yield llm
+    finally:
+        LLMRequest._complete, LLMRequest._open_stream, LLMRequest.client = saved
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process and its (reaped) worker processes"""
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(self_kb, children_kb) / 1024, 1)
+
+
+def run_benchmark(args) -> dict:
+    from backend import api
+
+    work_dir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    corpus_dir = os.path.join(work_dir, "corpus")
+    os.makedirs(corpus_dir)
+    total_pages = generate_corpus(corpus_dir, args.pdfs, args.pages, args.words_per_page, args.seed)
+
+    # Keep the bubble map and the local Qdrant data out of the repository
+    api.UPLOAD_DIR = work_dir
+    os.chdir(work_dir)
+
+    runs = []
+    llm = FakeLLM(latency=args.llm_latency, response_words=args.response_words)
+    with fake_llm(llm):
+        for run in range(args.runs):
+            stage_starts = []
+            counts = {}
+
+            def progress(stage, done=None, total=None):
+                if not stage_starts or stage_starts[-1][0] != stage:
+                    stage_starts.append((stage, time.perf_counter()))
+                if total is not None:
+                    counts[stage] = total
+
+            if not args.cache:
+                # Every run starts from a cold extraction cache
+                shutil.rmtree(os.environ["EXTRACTION_CACHE_DIR"], ignore_errors=True)
+                os.makedirs(os.environ["EXTRACTION_CACHE_DIR"])
+
+            calls_before = llm.calls
+            start = time.perf_counter()
+            result = api.generate(corpus_dir, "Benchmark prompt", debug=False, progress=progress,
+                                  on_token=(lambda text: None) if args.stream else None)
+            end = time.perf_counter()
+
+            stage_seconds = {}
+            for i, (stage, started) in enumerate(stage_starts):
+                finished = stage_starts[i + 1][1] if i + 1 < len(stage_starts) else end
+                stage_seconds[stage] = round(finished - started, 4)
+
+            chunks = counts.get("idea_extraction", 0)
+            ideas = counts.get("indexing", 0)
+            runs.append({
+                "run": run,
+                "total_seconds": round(end - start, 4),
+                "stage_seconds": stage_seconds,
+                "pages": total_pages,
+                "chunks": chunks,
+                "ideas": ideas,
+                "llm_calls": llm.calls - calls_before,
+                "pages_per_second": round(total_pages / max(stage_seconds.get("extraction", 0), 1e-9), 2),
+                "chunks_per_second": round(chunks / max(stage_seconds.get("chunking", 0), 1e-9), 2),
+                "ideas_per_second": round(ideas / max(stage_seconds.get("idea_extraction", 0), 1e-9), 2),
+                "bubble_map_nodes": len(result["bubble_map"]["nodes"]),
+            })
+
+    return {
+        "config": {
+            "pdfs": args.pdfs,
+            "pages_per_pdf": args.pages,
+            "words_per_page": args.words_per_page,
+            "llm_latency": args.llm_latency,
+            "stream": args.stream,
+            "pipeline_mode": args.pipeline_mode,
+            "idea_extraction_mode": args.idea_extraction_mode,
+            "seed": args.seed,
+        },
+        "runs": runs,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate() on a synthetic corpus with a fake LLM")
+    parser.add_argument("--pdfs", type=int, default=10, help="Number of synthetic PDFs")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per PDF")
+    parser.add_argument("--words-per-page", type=int, default=400, help="Words per page")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake LLM sleeps per call")
+    parser.add_argument("--response-words", type=int, default=500, help="Words in the fake synthesis response")
+    parser.add_argument("--runs", type=int, default=1, help="Pipeline runs; later runs show warm-cache behaviour")
+    parser.add_argument("--stream", action="store_true", help="Stream the synthesis response")
+    parser.add_argument("--cache", action="store_true", help="Keep the extraction, idea and corpus caches enabled")
+    parser.add_argument("--idea-extraction-mode", choices=["single", "packed"], default="single",
+                        help="One LLM request per chunk, or several chunks per request")
+    parser.add_argument("--pipeline-mode", choices=["streaming", "staged"], default="streaming",
+                        help="Overlap the ingestion stages or run them one after the other")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    # Settings must be in place before the backend modules read their configuration
+    cache_dir = tempfile.mkdtemp(prefix="pipeline_bench_cache_")
+    os.environ.setdefault("LLM", "llama")
+    os.environ["LLM_RATE_LIMIT_RPS"] = "100000"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["IDEA_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ["CORPUS_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ["IDEA_CACHE_PATH"] = os.path.join(cache_dir, "ideas.sqlite3")
+    os.environ["EXTRACTION_CACHE_DIR"] = os.path.join(cache_dir, "extraction")
+    os.environ["PIPELINE_MODE"] = args.pipeline_mode
+    os.environ["IDEA_EXTRACTION_MODE"] = args.idea_extraction_mode
+    if not args.cache:
+        os.environ["VECTOR_INDEX_MODE"] = "rebuild"
+
+    report = run_benchmark(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Qdrant concurrency benchmark.
+
+Simulates overlapping /api/generate requests against a local Qdrant store in a
+temporary directory, standing in for ./qdrant_data. Each request creates its
+own collection, upserts its ideas in batches and runs a number of top-k
+searches, the way indexing and retrieval do. The store is seeded with other
+collections first, as ./qdrant_data accumulates them. Three ways of getting a
+client are compared:
+
+    per-request  a new client per request, as get_qdrant_client() used to do;
+                 overlapping requests fail on the store's lock
+    serialized   a new client per request, one request at a time
+    shared       the process-wide client of qdrant_pool, shared by all requests
+
+Usage:
+    python backend/tests/benchmark_qdrant_concurrency.py --threads 1 2 4 8
+    python backend/tests/benchmark_qdrant_concurrency.py --requests 16 --points 2000 --seed-points 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+
+# Get the absolute path to the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, project_root)
+
+from qdrant_client import QdrantClient
+
+from backend.utils import qdrant_pool
+from backend.utils.vector_store import QdrantVectorStore
+
+
+def random_unit_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run_request(client, name: str, vectors: np.ndarray, queries: np.ndarray, limit: int) -> None:
+    """Index one request's ideas and search them"""
+    store = QdrantVectorStore(client, name)
+    store.recreate(vectors.shape[1])
+    ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+    payloads = [{"main_point": f"idea {i}", "chunk_id": i, "quotation_id": i} for i in range(len(ids))]
+    for i in range(0, len(ids), 100):
+        store.upsert(ids[i:i + 100], vectors[i:i + 100], payloads[i:i + 100])
+    for query in queries:
+        store.search(query, limit)
+
+
+def run_mode(mode: str, path: str, num_threads: int, args, rng: np.random.Generator):
+    """Run args.requests requests on num_threads threads; returns (seconds, failed requests)"""
+    work = [(f"request_{mode}_{num_threads}_{i}",
+             random_unit_vectors(args.points, args.dim, rng),
+             random_unit_vectors(args.queries, args.dim, rng))
+            for i in range(args.requests)]
+    serial = threading.Lock()
+    shared = qdrant_pool.open_client(path=path) if mode == "shared" else None
+
+    def request(item):
+        if mode == "shared":
+            run_request(shared, *item, args.limit)
+            return
+        with serial if mode == "serialized" else nullcontext():
+            client = QdrantClient(path=path)
+            try:
+                run_request(client, *item, args.limit)
+            finally:
+                client.close()
+
+    failed = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        for future in [pool.submit(request, item) for item in work]:
+            try:
+                future.result()
+            except RuntimeError:
+                failed += 1
+    seconds = time.perf_counter() - start
+
+    # Drop this run's collections so that every run starts from the same store
+    client = shared or QdrantClient(path=path)
+    for name, _, _ in work:
+        if client.collection_exists(name):
+            client.delete_collection(name)
+    client.close()
+    return seconds, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared and per-request Qdrant clients under parallel requests")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="Requests in flight at once")
+    parser.add_argument("--requests", type=int, default=8, help="Requests per measurement")
+    parser.add_argument("--points", type=int, default=1000, help="Ideas indexed per request")
+    parser.add_argument("--queries", type=int, default=20, help="Searches per request")
+    parser.add_argument("--seed-points", type=int, default=10000,
+                        help="Points stored in other collections before the run")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as path:
+        client = QdrantClient(path=path)
+        for i in range(0, args.seed_points, 5000):
+            vectors = random_unit_vectors(min(5000, args.seed_points - i), args.dim, rng)
+            store = QdrantVectorStore(client, f"seed_{i}")
+            store.recreate(args.dim)
+            store.upsert([str(uuid.uuid4()) for _ in vectors], vectors, [{} for _ in vectors])
+        client.close()
+
+        print(f"{args.requests} requests of {args.points} points and {args.queries} queries, "
+              f"{args.seed_points} points already stored, {os.cpu_count()} CPUs")
+        print(f"{'mode':>12} {'threads':>8} {'seconds':>9} {'req/s':>7} {'failed':>7}")
+        for num_threads in sorted(set(args.threads)):
+            for mode in ("per-request", "serialized", "shared"):
+                seconds, failed = run_mode(mode, path, num_threads, args, rng)
+                print(f"{mode:>12} {num_threads:>8} {seconds:>9.3f} "
+                      f"{(args.requests - failed) / seconds:>7.2f} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
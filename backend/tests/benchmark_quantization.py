@@ -0,0 +1,127 @@
+"""
+Quantization benchmark.
+
+Indexes clustered unit vectors, standing in for idea embeddings (ideas from the
+same PDFs sit close together), in the float32 in-memory store and in quantized
+ones (int8 and binary, with the full-precision vectors in a temporary file),
+then runs the same top-k queries against each. Queries are perturbed copies of
+stored vectors, as prompts land near the ideas they ask about. For each
+quantization and oversampling factor, prints the RAM taken by the vectors, the
+bytes on disk, the query latency and recall@k against the exact float32 results.
+
+With --qdrant-url the same collections are also created in a Qdrant server with
+the matching quantization config; the local store ignores quantization, so it is
+not measured.
+
+Usage:
+    python backend/tests/benchmark_quantization.py --sizes 5000 50000
+    python backend/tests/benchmark_quantization.py --oversampling 1 2 4 8 --limit 10
+    python backend/tests/benchmark_quantization.py --qdrant-url http://localhost:6333
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+# Get the absolute path to the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, project_root)
+
+from qdrant_client import QdrantClient
+
+from backend.utils.vector_store import InMemoryVectorStore, QdrantVectorStore, QuantizedVectorStore
+
+
+def clustered_unit_vectors(count: int, dim: int, clusters: int, spread: float,
+                           rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + spread * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(store, ids, vectors, dim: int) -> None:
+    store.recreate(dim)
+    payloads = [{"main_point": f"idea {i}", "chunk_id": i, "quotation_id": i} for i in range(len(ids))]
+    for i in range(0, len(ids), 1000):
+        store.upsert(ids[i:i + 1000], vectors[i:i + 1000], payloads[i:i + 1000])
+
+
+def search_all(store, queries: np.ndarray, limit: int):
+    """IDs found per query and the time per query"""
+    start = time.perf_counter()
+    results = [[hit.id for hit in store.search(query, limit)] for query in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def recall(results, truth) -> float:
+    return float(np.mean([len(set(found) & set(exact)) / len(exact) for found, exact in zip(results, truth)]))
+
+
+def report(size: int, name: str, oversampling, ram: int, disk: int, seconds: float, found, truth) -> None:
+    print(f"{size:>8} {name:>8} {oversampling if oversampling else '-':>6} {ram / 1024 / 1024:>9.2f} "
+          f"{disk / 1024 / 1024:>9.2f} {1000 * seconds:>9.3f} {recall(found, truth):>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector stores against float32")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000], help="Points per collection")
+    parser.add_argument("--dim", type=int, default=384, help="Vector size (all-MiniLM-L6-v2 has 384)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10, help="k of recall@k")
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clusters", type=int, default=50, help="Topics the vectors are drawn around")
+    parser.add_argument("--spread", type=float, default=1.0, help="Noise around each topic, relative to it")
+    parser.add_argument("--qdrant-url", help="Also measure a Qdrant server")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    client = QdrantClient(url=args.qdrant_url) if args.qdrant_url else None
+    print(f"{args.queries} queries, recall@{args.limit}, dim {args.dim}")
+    print(f"{'points':>8} {'store':>8} {'over':>6} {'RAM MB':>9} {'disk MB':>9} {'query ms':>9} {'recall':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            ids = [str(uuid.UUID(int=i)) for i in range(size)]
+            vectors = clustered_unit_vectors(size, args.dim, args.clusters, args.spread, rng)
+            queries = vectors[rng.integers(size, size=args.queries)] \
+                + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32) / np.sqrt(args.dim)
+
+            exact = InMemoryVectorStore("float32")
+            build(exact, ids, vectors, args.dim)
+            truth, seconds = search_all(exact, queries, args.limit)
+            report(size, "float32", None, exact.memory_bytes(), 0, seconds, truth, truth)
+            del exact
+
+            for quantization in ("int8", "binary"):
+                store = QuantizedVectorStore(quantization, os.path.join(directory, f"{quantization}.f32"),
+                                             quantization)
+                build(store, ids, vectors, args.dim)
+                for oversampling in args.oversampling:
+                    store.oversampling = oversampling
+                    found, seconds = search_all(store, queries, args.limit)
+                    report(size, quantization, oversampling, store.memory_bytes(),
+                           os.path.getsize(store.path), seconds, found, truth)
+                del store
+
+            if client is None:
+                continue
+            for quantization in ("none", "int8", "binary"):
+                for oversampling in args.oversampling:
+                    store = QdrantVectorStore(client, f"bench_quantization_{size}", quantization, oversampling)
+                    if oversampling == args.oversampling[0]:
+                        build(store, ids, vectors, args.dim)
+                    found, seconds = search_all(store, queries, args.limit)
+                    report(size, f"q-{quantization}", oversampling, 0, 0, seconds, found, truth)
+                    if quantization == "none":
+                        break
+            client.delete_collection(f"bench_quantization_{size}")
+    if client is not None:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
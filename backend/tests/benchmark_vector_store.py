@@ -0,0 +1,107 @@
+"""
+Vector store benchmark.
+
+Indexes random unit vectors, standing in for idea embeddings, in the in-memory
+store and in a local Qdrant collection (in a temporary directory), then runs
+the same top-k queries against both: one by one, and as one batch in which
+each query is restricted to the members of its own cluster, as the centroid
+search of generate() does. Checks that both stores return the same points and
+prints the indexing time and the query latencies per corpus size.
+
+Usage:
+    python backend/tests/benchmark_vector_store.py --sizes 1000 5000 20000
+    python backend/tests/benchmark_vector_store.py --dim 384 --queries 200 --limit 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+# Get the absolute path to the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, project_root)
+
+from qdrant_client import QdrantClient
+
+from backend.utils.vector_store import InMemoryVectorStore, QdrantVectorStore
+
+
+def random_unit_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(store, ids, vectors, dim: int) -> float:
+    start = time.perf_counter()
+    store.recreate(dim)
+    payloads = [{"main_point": f"idea {i}", "chunk_id": i, "quotation_id": i} for i in range(len(ids))]
+    for i in range(0, len(ids), 100):
+        store.upsert(ids[i:i + 100], vectors[i:i + 100], payloads[i:i + 100])
+    return time.perf_counter() - start
+
+
+def search_all(store, queries: np.ndarray, limit: int):
+    start = time.perf_counter()
+    results = [[hit.id for hit in store.search(query, limit)] for query in queries]
+    return results, time.perf_counter() - start
+
+
+def search_clusters(store, queries: np.ndarray, limit: int, members):
+    """One batch search, each query restricted to its cluster; returns the IDs found and the time per query"""
+    start = time.perf_counter()
+    results = [[hit.id for hit in hits] for hits in store.search_batch(queries, limit, members)]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory vector store against local Qdrant")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="Points per collection")
+    parser.add_argument("--dim", type=int, default=384, help="Vector size (all-MiniLM-L6-v2 has 384)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10, help="k of the top-k queries")
+    parser.add_argument("--clusters", type=int, default=8, help="Queries in the cluster-restricted batch")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    queries = random_unit_vectors(args.queries, args.dim, rng)
+    print(f"{args.queries} queries, top {args.limit}, dim {args.dim}")
+    print(f"{'points':>8} {'store':>8} {'index s':>9} {'query ms':>9} {'speedup':>8} {'batch ms':>9}")
+    with tempfile.TemporaryDirectory() as qdrant_path:
+        client = QdrantClient(path=qdrant_path)
+        try:
+            for size in args.sizes:
+                ids = [str(uuid.UUID(int=i)) for i in range(size)]
+                vectors = random_unit_vectors(size, args.dim, rng)
+                labels = rng.integers(args.clusters, size=size)
+                members = [[point_id for point_id, label in zip(ids, labels) if label == cluster]
+                           for cluster in range(args.clusters)]
+                centroids = random_unit_vectors(args.clusters, args.dim, rng)
+                timings = {}
+                results = {}
+                for name, store in (("qdrant", QdrantVectorStore(client, f"bench_{size}")),
+                                    ("memory", InMemoryVectorStore(f"bench_{size}"))):
+                    index_seconds = build(store, ids, vectors, args.dim)
+                    single, query_seconds = search_all(store, queries, args.limit)
+                    batch, batch_seconds = search_clusters(store, centroids, args.limit, members)
+                    results[name] = single + batch
+                    timings[name] = query_seconds
+                    print(f"{size:>8} {name:>8} {index_seconds:>9.3f} {1000 * query_seconds / args.queries:>9.3f} "
+                          f"{timings['qdrant'] / query_seconds:>7.1f}x {1000 * batch_seconds:>9.3f}")
+                if results["memory"] != results["qdrant"]:
+                    mismatches = sum(a != b for a, b in zip(results["memory"], results["qdrant"]))
+                    print(f"{mismatches} of {len(results['memory'])} queries returned different points")
+                    sys.exit(1)
+                if any(not set(hits) <= set(cluster) for hits, cluster in zip(results["memory"][args.queries:], members)):
+                    print("A cluster-restricted query returned a point outside its cluster")
+                    sys.exit(1)
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
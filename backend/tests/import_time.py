@@ -0,0 +1,86 @@
+"""
+Import-time report for the API.
+
+Imports a module in a fresh interpreter with `python -X importtime`, then prints
+the total and the slowest modules by cumulative import time. Exits with status 1
+when the total is over --budget, so it can guard startup time in CI.
+
+Usage:
+    python backend/tests/import_time.py --budget 3.0
+    python backend/tests/import_time.py --module backend.utils.vectorize --top 30
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Get the absolute path to the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+
+def measure_imports(module: str):
+    """
+    Import `module` in a new interpreter and parse the -X importtime output.
+
+    Returns:
+        List of (module name, self microseconds, cumulative microseconds), in import order
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Drop the space after the separator; the remaining indentation is the nesting depth
+        entries.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def build_report(module: str, top: int) -> dict:
+    entries = measure_imports(module)
+    # Top-level imports are the ones without indentation; their sum is the total
+    total_us = sum(cumulative for name, _, cumulative in entries if not name.startswith(" "))
+    slowest = sorted(entries, key=lambda entry: entry[2], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_seconds": round(total_us / 1e6, 3),
+        "modules_imported": len(entries),
+        "slowest": [
+            {"module": name.strip(), "cumulative_seconds": round(cumulative / 1e6, 3),
+             "self_seconds": round(self_us / 1e6, 3)}
+            for name, self_us, cumulative in slowest
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how long importing the API takes")
+    parser.add_argument("--module", default="backend.api", help="Module to import")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to list")
+    parser.add_argument("--budget", type=float, help="Fail if the import takes longer than this many seconds")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = build_report(args.module, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {report['module']}: {report['total_seconds']:.3f}s "
+              f"({report['modules_imported']} modules)")
+        for entry in report["slowest"]:
+            print(f"  {entry['cumulative_seconds']:8.3f}s  {entry['module']}")
+
+    if args.budget is not None and report["total_seconds"] > args.budget:
+        print(f"Import time {report['total_seconds']:.3f}s is over the budget of {args.budget:.3f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,105 @@
 #Class for an idea
 import json
-from .LLMRequest import LLMRequest
+import asyncio
+from .LLMRequest import LLMRequest, LLMRequestError
+from .idea_cache import IdeaCache
+from .db_log import setup_logger
 import re
 import os
+from typing import Dict, Iterable, Iterator, List, Optional
+from tqdm import tqdm
 from backend.utils.env_checker import get_environment_config
 
 # Load environment variables
 ENV_CONFIG = get_environment_config()
 
+# Get logger for this module
+logger = setup_logger(__name__)
+
+IDEA_PROMPT_TEMPLATE = """Imagine you are an expert in the field. Summarise the following text into 0 to 4 main points. Each point should be concise (1-3 sentences) and supported by a direct quotation.
+
+Text to summarize:
+{chunk_text}
+
+Please format each "main point" as a JSON object:
+{{
+    "point": "First main point here",
+    "quotation": "Supporting quotation from text"
+}}
+
+and return a JSON array of these objects.
+
+Ensure each point is clear and each quotation directly supports its point.
+Do not include any other text in your response outside of the JSON array.
+Do not consider any references or citations."""
+
+PACKED_PROMPT_TEMPLATE = """Imagine you are an expert in the field. The text below is split into {num_sections} numbered sections. Summarise each section into 0 to 4 main points. Each point should be concise (1-3 sentences) and supported by a direct quotation from the same section.
+
+{sections}
+
+Please format each "main point" as a JSON object:
+{{
+    "section": 1,
+    "point": "First main point here",
+    "quotation": "Supporting quotation from that section"
+}}
+
+where "section" is the number of the section the point and quotation come from, and return one JSON array with the points of all sections.
+
+Ensure each point is clear and each quotation directly supports its point.
+Do not include any other text in your response outside of the JSON array.
+Do not consider any references or citations."""
+
+SECTION_TEMPLATE = "[Section {index}]\n{text}\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of English text: about four characters per token"""
+    return len(text) // 4 + 1
+
+
+def build_packed_prompt(chunks: List[Dict]) -> str:
+    """Prompt asking for the points of several chunks at once, each in a numbered section"""
+    sections = "\n".join(
+        SECTION_TEMPLATE.format(index=index, text=chunk["text"]) for index, chunk in enumerate(chunks, start=1)
+    )
+    return PACKED_PROMPT_TEMPLATE.format(num_sections=len(chunks), sections=sections)
+
+
+def iter_packs(chunks: Iterable[Dict], token_budget: int, max_chunks: int) -> Iterator[List[Dict]]:
+    """
+    Group consecutive chunks greedily into packs whose packed prompt fits in token_budget.
+
+    Args:
+        chunks: Chunk dictionaries; may be a lazy stream
+        token_budget: Estimated prompt tokens per pack at most
+        max_chunks: Chunks per pack at most; 1 disables packing
+
+    Yields:
+        Lists of chunks; a chunk too large for the budget on its own is a pack of its own
+    """
+    overhead = estimate_tokens(PACKED_PROMPT_TEMPLATE)
+    pack, tokens = [], overhead
+    for chunk in chunks:
+        chunk_tokens = estimate_tokens(SECTION_TEMPLATE.format(index=len(pack) + 1, text=chunk["text"]))
+        if pack and (len(pack) >= max_chunks or tokens + chunk_tokens > token_budget):
+            yield pack
+            pack, tokens = [], overhead
+        pack.append(chunk)
+        tokens += chunk_tokens
+    if pack:
+        yield pack
+
+
 class Idea:
-    def __init__(self, point, chunk_id, quotation_id):
+    def __init__(self, point, chunk_id, quotation_id, quotation=None, sources=None):
         # implementation
         self.main_point = point
         self.chunk_id = chunk_id
         self.quotation_id = quotation_id
+        self.quotation = quotation
+        # Paths of the PDFs the idea was extracted from
+        self.sources = sources or []
 
     def to_string(self):
         return f"Main Point: {self.main_point}, Chunk ID: {self.chunk_id}, Quotation ID: {self.quotation_id}"
@@ -31,6 +117,8 @@ class Chunk:
         self.quotation = {}
         # Use MAX_WORKERS_PER_CHUNK from environment variables
         self._max_workers = ENV_CONFIG['max_workers_per_chunk']
+        # Extraction results are cached per chunk text, prompt and model
+        self.idea_cache = IdeaCache()
         # TODO: we should try to take in page numbers for better citations.
     
     def chunk_id_generator(self):
@@ -47,83 +135,224 @@ class Chunk:
         # Remove all control characters except \n and \t
         return re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f]', '', text)
     
-    def process_chunks_concurrently(self, chunks, debug=False):
+    def _packs(self, chunks: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """Group chunks into the units sent to the LLM: packs in packed mode, single chunks otherwise"""
+        if ENV_CONFIG['idea_extraction_mode'] != 'packed':
+            return ([chunk] for chunk in chunks)
+        return iter_packs(chunks, ENV_CONFIG['idea_pack_token_budget'], ENV_CONFIG['idea_pack_max_chunks'])
+
+    def process_chunks_concurrently(self, chunks, debug=False, on_done=None):
         """
-        Process multiple chunks concurrently using ThreadPoolExecutor
+        Extract ideas from many chunks at once.
+        Every chunk (or pack of chunks, in packed mode) is sent through LLMRequest.ainference
+        in parallel; the number of requests in flight, rate limiting and retries are handled
+        there. Ideas are returned in chunk order.
+        on_done(n), if given, is called with the number of chunks finished so far.
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        from tqdm import tqdm
-        
-        all_ideas = []
-        
-        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
-            # Submit all chunks for processing
-            future_to_chunk = {
-                executor.submit(self._process_single_chunk, chunk, debug): chunk 
-                for chunk in chunks
-            }
-            
-            # Process completed futures as they come in
-            for future in tqdm(as_completed(future_to_chunk), 
-                             total=len(chunks),
-                             desc="Processing chunks",
-                             unit="chunk"):
-                chunk = future_to_chunk[future]
-                try:
-                    ideas = future.result()
-                    all_ideas.extend(ideas)
-                except Exception as e:
-                    print(f"Chunk processing failed: {str(e)}")
-                    continue
-                
-        return all_ideas
+        return asyncio.run(self._process_chunk_stream_async(
+            chunks, debug, None, on_done, max_in_flight=max(1, len(chunks)), total=len(chunks)
+        ))
+
+    def process_chunk_stream(self, chunks, debug=False, on_ideas=None, on_done=None, max_in_flight=32):
+        """
+        Extract ideas from chunks while they are still being produced.
+        chunks is an iterable that may block, e.g. one fed by another thread; a new chunk is
+        only taken once fewer than max_in_flight requests are in flight, which holds the
+        producer back when the LLM is the bottleneck. on_ideas(ideas), if given, is called
+        from a worker thread with the ideas of each request as soon as they are extracted, and
+        may block to apply backpressure of its own. Ideas are returned in chunk order.
+        on_done(n), if given, is called with the number of chunks finished so far.
+        """
+        return asyncio.run(self._process_chunk_stream_async(chunks, debug, on_ideas, on_done, max_in_flight))
+
+    async def _process_chunk_stream_async(self, chunks, debug, on_ideas, on_done, max_in_flight, total=None):
+        loop = asyncio.get_running_loop()
+        packs = self._packs(chunks)
+        end = object()
+        slots = asyncio.Semaphore(max_in_flight)
+        finished = 0
+        pbar = tqdm(total=total, desc="Processing chunks", unit="chunk")
+
+        async def process(pack):
+            nonlocal finished
+            try:
+                results = await self._aprocess_pack(pack, debug)
+                ideas = [idea for result in results if not isinstance(result, Exception) for idea in result]
+                if on_ideas is not None and ideas:
+                    await loop.run_in_executor(None, on_ideas, ideas)
+                return results
+            finally:
+                slots.release()
+                finished += len(pack)
+                pbar.update(len(pack))
+                if on_done is not None:
+                    on_done(finished)
+
+        tasks = []
+        try:
+            while True:
+                await slots.acquire()
+                pack = await loop.run_in_executor(None, next, packs, end)
+                if pack is end:
+                    break
+                tasks.append(asyncio.create_task(process(pack)))
+            results = [result for pack_results in await asyncio.gather(*tasks) for result in pack_results]
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            pbar.close()
+
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.error(f"Idea extraction failed for {len(failures)} of {len(results)} chunks")
+            if len(failures) == len(results):
+                raise failures[0]
+        if len(tasks) < len(results):
+            logger.info(f"Extracted ideas from {len(results)} chunks in {len(tasks)} packs")
+        return [idea for result in results if not isinstance(result, Exception) for idea in result]
+
+    async def _aprocess_pack(self, pack, debug):
+        """
+        Extract the ideas of a pack of chunks with one request.
+        Chunks already in the idea cache are left out of the prompt; if only one chunk is
+        left, or the response can't be split back into sections, the remaining chunks are
+        processed one by one.
+
+        Returns:
+            One entry per chunk: its list of ideas, or the LLMRequestError that stopped it
+        """
+        if len(pack) == 1:
+            return [await self._aprocess_single_chunk_safe(pack[0], debug)]
+
+        loop = asyncio.get_running_loop()
+        model_name = LLMRequest.model_name()
+        keys = [IdeaCache.make_key(chunk["text"], PACKED_PROMPT_TEMPLATE, model_name) for chunk in pack]
+        # SQLite calls block, so they run off the event loop, one for the whole pack
+        points = await loop.run_in_executor(None, self.idea_cache.get_many, keys)
+        missing = [i for i, chunk_points in enumerate(points) if chunk_points is None]
+
+        if len(missing) > 1:
+            prompt = build_packed_prompt([pack[i] for i in missing])
+            try:
+                sections = self._parse_packed_points(await LLMRequest.ainference(prompt, debug=debug), len(missing))
+            except LLMRequestError as e:
+                logger.error(f"Chunk processing failed: {str(e)}")
+                return [self._build_ideas(pack[i], points[i]) if points[i] is not None else e
+                        for i in range(len(pack))]
+            if sections is not None:
+                for i, section_points in zip(missing, sections):
+                    points[i] = section_points
+                await loop.run_in_executor(None, self.idea_cache.put_many,
+                                           {keys[i]: points[i] for i in missing})
+                missing = []
+            else:
+                logger.warning(f"Could not split the response to a pack of {len(missing)} chunks; "
+                               f"extracting them one by one")
+
+        singles = await asyncio.gather(*(self._aprocess_single_chunk_safe(pack[i], debug) for i in missing))
+        results = dict(zip(missing, singles))
+        return [results[i] if i in results else self._build_ideas(pack[i], points[i]) for i in range(len(pack))]
+
+    async def _aprocess_single_chunk_safe(self, chunk, debug):
+        try:
+            return await self._aprocess_single_chunk(chunk, debug)
+        except LLMRequestError as e:
+            logger.error(f"Chunk processing failed: {str(e)}")
+            return e
+
+    def _parse_packed_points(self, response_data, num_sections):
+        """
+        Split the response to a packed prompt into the points of each section.
+        Returns None if the response could not be used, or if any point lacks a valid section number
+        """
+        try:
+            if isinstance(response_data, str):
+                response_data = json.loads(self._clean_control_chars(response_data))
+            sections = [[] for _ in range(num_sections)]
+            for point in response_data:
+                section = int(point["section"])
+                if not 1 <= section <= num_sections:
+                    logger.warning(f"Packed response refers to section {section} of {num_sections}")
+                    return None
+                sections[section - 1].append({"point": point["point"], "quotation": point["quotation"]})
+            return sections
+        except json.JSONDecodeError as e:
+            logger.warning(f"Error parsing JSON for packed chunks: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Unexpected error processing packed chunks: {e}")
+            return None
     
     def _process_single_chunk(self, chunk, debug):
         """
         Process a single chunk and return its ideas
         """
-        chunk_text = chunk["text"]
-        prompt = f"""Imagine you are an expert in the field. Summarise the following text into 0 to 4 main points. Each point should be concise (1-3 sentences) and supported by a direct quotation.
-
-Text to summarize:
-{chunk_text}
+        cache_key = IdeaCache.make_key(chunk["text"], IDEA_PROMPT_TEMPLATE, LLMRequest.model_name())
+        points = self.idea_cache.get(cache_key)
+        if points is None:
+            prompt = IDEA_PROMPT_TEMPLATE.format(chunk_text=chunk["text"])
+            points = self._parse_points(LLMRequest.inference(prompt, debug=debug))
+            if points is None:
+                return []
+            self.idea_cache.put(cache_key, points)
+        return self._build_ideas(chunk, points)
 
-Please format each "main point" as a JSON object:
-{{
-    "point": "First main point here",
-    "quotation": "Supporting quotation from text"
-}}
+    async def _aprocess_single_chunk(self, chunk, debug):
+        """
+        Async version of _process_single_chunk
+        """
+        loop = asyncio.get_running_loop()
+        cache_key = IdeaCache.make_key(chunk["text"], IDEA_PROMPT_TEMPLATE, LLMRequest.model_name())
+        points = await loop.run_in_executor(None, self.idea_cache.get, cache_key)
+        if points is None:
+            prompt = IDEA_PROMPT_TEMPLATE.format(chunk_text=chunk["text"])
+            points = self._parse_points(await LLMRequest.ainference(prompt, debug=debug))
+            if points is None:
+                return []
+            await loop.run_in_executor(None, self.idea_cache.put, cache_key, points)
+        return self._build_ideas(chunk, points)
 
-and return a JSON array of these objects.
+    def _build_ideas(self, chunk, points):
+        """Turn extracted points into Ideas and record their quotations"""
+        # Quotation IDs are handed out the same way for cached and fresh points
+        sources = chunk.get("sources") or ([chunk["source"]] if "source" in chunk else [])
+        ideas = []
+        for point in points:
+            idea = Idea(
+                point=point["point"],
+                chunk_id=self.chunk_id,
+                quotation_id=self.quote_id_generator(),
+                quotation=point["quotation"],
+                sources=sorted(sources)
+            )
+            ideas.append(idea)
+            self.quotation[idea.quotation_id] = point["quotation"]
+        return ideas
 
-Ensure each point is clear and each quotation directly supports its point.
-Do not include any other text in your response outside of the JSON array.
-Do not consider any references or citations."""
-        
-        response_data = LLMRequest.inference(prompt, debug=debug)
-        
+    def _parse_points(self, response_data):
+        """
+        Parse an LLM response into a list of {"point", "quotation"} dictionaries.
+        Returns None if the response could not be used
+        """
         try:
             # Clean control characters and parse the JSON string into a list
             if isinstance(response_data, str):
                 response_data = self._clean_control_chars(response_data)
                 response_data = json.loads(response_data)
             
-            ideas = []
-            for point in response_data:
-                idea = Idea(
-                    point=point["point"],
-                    chunk_id=self.chunk_id,
-                    quotation_id=self.quote_id_generator()
-                )
-                ideas.append(idea)
-                self.quotation[idea.quotation_id] = point["quotation"]
-            return ideas
+            return [
+                {"point": point["point"], "quotation": point["quotation"]}
+                for point in response_data
+            ]
         except json.JSONDecodeError as e:
-            print(f"Error parsing JSON for chunk: {e}")
-            return []
+            logger.warning(f"Error parsing JSON for chunk: {e}")
+            return None
         except Exception as e:
-            print(f"Unexpected error processing chunk: {e}")
-            return []
+            logger.warning(f"Unexpected error processing chunk: {e}")
+            return None
     
     def chunk_to_idea(self, chunk, debug=ENV_CONFIG['debug_mode']):
         '''
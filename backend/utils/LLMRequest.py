@@ -3,9 +3,17 @@ import os
 from dotenv import load_dotenv
 import json
 import requests
+import hashlib
+import time
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from threading import Lock
+from . import metrics
 from .db_log import setup_logger
+from .response_cache import ResponseCache, MISS
+from backend.utils.env_checker import get_environment_config
 
 
 # Load environment variables from .env file
@@ -14,12 +22,116 @@ load_dotenv()
 # Get logger for this module
 logger = setup_logger(__name__)
 
+ENV_CONFIG = get_environment_config()
+
+# Response format requested from the Llama API for non-streaming calls
+LLAMA_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "schema": {
+            "type": "object"
+        }
+    }
+}
+
+# Default request rates (requests per second) when LLM_RATE_LIMIT_RPS is not set
+PROVIDER_RATE_LIMITS = {
+    "llama": 5.0,
+    "cerebras": 10.0,
+}
+
+
+class LLMRequestError(Exception):
+    """
+    Raised when an LLM call fails.
+    
+    Attributes:
+        status_code: HTTP status returned by the provider, if any
+        retryable: Whether the call may succeed when retried (429, 5xx, connection errors)
+    """
+    def __init__(self, message, status_code=None, retryable=False):
+        self.status_code = status_code
+        self.retryable = retryable
+        super().__init__(message)
+
+    @classmethod
+    def from_exception(cls, e):
+        """Wrap an exception raised by a provider SDK"""
+        if isinstance(e, LLMRequestError):
+            return e
+        status_code = getattr(e, 'status_code', None)
+        if status_code is None:
+            status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+        if status_code is None:
+            # Connection errors and timeouts carry no status and are worth retrying
+            retryable = isinstance(e, (ConnectionError, TimeoutError)) or 'connection' in type(e).__name__.lower() \
+                or 'timeout' in type(e).__name__.lower()
+        else:
+            retryable = status_code == 429 or 500 <= status_code < 600
+        error = cls(f"{type(e).__name__}: {str(e)}", status_code=status_code, retryable=retryable)
+        # Keep the server's Retry-After hint for the backoff
+        headers = getattr(getattr(e, 'response', None), 'headers', None) or {}
+        try:
+            error.retry_after = float(headers.get('retry-after')) if headers.get('retry-after') else None
+        except (TypeError, ValueError):
+            error.retry_after = None
+        return error
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    
+    Callers reserve a token and are told how long to wait for it, so the same bucket
+    can be used from worker threads (time.sleep) and event loops (asyncio.sleep).
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def reserve(self):
+        """Take one token and return the number of seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
 
 class LLMRequest:
     client = None
+    # Model used for each supported provider
+    MODELS = {
+        "llama": "Llama-4-Maverick-17B-128E-Instruct-FP8",
+        "cerebras": "llama-4-scout-17b-16e-instruct",
+    }
     # Class-level atomic counter with thread-safe lock
     _call_counter = 0
     _counter_lock = Lock()
+    _client_lock = Lock()
+    # One rate limiter per provider, shared by every caller in the process
+    _buckets = {}
+    _buckets_lock = Lock()
+    # Blocking SDK calls made by ainference run here; its size bounds concurrent requests
+    _executor = None
+    # Disk cache of responses, opened on first use
+    _response_cache = None
 
     @classmethod
     def _increment_counter(cls):
@@ -28,97 +140,338 @@ class LLMRequest:
             cls._call_counter += 1
             return cls._call_counter
 
+    @staticmethod
+    def _provider():
+        """Configured LLM provider, readable before the client is initialized"""
+        return os.getenv("LLM", "llama").lower()
+
+    @classmethod
+    def model_name(cls):
+        """Provider and model that inference calls are sent to, e.g. 'llama/Llama-4-...'"""
+        provider = cls._provider()
+        return f"{provider}/{cls.MODELS.get(provider, 'unknown')}"
+
     @classmethod
     def initialize_client(cls):
-        cls.__LLM_MODEL = os.getenv("LLM").lower()
+        with cls._client_lock:
+            if cls.client is not None:
+                return
+            cls.__LLM_MODEL = os.getenv("LLM").lower()
+            if cls.__LLM_MODEL == "llama":
+                from llama_api_client import LlamaAPIClient
+            elif cls.__LLM_MODEL == "cerebras":
+                from cerebras.cloud.sdk import Cerebras
+            else:
+                raise ValueError("Invalid LLM model")
+
+            api_key = os.environ.get("API_KEY")
+            # Retries are handled here, with backoff shared across all calls
+            if cls.__LLM_MODEL == "llama":
+                cls.client = LlamaAPIClient(api_key=api_key, max_retries=0)
+            elif cls.__LLM_MODEL == "cerebras":
+                cls.client = Cerebras(api_key=api_key, max_retries=0)
+
+    @classmethod
+    def _rate_limiter(cls):
+        """Token bucket for the configured provider"""
+        provider = os.getenv("LLM", "llama").lower()
+        with cls._buckets_lock:
+            if provider not in cls._buckets:
+                rate = ENV_CONFIG['llm_rate_limit_rps'] or PROVIDER_RATE_LIMITS.get(provider, 5.0)
+                cls._buckets[provider] = TokenBucket(rate, ENV_CONFIG['llm_rate_limit_burst'])
+            return cls._buckets[provider]
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._client_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=ENV_CONFIG['llm_max_concurrency'],
+                    thread_name_prefix="llm"
+                )
+            return cls._executor
+
+    @classmethod
+    def _get_response_cache(cls, cache):
+        """Response cache to use for a call, or None when caching is off for it"""
+        enabled = ENV_CONFIG['llm_cache_enabled'] if cache is None else cache
+        if not enabled:
+            return None
+        with cls._client_lock:
+            if cls._response_cache is None:
+                cls._response_cache = ResponseCache()
+            return cls._response_cache
+
+    @classmethod
+    def _cache_key(cls, prompt, stream=False):
+        """Cache key from the provider, model, response-format settings and a hash of the prompt"""
+        provider = os.getenv("LLM", "llama").lower()
+        response_format = LLAMA_RESPONSE_FORMAT if provider == "llama" and not stream else None
+        hasher = hashlib.sha256()
+        for part in (cls.model_name(), json.dumps(response_format, sort_keys=True),
+                     "stream" if stream else "complete", hashlib.sha256(prompt.encode("utf-8")).hexdigest()):
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\x1f")
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _backoff(attempt, error):
+        """Full-jitter exponential backoff, honouring Retry-After when the provider sends it"""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            return retry_after
+        cap = min(ENV_CONFIG['llm_backoff_max'], ENV_CONFIG['llm_backoff_base'] * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    @classmethod
+    def _cached_response(cls, response_cache, cache_key, mode):
+        """Response stored for a call, or MISS; a hit is logged and counted"""
+        if response_cache is None:
+            return MISS
+        cached = response_cache.get(cache_key)
+        if cached is not MISS:
+            logger.info("LLM response served from cache")
+            metrics.record_llm_call(cls._provider(), mode, "cache_hit")
+        return cached
+
+    @staticmethod
+    def _store_response(response_cache, cache_key, response):
+        if response_cache is not None:
+            response_cache.put(cache_key, response)
+
+    @classmethod
+    def _start_call(cls, prompt, streaming=False):
+        """Number and log a call to the provider"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+        call_number = cls._increment_counter()
+        logger.info(f"LLM API Call #{call_number}{' (streaming)' if streaming else ''} at {timestamp}")
+        logger.debug(f"Prompt: {prompt[:200]}...")  # Log first 200 chars of prompt
+        return call_number
+
+    @classmethod
+    def _handle_failure(cls, call_number, attempt, exception, mode, seconds):
+        """
+        Record a failed attempt and decide whether to retry it.
+
+        Returns:
+            Seconds to wait before the next attempt
+
+        Raises:
+            LLMRequestError: if the error is not retryable or the retries are used up
+        """
+        error = LLMRequestError.from_exception(exception)
+        if not error.retryable or attempt == ENV_CONFIG['llm_max_retries']:
+            metrics.record_llm_call(cls._provider(), mode, "error", seconds)
+            logger.error(f"LLM API Call #{call_number} failed: {error}")
+            raise error from exception
+        metrics.record_llm_call(cls._provider(), mode, "retry", seconds)
+        delay = cls._backoff(attempt, error)
+        logger.warning(f"LLM API Call #{call_number} attempt {attempt + 1} failed ({error}), retrying in {delay:.2f} seconds")
+        return delay
+
+    @classmethod
+    def _complete(cls, prompt, debug=False):
+        """Send one request and extract the content of the response. Raises on any failure."""
+        if cls.client is None:
+            cls.initialize_client()
+        
+        # Extract the content from the response
         if cls.__LLM_MODEL == "llama":
-            from llama_api_client import LlamaAPIClient
+            response = cls.client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt,
+                        "response_format": LLAMA_RESPONSE_FORMAT
+                    }
+                ],
+                model=cls.MODELS["llama"],
+                
+            )
+            # Print raw response for debugging
+            if debug:
+                print("Raw response:\n\n\n", response)
+
+            if hasattr(response, 'completion_message') and hasattr(response.completion_message, 'content'):
+                content = response.completion_message.content
+                if hasattr(content, 'text'):
+                    # If the content is JSON, parse it
+                    try:
+                        return json.loads(content.text)
+                    except json.JSONDecodeError:
+                        # If not JSON, return the raw text
+                        return content.text
+                return content
+            else:
+                raise LLMRequestError(f"Unexpected response format: {str(response)[:200]}")
         elif cls.__LLM_MODEL == "cerebras":
-            from cerebras.cloud.sdk import Cerebras
-        else:
-            raise ValueError("Invalid LLM model")
+            response = cls.client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+            ],
+                model=cls.MODELS["cerebras"],
+            )
+            # Print raw response for debugging
+            if debug:
+                print("Raw response:\n\n\n", response)
+
+            if (hasattr(response, 'choices') and len(response.choices) > 0 
+                    and hasattr(response.choices[0], 'message') 
+                    and hasattr(response.choices[0].message, 'content')):
+                content = response.choices[0].message.content
+                return content
+            else:
+                raise LLMRequestError(f"Unexpected response format: {str(response)[:200]}")
+
+    @classmethod
+    def inference(cls, prompt, debug=False, cache=None):
+        """
+        Send a prompt to the configured LLM and return its response.
+        Rate limited per provider and retried with backoff on 429, 5xx and connection errors.
+        
+        Args:
+            prompt: Prompt text
+            debug: Print the raw response
+            cache: Serve and store the response in the response cache; defaults to LLM_CACHE_ENABLED
+        
+        Raises:
+            LLMRequestError: if the call fails for good
+        """
+        response_cache = cls._get_response_cache(cache)
+        cache_key = cls._cache_key(prompt)
+        cached = cls._cached_response(response_cache, cache_key, "sync")
+        if cached is not MISS:
+            return cached
+        
+        call_number = cls._start_call(prompt)
+        for attempt in range(ENV_CONFIG['llm_max_retries'] + 1):
+            cls._rate_limiter().acquire()
+            start = time.perf_counter()
+            try:
+                response = cls._complete(prompt, debug=debug)
+            except Exception as e:
+                time.sleep(cls._handle_failure(call_number, attempt, e, "sync", time.perf_counter() - start))
+                continue
+            metrics.record_llm_call(cls._provider(), "sync", "success", time.perf_counter() - start)
+            cls._store_response(response_cache, cache_key, response)
+            return response
 
-        api_key = os.environ.get("API_KEY")
+    @classmethod
+    async def ainference(cls, prompt, debug=False, cache=None):
+        """
+        Async version of inference for fanning out many prompts at once.
+        At most LLM_MAX_CONCURRENCY requests are in flight across the process.
+        
+        Raises:
+            LLMRequestError: if the call fails for good
+        """
+        loop = asyncio.get_running_loop()
+        response_cache = cls._get_response_cache(cache)
+        cache_key = cls._cache_key(prompt)
+        # The cache is SQLite, so lookups and stores run on the default executor, off the
+        # event loop and without taking one of the LLM request slots
+        cached = await loop.run_in_executor(None, cls._cached_response, response_cache, cache_key, "async")
+        if cached is not MISS:
+            return cached
+        
+        call_number = cls._start_call(prompt)
+        for attempt in range(ENV_CONFIG['llm_max_retries'] + 1):
+            await cls._rate_limiter().acquire_async()
+            start = time.perf_counter()
+            try:
+                response = await loop.run_in_executor(cls._get_executor(), cls._complete, prompt, debug)
+            except Exception as e:
+                await asyncio.sleep(cls._handle_failure(call_number, attempt, e, "async", time.perf_counter() - start))
+                continue
+            metrics.record_llm_call(cls._provider(), "async", "success", time.perf_counter() - start)
+            await loop.run_in_executor(None, cls._store_response, response_cache, cache_key, response)
+            return response
+
+    @staticmethod
+    def _llama_delta(chunk):
+        """Text carried by a streamed Llama API chunk, if any"""
+        delta = getattr(getattr(chunk, 'event', None), 'delta', None)
+        return getattr(delta, 'text', None)
+
+    @staticmethod
+    def _cerebras_delta(chunk):
+        """Text carried by a streamed Cerebras chunk, if any"""
+        choices = getattr(chunk, 'choices', None)
+        if not choices:
+            return None
+        return getattr(getattr(choices[0], 'delta', None), 'content', None)
+
+    @classmethod
+    def _open_stream(cls, prompt):
+        if cls.client is None:
+            cls.initialize_client()
+        
         if cls.__LLM_MODEL == "llama":
-            cls.client = LlamaAPIClient(api_key=api_key)
+            stream = cls.client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=cls.MODELS["llama"],
+                stream=True,
+            )
+            return (cls._llama_delta(chunk) for chunk in stream)
         elif cls.__LLM_MODEL == "cerebras":
-            cls.client = Cerebras(api_key=api_key)
+            stream = cls.client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=cls.MODELS["cerebras"],
+                stream=True,
+            )
+            return (cls._cerebras_delta(chunk) for chunk in stream)
 
     @classmethod
-    def inference(cls, prompt, debug=False):
-        # Get current timestamp and increment counter atomically
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-        call_number = cls._increment_counter()
+    def stream_inference(cls, prompt, debug=False, cache=None):
+        """
+        Stream the completion of a prompt as it is generated.
+        Yields text deltas; time to first token and total time are logged for every call.
+        Opening the stream is retried like inference; errors after the first token are not.
+        A cached response is yielded in one piece.
         
-        # Log the API call
-        logger.info(f"LLM API Call #{call_number} at {timestamp}")
-        logger.debug(f"Prompt: {prompt[:200]}...")  # Log first 200 chars of prompt
+        Raises:
+            LLMRequestError: if the call fails for good
+        """
+        response_cache = cls._get_response_cache(cache)
+        cache_key = cls._cache_key(prompt, stream=True)
+        cached = cls._cached_response(response_cache, cache_key, "stream")
+        if cached is not MISS:
+            yield cached
+            return
+        
+        call_number = cls._start_call(prompt, streaming=True)
+        start = time.perf_counter()
+        for attempt in range(ENV_CONFIG['llm_max_retries'] + 1):
+            cls._rate_limiter().acquire()
+            attempt_start = time.perf_counter()
+            try:
+                deltas = cls._open_stream(prompt)
+                break
+            except Exception as e:
+                time.sleep(cls._handle_failure(call_number, attempt, e, "stream", time.perf_counter() - attempt_start))
         
+        first_token_at = None
+        parts = []
         try:
-            
-            if cls.client is None:
-                cls.initialize_client()
-            
-            # Extract the content from the response
-            if cls.__LLM_MODEL == "llama":
-                response = cls.client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt,
-                            "response_format": {
-                                "type": "json_schema",
-                                "json_schema": {
-                                    "schema": {
-                                        "type": "object"
-                                    }
-                                }
-                            }
-                        }
-                    ],
-                    model="Llama-4-Maverick-17B-128E-Instruct-FP8",
-                    
-                )
-                # Print raw response for debugging
-                if debug:
-                    print("Raw response:\n\n\n", response)
-
-                if hasattr(response, 'completion_message') and hasattr(response.completion_message, 'content'):
-                    content = response.completion_message.content
-                    if hasattr(content, 'text'):
-                        # If the content is JSON, parse it
-                        try:
-                            return json.loads(content.text)
-                        except json.JSONDecodeError:
-                            # If not JSON, return the raw text
-                            return content.text
-                    return content
-                else:
-                    print("Warning: Unexpected response format")
-                    return str(response)
-            elif cls.__LLM_MODEL == "cerebras":
-                response = cls.client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt,
-                        }
-                ],
-                    model="llama-4-scout-17b-16e-instruct",
-                )
-                # Print raw response for debugging
+            for text in deltas:
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    logger.info(f"LLM API Call #{call_number} time to first token: {first_token_at - start:.3f} seconds")
+                    metrics.record_time_to_first_token(cls._provider(), first_token_at - start)
                 if debug:
-                    print("Raw response:\n\n\n", response)
-
-                if (hasattr(response, 'choices') and len(response.choices) > 0 
-                        and hasattr(response.choices[0], 'message') 
-                        and hasattr(response.choices[0].message, 'content')):
-                    content = response.choices[0].message.content
-                    return content
-                else:
-                    print("Warning: Unexpected response format")
-                    return str(response)
+                    print(text, end="", flush=True)
+                parts.append(text)
+                yield text
         except Exception as e:
-            error_msg = f"Error in inference: {str(e)}"
-            logger.error(f"LLM API Call #{call_number} failed: {error_msg}")
-            return error_msg
\ No newline at end of file
+            error = LLMRequestError.from_exception(e)
+            metrics.record_llm_call(cls._provider(), "stream", "error", time.perf_counter() - start)
+            logger.error(f"LLM API Call #{call_number} failed while streaming: {error}")
+            raise error from e
+        logger.info(f"LLM API Call #{call_number} streamed in {time.perf_counter() - start:.3f} seconds")
+        metrics.record_llm_call(cls._provider(), "stream", "success", time.perf_counter() - start)
+        cls._store_response(response_cache, cache_key, "".join(parts))
\ No newline at end of file
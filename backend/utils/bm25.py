@@ -0,0 +1,156 @@
+# bm25.py
+# Incremental BM25 inverted index over ideas
+# Documents are keyed by the same point IDs as the Qdrant collection, so the
+# index is updated in step with it and saved next to it on disk
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from .db_log import setup_logger
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their "
+    "there these this those to was were which while with what when where who why how do does".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric terms of a text, without stopwords"""
+    return [term for term in _TOKEN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a changing set of documents.
+
+    Postings are updated in place when documents are added or removed, and the
+    corpus statistics (document count and average length) are kept as running
+    totals, so neither operation touches the other documents.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc_id: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_lengths
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index a document, replacing any earlier version with the same ID"""
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+        terms = tokenize(text)
+        for term, count in Counter(terms).items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        self.doc_lengths[doc_id] = len(terms)
+        self.total_length += len(terms)
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a document; unknown IDs are ignored"""
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in list(self.postings):
+            docs = self.postings[term]
+            if docs.pop(doc_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def remove_many(self, doc_ids: Iterable[str]) -> None:
+        """Drop several documents in one pass over the postings"""
+        doc_ids = {doc_id for doc_id in doc_ids if doc_id in self.doc_lengths}
+        if not doc_ids:
+            return
+        for doc_id in doc_ids:
+            self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for doc_id in doc_ids.intersection(docs):
+                del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+    def clear(self) -> None:
+        self.postings.clear()
+        self.doc_lengths.clear()
+        self.total_length = 0
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """BM25 score of every document that shares a term with the query"""
+        num_docs = len(self.doc_lengths)
+        if num_docs == 0:
+            return {}
+        average_length = self.total_length / num_docs or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1.0 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, frequency in docs.items():
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+        return scores
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """
+        Score the documents that share a term with the query.
+
+        Args:
+            query: Query text
+            limit: Number of results to return
+
+        Returns:
+            (doc_id, score) pairs, best first
+        """
+        return heapq.nlargest(limit, self.scores(query).items(), key=lambda item: item[1])
+
+    def save(self, path: str) -> None:
+        """Write the index to a JSON file, atomically"""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        data = {"k1": self.k1, "b": self.b, "doc_lengths": self.doc_lengths, "postings": self.postings}
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Read an index written by save(); a missing or unreadable file gives an empty index"""
+        index = cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return index
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read BM25 index {path}, starting empty: {e}")
+            return index
+        index.k1, index.b = data["k1"], data["b"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = data["postings"]
+        index.total_length = sum(index.doc_lengths.values())
+        return index
@@ -0,0 +1,186 @@
+# chunker.py
+# Single-pass text chunking
+# The split patterns are compiled once per chunker. A chunk is always a contiguous
+# slice of the normalized page text, so it is tracked as a pair of offsets and
+# sliced out once when emitted instead of being built by string concatenation.
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Patterns a chunk may end on
+SECTION_BREAKS = [
+    r'\n\s*\n',  # Double newlines
+    r'\.\s+(?=[A-Z])',  # Period followed by capital letter
+    r'[!?]\s+',  # Exclamation or question mark
+    r'\n(?=\d+\.\s)',  # Numbered lists
+    r'\n(?=[A-Z]\.\s)',  # Lettered lists
+    r'\n(?=•|\-|\*)',  # Bullet points
+]
+
+# Discourse markers a chunk may end on
+SEMANTIC_MARKERS = [
+    r'First,|Second,|Third,|Finally,',
+    r'In conclusion,|To summarize,|In summary,',
+    r'However,|Moreover,|Furthermore,|Additionally,',
+    r'For example,|Specifically,|In particular,',
+    r'On the other hand,|In contrast,',
+    r'Therefore,|Thus,|Hence,',
+]
+
+# Every default pattern starts with one of these characters. Checking it first lets the
+# regex engine skip most positions without trying each alternative.
+_DEFAULT_FIRST_CHARS = '\n.!?FSTIHMAO'
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse whitespace runs to single spaces and strip; same result as re.sub(r'\s+', ' ', text).strip()"""
+    return ' '.join(text.split())
+
+
+class StreamingChunker:
+    """
+    Splits page text into chunks of at most max_chunk_size characters, ending on a
+    section break or semantic marker where possible.
+
+    A piece of text runs up to and including the next boundary pattern. Pieces are
+    appended to the current chunk until the next one would push it past
+    max_chunk_size; the chunk is then emitted if it has at least min_chunk_size
+    characters (and dropped otherwise), and the piece starts a new chunk. A single
+    piece longer than max_chunk_size becomes a chunk of its own.
+    """
+
+    def __init__(self, min_chunk_size: int, max_chunk_size: int,
+                 section_breaks: Optional[List[str]] = None, semantic_markers: Optional[List[str]] = None):
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        section_breaks = SECTION_BREAKS if section_breaks is None else section_breaks
+        semantic_markers = SEMANTIC_MARKERS if semantic_markers is None else semantic_markers
+        self.section_breaks = list(section_breaks)
+        self.semantic_markers = list(semantic_markers)
+        pattern = '|'.join(section_breaks + semantic_markers)
+        if section_breaks == SECTION_BREAKS and semantic_markers == SEMANTIC_MARKERS:
+            pattern = f'(?=[{re.escape(_DEFAULT_FIRST_CHARS)}])(?:{pattern})'
+        self.boundary = re.compile(pattern)
+
+    def config(self) -> Tuple:
+        """Arguments that rebuild an equivalent chunker, e.g. in a worker process"""
+        return (self.min_chunk_size, self.max_chunk_size, tuple(self.section_breaks), tuple(self.semantic_markers))
+
+    def _chunk(self, text: str, final: bool = True) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Find the chunk boundaries in normalized text.
+
+        Args:
+            text: Whitespace-normalized text
+            final: Emit the last chunk; otherwise it is left open for more text
+
+        Returns:
+            (start, end) offsets of the emitted chunks, and the offset where the open chunk starts
+        """
+        spans = []
+        start = end = 0
+        max_size, min_size = self.max_chunk_size, self.min_chunk_size
+        for match in self.boundary.finditer(text):
+            boundary = match.end()
+            if boundary == end:
+                continue
+            if boundary - start > max_size and end > start:
+                if end - start >= min_size:
+                    spans.append((start, end))
+                start = end
+            end = boundary
+        if len(text) > end:
+            if len(text) - start > max_size and end > start:
+                if end - start >= min_size:
+                    spans.append((start, end))
+                start = end
+            end = len(text)
+        if final:
+            if end > start and end - start >= min_size:
+                spans.append((start, end))
+            start = end
+        return spans, start
+
+    @staticmethod
+    def _make_chunk(text: str, start: int, end: int, source: str, page: int) -> Dict:
+        return {
+            'text': text[start:end].strip(),
+            'type': 'section',
+            'size': end - start,
+            'source': source,
+            'page': page
+        }
+
+    def chunk_text(self, text: str, source: str = 'unknown', page: int = 0) -> List[Dict]:
+        """
+        Split the text of one page into chunks.
+
+        Args:
+            text: Raw page text
+            source: Source the page came from
+            page: Page number
+
+        Returns:
+            List of chunk dictionaries with text, type, size, source and page
+        """
+        text = normalize_whitespace(str(text))
+        if not text:
+            return []
+        spans, _ = self._chunk(text)
+        return [self._make_chunk(text, start, end, source, page) for start, end in spans]
+
+    def iter_chunks(self, pages: Iterable, across_pages: bool = False) -> Iterator[Dict]:
+        """
+        Chunk a stream of pages lazily.
+
+        Args:
+            pages: Page dictionaries with 'text', 'source' and 'page', or plain strings
+            across_pages: Carry the unfinished chunk at the end of a page over to the
+                next page of the same source, so text broken by a page break stays in
+                one chunk; it is attributed to the page it started on. When False every
+                page is chunked on its own, exactly like chunk_text.
+
+        Yields:
+            Chunk dictionaries in page order
+        """
+        carry, carry_source, carry_page = "", None, 0
+        for index, page_info in enumerate(pages):
+            if isinstance(page_info, dict):
+                text = page_info.get('text', '')
+                source = page_info.get('source', 'unknown')
+                page = page_info.get('page', index)
+            else:
+                text, source, page = page_info, 'unknown', index
+
+            if not across_pages:
+                yield from self.chunk_text(text, source, page)
+                continue
+
+            text = normalize_whitespace(str(text))
+            if carry and (carry_source != source or len(carry) > self.max_chunk_size):
+                # A new document starts, or the open chunk can't grow any further
+                yield from self._flush(carry, carry_source, carry_page)
+                carry = ""
+            if carry:
+                offset = len(carry) + 1 if text else len(carry)
+                text = f"{carry} {text}" if text else carry
+            else:
+                offset, carry_page = 0, page
+            if not text:
+                continue
+
+            spans, open_start = self._chunk(text, final=False)
+            for start, end in spans:
+                yield self._make_chunk(text, start, end, source, carry_page if start < offset else page)
+            if open_start < offset:
+                # The open chunk still begins on the carried-over page
+                carry = text[open_start:]
+            else:
+                carry, carry_page = text[open_start:], page
+            carry_source = source
+
+        if carry:
+            yield from self._flush(carry, carry_source, carry_page)
+
+    def _flush(self, text: str, source: str, page: int) -> List[Dict]:
+        spans, _ = self._chunk(text)
+        return [self._make_chunk(text, start, end, source, page) for start, end in spans]
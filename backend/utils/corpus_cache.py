@@ -0,0 +1,274 @@
+# corpus_cache.py
+# Indexed corpora, reused across requests
+# A corpus is the set of PDFs of a request. Its fingerprint covers the contents of
+# the files and the settings their ideas and vectors depend on, and names both its
+# collection and a JSON record of its ideas, quotations and clusters. A follow-up
+# prompt on the same corpus loads the record and goes straight to retrieval.
+# Records are touched on use; the least recently used corpora are dropped, with
+# their collections, once there are more than CORPUS_MAX_COLLECTIONS of them or
+# they take more than CORPUS_MAX_MB.
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .Database import Idea
+from .chunker import StreamingChunker
+from .db_log import setup_logger
+from .extraction_cache import file_digest
+from .vector_store import InMemoryVectorStore, VectorStore
+from .vectorize import (EMBEDDING_MODEL_NAME, QDRANT_PATH, bm25_path, drop_collection, get_model,
+                        open_vector_store)
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# Bump when the record format or the way ideas are built changes
+CORPUS_VERSION = "v1"
+
+
+def corpus_fingerprint(sources: List[str], chunker: StreamingChunker) -> str:
+    """
+    Fingerprint of a corpus: the digests of its files, in any order, and the chunking,
+    idea extraction and embedding settings.
+
+    Args:
+        sources: Paths of the PDFs
+        chunker: The chunker the PDFs are split with
+
+    Returns:
+        Hex digest string
+    """
+    settings = {
+        "version": CORPUS_VERSION,
+        "files": sorted(file_digest(source) for source in sources),
+        "chunker": list(chunker.config()),
+        "chunking_mode": ENV_CONFIG['chunking_mode'],
+        "semantic_breakpoint_percentile": ENV_CONFIG['semantic_breakpoint_percentile'],
+        "llm_model": ENV_CONFIG['llm_model'],
+        "idea_extraction_mode": ENV_CONFIG['idea_extraction_mode'],
+        "embedding_model": EMBEDDING_MODEL_NAME,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def collection_name(fingerprint: str) -> str:
+    """Name of the collection holding a corpus"""
+    return f"ideas_{fingerprint[:16]}"
+
+
+def clustering_key() -> List:
+    """Settings the clusters of a corpus depend on"""
+    return [int(os.getenv('K_MEANS_CLUSTERS')), ENV_CONFIG['k_means_seed'], ENV_CONFIG['k_means_n_init'],
+            ENV_CONFIG['k_means_minibatch_threshold'], ENV_CONFIG['k_means_batch_size']]
+
+
+class Corpus:
+    """The ideas of an indexed corpus, with its store, quotations and clusters"""
+
+    def __init__(self, fingerprint: str, store: VectorStore, ideas: List[Idea], quotations: Dict[int, str],
+                 clusters: Optional[Dict[int, List[Idea]]], centroids: Optional[np.ndarray]):
+        self.fingerprint = fingerprint
+        self.store = store
+        self.ideas = ideas
+        self.quotations = quotations
+        # None if the clustering settings changed since the corpus was saved
+        self.clusters = clusters
+        self.centroids = centroids
+
+
+class CorpusCache:
+    """
+    Records of indexed corpora, one JSON file each, named by the corpus fingerprint.
+
+    Use a corpus inside lease(): concurrent requests for the same corpus wait for the
+    one building it and then load it, and a leased corpus is never evicted.
+    """
+    # Per corpus lock and lease count, kept while the corpus is leased
+    _locks: Dict[str, Lock] = {}
+    _leases: Counter = Counter()
+    _state_lock = Lock()
+    # One eviction at a time; leases are not held up by it
+    _evict_lock = Lock()
+
+    def __init__(self, directory: Optional[str] = None, max_collections: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.directory = Path(directory or os.path.join(QDRANT_PATH, "corpora"))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_collections = max_collections or ENV_CONFIG['corpus_max_collections']
+        self.max_bytes = max_bytes or ENV_CONFIG['corpus_max_mb'] * 1024 * 1024
+
+    def _record_path(self, fingerprint: str) -> Path:
+        return self.directory / f"{fingerprint}.json"
+
+    def _take_lease(self, fingerprint: str) -> Lock:
+        """Count a lease on a corpus; call with _state_lock held"""
+        self._leases[fingerprint] += 1
+        return self._locks.setdefault(fingerprint, Lock())
+
+    def _drop_lease(self, fingerprint: str) -> None:
+        with self._state_lock:
+            self._leases[fingerprint] -= 1
+            if not self._leases[fingerprint]:
+                del self._leases[fingerprint]
+                del self._locks[fingerprint]
+
+    @contextmanager
+    def lease(self, fingerprint: str):
+        """Hold a corpus: one request at a time loads or builds it, and it is not evicted meanwhile"""
+        with self._state_lock:
+            lock = self._take_lease(fingerprint)
+        try:
+            with lock:
+                yield
+        finally:
+            self._drop_lease(fingerprint)
+
+    def load(self, fingerprint: str) -> Optional[Corpus]:
+        """
+        Look up an indexed corpus.
+
+        Args:
+            fingerprint: From corpus_fingerprint()
+
+        Returns:
+            The corpus, or None if it was never saved or its collection is gone
+            (e.g. an in-memory one after a restart)
+        """
+        record_path = self._record_path(fingerprint)
+        try:
+            with open(record_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read corpus record {record_path.name}: {e}")
+            return None
+
+        store = open_vector_store(record["collection"], record["backend"])
+        if not store.is_compatible(get_model().get_sentence_embedding_dimension()) \
+                or len(store) != record["points"]:
+            logger.info(f"Collection {record['collection']} of corpus {fingerprint[:16]} is gone, rebuilding it")
+            return None
+        os.utime(record_path)
+
+        ideas = [Idea(idea["point"], idea["chunk_id"], idea["quotation_id"], idea["quotation"], idea["sources"])
+                 for idea in record["ideas"]]
+        quotations = {int(quotation_id): text for quotation_id, text in record["quotations"].items()}
+        clusters, centroids = None, None
+        if record["clustering_key"] == clustering_key():
+            clusters = {int(cluster_id): [] for cluster_id in record["centroids"]}
+            for idea, label in zip(ideas, record["labels"]):
+                clusters[label].append(idea)
+            centroids = np.asarray(list(record["centroids"].values()), dtype=np.float32)
+        logger.info(f"Reusing corpus {fingerprint[:16]}: {len(ideas)} ideas in {store.name}")
+        return Corpus(fingerprint, store, ideas, quotations, clusters, centroids)
+
+    def save(self, corpus: Corpus) -> None:
+        """Record an indexed corpus, then evict the least recently used ones over the limits"""
+        labels = {id(idea): cluster_id for cluster_id, ideas in corpus.clusters.items() for idea in ideas}
+        record = {
+            "fingerprint": corpus.fingerprint,
+            "collection": corpus.store.name,
+            "backend": "memory" if isinstance(corpus.store, InMemoryVectorStore) else "qdrant",
+            "points": len(corpus.store),
+            "dim": get_model().get_sentence_embedding_dimension(),
+            "sources": sorted({os.path.basename(source) for idea in corpus.ideas for source in idea.sources}),
+            "created_at": time.time(),
+            "ideas": [
+                {"point": idea.main_point, "chunk_id": idea.chunk_id, "quotation_id": idea.quotation_id,
+                 "quotation": idea.quotation, "sources": idea.sources}
+                for idea in corpus.ideas
+            ],
+            "quotations": {str(quotation_id): text for quotation_id, text in corpus.quotations.items()},
+            "clustering_key": clustering_key(),
+            "labels": [labels[id(idea)] for idea in corpus.ideas],
+            # Keyed by cluster ID, so that clusters left empty by k-means keep their IDs
+            "centroids": {str(cluster_id): centroid.tolist()
+                          for cluster_id, centroid in zip(corpus.clusters, corpus.centroids)},
+        }
+        record_path = self._record_path(corpus.fingerprint)
+        # Write to a temporary file first so concurrent readers never see a partial record
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, record_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _footprint(self, record_path: Path, record: dict) -> int:
+        """Bytes taken by a corpus: its record, its BM25 index and its vectors"""
+        size = record_path.stat().st_size
+        collection = record["collection"]
+        if os.path.exists(bm25_path(collection)):
+            size += os.path.getsize(bm25_path(collection))
+        collection_dir = Path(QDRANT_PATH) / "collection" / collection
+        if record["backend"] == "qdrant" and collection_dir.is_dir():
+            size += sum(path.stat().st_size for path in collection_dir.rglob("*") if path.is_file())
+        else:
+            size += record["points"] * record["dim"] * np.dtype(np.float32).itemsize
+        return size
+
+    def entries(self) -> List[Tuple[int, int, Path, dict]]:
+        """(last use, bytes, record path, record) of every corpus, least recently used first"""
+        entries = []
+        for record_path in self.directory.glob("*.json"):
+            try:
+                last_used = record_path.stat().st_mtime_ns
+                with open(record_path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                entries.append((last_used, self._footprint(record_path, record), record_path, record))
+            except (OSError, ValueError):
+                continue
+        return sorted(entries, key=lambda entry: entry[0])
+
+    def _reserve(self, fingerprint: str) -> bool:
+        """Lease a corpus for eviction, unless a request holds it"""
+        with self._state_lock:
+            if fingerprint in self._leases:
+                return False
+            # Nobody else holds the lock of an unleased corpus; requests arriving
+            # meanwhile wait on it and then find the corpus gone
+            self._take_lease(fingerprint).acquire()
+            return True
+
+    def evict(self) -> None:
+        """Drop least recently used corpora, except leased ones, until both limits are met"""
+        with self._evict_lock:
+            entries = self.entries()
+            total = sum(size for _, size, _, _ in entries)
+            count = len(entries)
+            for _, size, record_path, record in entries:
+                if count <= self.max_collections and total <= self.max_bytes:
+                    break
+                fingerprint = record["fingerprint"]
+                if not self._reserve(fingerprint):
+                    continue
+                try:
+                    drop_collection(record["collection"], record["backend"])
+                    record_path.unlink()
+                except (OSError, RuntimeError, ValueError) as e:
+                    logger.warning(f"Could not evict corpus {fingerprint[:16]}: {e}")
+                    continue
+                finally:
+                    self._locks[fingerprint].release()
+                    self._drop_lease(fingerprint)
+                count -= 1
+                total -= size
+                logger.info(f"Evicted corpus {fingerprint[:16]} ({record['collection']}, "
+                            f"{size / 1024 / 1024:.1f} MB)")
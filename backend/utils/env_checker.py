@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 from enum import Enum
@@ -75,6 +76,13 @@ def _validate_chunk_size(value: str) -> bool:
     except ValueError:
         return False
 
+def _validate_positive_number(value: str) -> bool:
+    """Validate a positive (possibly fractional) number"""
+    try:
+        return float(value) > 0
+    except ValueError:
+        return False
+
 def _validate_cluster_count(value: str) -> bool:
     """Validate cluster count value"""
     try:
@@ -108,6 +116,8 @@ def check_environment() -> None:
             details={"original_error": str(e)},
             suggestion="Check file permissions and format"
         )
+    # The .env file may have changed the values parsed so far
+    get_environment_config.cache_clear()
     
     # Get debug mode first as it affects which variables are required
     debug_mode = os.getenv('DEBUG', 'true').lower()
@@ -136,6 +146,26 @@ def check_environment() -> None:
             'validator': lambda x: bool(x and len(x) > 0),
             'error_msg': "QDRANT_API_KEY cannot be empty if provided"
         },
+        'QDRANT_MODE': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['local', 'server'],
+            'error_msg': "QDRANT_MODE must be 'local' or 'server'"
+        },
+        'QDRANT_PREFER_GRPC': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['true', 'false'],
+            'error_msg': "QDRANT_PREFER_GRPC must be 'true' or 'false'"
+        },
+        'QDRANT_GRPC_PORT': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "QDRANT_GRPC_PORT must be a positive integer"
+        },
+        'QDRANT_TIMEOUT': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "QDRANT_TIMEOUT must be a positive integer (seconds)"
+        },
         'MEMORY_LIMIT_GB': {
             'required': False,
             'validator': _validate_memory_limit,
@@ -166,10 +196,180 @@ def check_environment() -> None:
             'validator': _validate_chunk_size,
             'error_msg': "MAX_WORKERS_PER_CHUNK must be a positive integer"
         },
+        'CHUNKING_MODE': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['regex', 'semantic'],
+            'error_msg': "CHUNKING_MODE must be 'regex' or 'semantic'"
+        },
+        'SEMANTIC_BREAKPOINT_PERCENTILE': {
+            'required': False,
+            'validator': lambda x: _validate_positive_number(x) and float(x) < 100,
+            'error_msg': "SEMANTIC_BREAKPOINT_PERCENTILE must be a number between 0 and 100"
+        },
         'K_MEANS_CLUSTERS': {
             'required': True,
             'validator': _validate_cluster_count,
             'error_msg': "K_MEANS_CLUSTERS must be an integer greater than 1"
+        },
+        'EXTRACTION_CACHE_MAX_MB': {
+            'required': False,
+            'validator': _validate_memory_limit,
+            'error_msg': "EXTRACTION_CACHE_MAX_MB must be a positive integer"
+        },
+        'IDEA_CACHE_ENABLED': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['true', 'false'],
+            'error_msg': "IDEA_CACHE_ENABLED must be 'true' or 'false'"
+        },
+        'VECTOR_INDEX_MODE': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['incremental', 'rebuild'],
+            'error_msg': "VECTOR_INDEX_MODE must be 'incremental' or 'rebuild'"
+        },
+        'EMBEDDING_BATCH_SIZE': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "EMBEDDING_BATCH_SIZE must be a positive integer"
+        },
+        'K_MEANS_N_INIT': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "K_MEANS_N_INIT must be a positive integer"
+        },
+        'K_MEANS_MINIBATCH_THRESHOLD': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "K_MEANS_MINIBATCH_THRESHOLD must be a positive integer"
+        },
+        'K_MEANS_BATCH_SIZE': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "K_MEANS_BATCH_SIZE must be a positive integer"
+        },
+        'IDEA_EXTRACTION_MODE': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['single', 'packed'],
+            'error_msg': "IDEA_EXTRACTION_MODE must be 'single' or 'packed'"
+        },
+        'IDEA_PACK_TOKEN_BUDGET': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "IDEA_PACK_TOKEN_BUDGET must be a positive integer"
+        },
+        'IDEA_PACK_MAX_CHUNKS': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "IDEA_PACK_MAX_CHUNKS must be a positive integer"
+        },
+        'VECTOR_STORE': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['auto', 'memory', 'qdrant'],
+            'error_msg': "VECTOR_STORE must be 'auto', 'memory' or 'qdrant'"
+        },
+        'VECTOR_STORE_MEMORY_LIMIT': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "VECTOR_STORE_MEMORY_LIMIT must be a positive integer"
+        },
+        'VECTOR_QUANTIZATION': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['none', 'int8', 'binary'],
+            'error_msg': "VECTOR_QUANTIZATION must be 'none', 'int8' or 'binary'"
+        },
+        'QUANTIZATION_OVERSAMPLING': {
+            'required': False,
+            'validator': lambda x: _validate_positive_number(x) and float(x) >= 1,
+            'error_msg': "QUANTIZATION_OVERSAMPLING must be a number of at least 1"
+        },
+        'CORPUS_CACHE_ENABLED': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['true', 'false'],
+            'error_msg': "CORPUS_CACHE_ENABLED must be 'true' or 'false'"
+        },
+        'CORPUS_MAX_COLLECTIONS': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "CORPUS_MAX_COLLECTIONS must be a positive integer"
+        },
+        'CORPUS_MAX_MB': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "CORPUS_MAX_MB must be a positive integer"
+        },
+        'RETRIEVAL_MODE': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['hybrid', 'centroid'],
+            'error_msg': "RETRIEVAL_MODE must be 'hybrid' or 'centroid'"
+        },
+        'RETRIEVAL_TOP_K': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "RETRIEVAL_TOP_K must be a positive integer"
+        },
+        'RETRIEVAL_CANDIDATES': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "RETRIEVAL_CANDIDATES must be a positive integer"
+        },
+        'HYBRID_DENSE_WEIGHT': {
+            'required': False,
+            'validator': lambda x: 0 <= float(x) <= 1,
+            'error_msg': "HYBRID_DENSE_WEIGHT must be a number between 0 and 1"
+        },
+        'PIPELINE_MODE': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['streaming', 'staged'],
+            'error_msg': "PIPELINE_MODE must be 'streaming' or 'staged'"
+        },
+        'PIPELINE_QUEUE_SIZE': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "PIPELINE_QUEUE_SIZE must be a positive integer"
+        },
+        'MAX_CONCURRENT_JOBS': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "MAX_CONCURRENT_JOBS must be a positive integer"
+        },
+        'LLM_MAX_CONCURRENCY': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "LLM_MAX_CONCURRENCY must be a positive integer"
+        },
+        'LLM_RATE_LIMIT_RPS': {
+            'required': False,
+            'validator': _validate_positive_number,
+            'error_msg': "LLM_RATE_LIMIT_RPS must be a positive number"
+        },
+        'LLM_MAX_RETRIES': {
+            'required': False,
+            'validator': lambda x: x.isdigit(),
+            'error_msg': "LLM_MAX_RETRIES must be a non-negative integer"
+        },
+        'LLM_CACHE_ENABLED': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['true', 'false'],
+            'error_msg': "LLM_CACHE_ENABLED must be 'true' or 'false'"
+        },
+        'LLM_CACHE_TTL_SECONDS': {
+            'required': False,
+            'validator': _validate_chunk_size,
+            'error_msg': "LLM_CACHE_TTL_SECONDS must be a positive integer"
+        },
+        'LLM_CACHE_MAX_MB': {
+            'required': False,
+            'validator': _validate_memory_limit,
+            'error_msg': "LLM_CACHE_MAX_MB must be a positive integer"
+        },
+        'METRICS_ENABLED': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['true', 'false'],
+            'error_msg': "METRICS_ENABLED must be 'true' or 'false'"
+        },
+        'WARMUP_ON_STARTUP': {
+            'required': False,
+            'validator': lambda x: x.lower() in ['true', 'false'],
+            'error_msg': "WARMUP_ON_STARTUP must be 'true' or 'false'"
         }
     }
     
@@ -221,10 +421,13 @@ def check_environment() -> None:
     
     logger.info("Environment configuration check completed successfully")
 
+@lru_cache(maxsize=None)
 def get_environment_config() -> Dict[str, Any]:
     """
     Get the current environment configuration.
     Returns a dictionary with all environment settings, properly parsed.
+    The variables are parsed once per process; check_environment() parses them again
+    after loading the .env file. Treat the returned dictionary as read-only.
     """
     def parse_int(var, default=None):
         try:
@@ -233,17 +436,69 @@ def get_environment_config() -> Dict[str, Any]:
         except Exception:
             return default
 
+    def parse_float(var, default=None):
+        try:
+            val = os.getenv(var)
+            return float(val) if val else default
+        except Exception:
+            return default
+
     config = {
         'debug_mode': os.getenv('DEBUG', 'true').lower() == 'true',
         'qdrant_url': os.getenv('QDRANT_URL'),
         'qdrant_api_key': os.getenv('QDRANT_API_KEY'),
+        'qdrant_mode': os.getenv('QDRANT_MODE', 'local').lower(),
+        'qdrant_prefer_grpc': os.getenv('QDRANT_PREFER_GRPC', 'false').lower() == 'true',
+        'qdrant_grpc_port': parse_int('QDRANT_GRPC_PORT', 6334),
+        'qdrant_timeout': parse_int('QDRANT_TIMEOUT'),
         'memory_limit_gb': parse_int('MEMORY_LIMIT_GB'),
         'gpu_memory_limit': parse_int('GPU_MEMORY_LIMIT'),
         'log_level': os.getenv('LOG_LEVEL', 'INFO').upper(),
         'min_chunk_size': parse_int('MIN_CHUNK_SIZE', 100),
         'max_chunk_size': parse_int('MAX_CHUNK_SIZE', 1000),
         'max_workers_per_chunk': parse_int('MAX_WORKERS_PER_CHUNK', 4),
+        'chunking_mode': os.getenv('CHUNKING_MODE', 'regex').lower(),
+        'semantic_breakpoint_percentile': parse_float('SEMANTIC_BREAKPOINT_PERCENTILE', 95.0),
         'llm_model': os.getenv('LLM', 'llama'),
+        'extraction_cache_dir': os.getenv('EXTRACTION_CACHE_DIR'),
+        'extraction_cache_max_mb': parse_int('EXTRACTION_CACHE_MAX_MB', 512),
+        'idea_cache_enabled': os.getenv('IDEA_CACHE_ENABLED', 'true').lower() == 'true',
+        'idea_cache_path': os.getenv('IDEA_CACHE_PATH'),
+        'vector_index_mode': os.getenv('VECTOR_INDEX_MODE', 'incremental').lower(),
+        'embedding_batch_size': parse_int('EMBEDDING_BATCH_SIZE'),
+        'vector_store': os.getenv('VECTOR_STORE', 'auto').lower(),
+        'vector_store_memory_limit': parse_int('VECTOR_STORE_MEMORY_LIMIT', 50000),
+        'vector_quantization': os.getenv('VECTOR_QUANTIZATION', 'none').lower(),
+        'quantization_oversampling': parse_float('QUANTIZATION_OVERSAMPLING', 4.0),
+        'corpus_cache_enabled': os.getenv('CORPUS_CACHE_ENABLED', 'true').lower() == 'true',
+        'corpus_max_collections': parse_int('CORPUS_MAX_COLLECTIONS', 16),
+        'corpus_max_mb': parse_int('CORPUS_MAX_MB', 2048),
+        'k_means_seed': parse_int('K_MEANS_SEED', 0),
+        'k_means_n_init': parse_int('K_MEANS_N_INIT', 4),
+        'k_means_minibatch_threshold': parse_int('K_MEANS_MINIBATCH_THRESHOLD', 20000),
+        'k_means_batch_size': parse_int('K_MEANS_BATCH_SIZE', 4096),
+        'idea_extraction_mode': os.getenv('IDEA_EXTRACTION_MODE', 'single').lower(),
+        'idea_pack_token_budget': parse_int('IDEA_PACK_TOKEN_BUDGET', 6000),
+        'idea_pack_max_chunks': parse_int('IDEA_PACK_MAX_CHUNKS', 8),
+        'retrieval_mode': os.getenv('RETRIEVAL_MODE', 'hybrid').lower(),
+        'retrieval_top_k': parse_int('RETRIEVAL_TOP_K', 10),
+        'retrieval_candidates': parse_int('RETRIEVAL_CANDIDATES', 50),
+        'hybrid_dense_weight': parse_float('HYBRID_DENSE_WEIGHT', 0.5),
+        'pipeline_mode': os.getenv('PIPELINE_MODE', 'streaming').lower(),
+        'pipeline_queue_size': parse_int('PIPELINE_QUEUE_SIZE', 32),
+        'max_concurrent_jobs': parse_int('MAX_CONCURRENT_JOBS', 2),
+        'llm_max_concurrency': parse_int('LLM_MAX_CONCURRENCY', parse_int('MAX_WORKERS_PER_CHUNK', 4)),
+        'llm_rate_limit_rps': parse_float('LLM_RATE_LIMIT_RPS'),
+        'llm_rate_limit_burst': parse_float('LLM_RATE_LIMIT_BURST'),
+        'llm_max_retries': parse_int('LLM_MAX_RETRIES', 4),
+        'llm_backoff_base': parse_float('LLM_BACKOFF_BASE', 0.5),
+        'llm_backoff_max': parse_float('LLM_BACKOFF_MAX', 30.0),
+        'llm_cache_enabled': os.getenv('LLM_CACHE_ENABLED', 'false').lower() == 'true',
+        'llm_cache_path': os.getenv('LLM_CACHE_PATH'),
+        'llm_cache_ttl_seconds': parse_int('LLM_CACHE_TTL_SECONDS', 86400),
+        'llm_cache_max_mb': parse_int('LLM_CACHE_MAX_MB', 256),
+        'metrics_enabled': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+        'warmup_on_startup': os.getenv('WARMUP_ON_STARTUP', 'false').lower() == 'true',
     }
     return config
 
@@ -0,0 +1,183 @@
+# extraction_cache.py
+# On-disk cache for PDF text extraction, keyed by file contents
+# Each entry stores the title and per-page text of one PDF so unchanged files
+# never go through PyPDF2 again
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+
+import PyPDF2
+
+from .db_log import setup_logger
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# Bump when the way pages are extracted or titles are derived changes,
+# so that stale entries are never served
+EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}-v1"
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+class _StatMemo:
+    """Remember file digests by (path, size, mtime) so unchanged files are not re-hashed"""
+    _digests: Dict[str, tuple] = {}
+    _lock = Lock()
+
+    @classmethod
+    def get(cls, path: str, stat: os.stat_result) -> Optional[str]:
+        with cls._lock:
+            entry = cls._digests.get(path)
+        if entry and entry[0] == (stat.st_size, stat.st_mtime_ns):
+            return entry[1]
+        return None
+
+    @classmethod
+    def put(cls, path: str, stat: os.stat_result, digest: str) -> None:
+        with cls._lock:
+            cls._digests[path] = ((stat.st_size, stat.st_mtime_ns), digest)
+
+
+def file_digest(path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest string
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    digest = _StatMemo.get(path, stat)
+    if digest is not None:
+        return digest
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            hasher.update(block)
+    digest = hasher.hexdigest()
+    _StatMemo.put(path, stat, digest)
+    return digest
+
+
+class ExtractionCache:
+    """
+    Content-addressed store of extracted PDF pages.
+
+    Entries live in one JSON file each, named by the digest of the PDF bytes and
+    the extractor version. Reads touch the entry's mtime, which is what eviction
+    uses as the least-recently-used order once the cache grows past max_bytes.
+    """
+    _evict_lock = Lock()
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        if cache_dir is None:
+            cache_dir = ENV_CONFIG['extraction_cache_dir'] or str(Path(__file__).parent.parent / 'cache' / 'extraction')
+        if max_bytes is None:
+            max_bytes = ENV_CONFIG['extraction_cache_max_mb'] * 1024 * 1024
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def key_for(self, source: str) -> str:
+        """Cache key for a PDF: digest of its contents and the extractor version"""
+        return hashlib.sha256(f"{file_digest(source)}:{EXTRACTOR_VERSION}".encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, source: str) -> Optional[List[Dict]]:
+        """
+        Look up the extracted pages of a PDF.
+
+        The entry is read right away: a later put() may evict it.
+
+        Args:
+            source: Path to the PDF
+
+        Returns:
+            List of {'text': str, 'title': str} dictionaries, one per page, or None on a
+            miss (including an entry that was evicted meanwhile or cannot be decoded)
+        """
+        entry_path = self._entry_path(self.key_for(source))
+        try:
+            # Touch the entry so it moves to the back of the eviction order
+            os.utime(entry_path)
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            title = entry["title"]
+            pages = [{'text': text, 'title': title} for text in entry["pages"]]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable extraction cache entry {entry_path.name}: {str(e)}")
+            return None
+        logger.debug(f"Extraction cache hit for {source}")
+        return pages
+
+    def put(self, source: str, pages: List[Dict]) -> None:
+        """
+        Store the extracted pages of a PDF.
+
+        Args:
+            source: Path to the PDF
+            pages: List of {'text': str, 'title': str} dictionaries, one per page
+        """
+        if not pages:
+            return
+        entry = {
+            "source": os.path.basename(source),
+            "extractor_version": EXTRACTOR_VERSION,
+            "title": pages[0]['title'],
+            "pages": [page['text'] or '' for page in pages],
+        }
+        entry_path = self._entry_path(self.key_for(source))
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least-recently-used entries until the cache fits in max_bytes"""
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry_path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = entry_path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, entry_path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    entry_path.unlink()
+                    total -= size
+                    logger.debug(f"Evicted extraction cache entry {entry_path.name}")
+                except FileNotFoundError:
+                    continue
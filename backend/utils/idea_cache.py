@@ -0,0 +1,103 @@
+# idea_cache.py
+# Durable cache of LLM idea extraction results
+# Keyed by the normalized chunk text, the prompt template and the model name,
+# so an unchanged chunk is only ever sent to the LLM once
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .db_log import setup_logger
+from .sqlite_cache import SQLiteCache
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class IdeaCache(SQLiteCache):
+    """
+    SQLite-backed store of (point, quotation) pairs per chunk, shared between the
+    idea-extraction threads and between server processes.
+    """
+    schema = (
+        "CREATE TABLE IF NOT EXISTS ideas ("
+        "key TEXT PRIMARY KEY, "
+        "points TEXT NOT NULL, "
+        "created_at REAL NOT NULL)",
+    )
+
+    def __init__(self, db_path: Optional[str] = None, enabled: Optional[bool] = None):
+        if db_path is None:
+            db_path = ENV_CONFIG['idea_cache_path'] or str(Path(__file__).parent.parent / 'cache' / 'ideas.sqlite3')
+        self.db_path = db_path
+        self.enabled = ENV_CONFIG['idea_cache_enabled'] if enabled is None else enabled
+        if self.enabled:
+            super().__init__(db_path)
+
+    @staticmethod
+    def make_key(chunk_text: str, prompt_template: str, model_name: str) -> str:
+        """
+        Build the cache key for a chunk.
+
+        Args:
+            chunk_text: Raw chunk text; whitespace is collapsed before hashing
+            prompt_template: Template the chunk is inserted into
+            model_name: Provider and model used for extraction
+
+        Returns:
+            Hex digest string
+        """
+        normalized = _WHITESPACE.sub(' ', chunk_text).strip()
+        hasher = hashlib.sha256()
+        for part in (model_name, prompt_template, normalized):
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\x1f")
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Look up the stored points for a chunk.
+
+        Returns:
+            List of {"point": str, "quotation": str} dictionaries, or None on a miss
+        """
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[Dict[str, str]]]]:
+        """
+        Look up the stored points of several chunks over one connection.
+
+        Returns:
+            One entry per key, as get() returns it
+        """
+        if not self.enabled:
+            return [None] * len(keys)
+        with self._connect() as conn:
+            rows = dict(conn.execute(
+                f"SELECT key, points FROM ideas WHERE key IN ({', '.join('?' * len(keys))})", keys
+            ).fetchall())
+        for key in keys:
+            self._count(hit=key in rows)
+        return [json.loads(rows[key]) if key in rows else None for key in keys]
+
+    def put(self, key: str, points: List[Dict[str, str]]) -> None:
+        """Store the points extracted from a chunk"""
+        self.put_many({key: points})
+
+    def put_many(self, points: Dict[str, List[Dict[str, str]]]) -> None:
+        """Store the points extracted from several chunks, by cache key, in one transaction"""
+        if not self.enabled or not points:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ideas (key, points, created_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(chunk_points), now) for key, chunk_points in points.items()]
+            )
@@ -0,0 +1,204 @@
+# jobs.py
+# Background execution of generate() runs
+# A job is submitted, runs in a worker thread, and reports its progress per
+# pipeline stage so that clients can poll or stream it
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+from . import metrics
+from .db_log import setup_logger
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# Pipeline stages in the order generate() runs them
+STAGES = ["extraction", "chunking", "idea_extraction", "indexing", "clustering", "synthesis"]
+
+# Streamed tokens and progress updates are buffered and written to the event log at
+# most this often (or when the log is read), so the log grows with the time a job
+# runs rather than with the number of tokens and items it processes
+EVENT_INTERVAL = 0.1
+
+
+class Job:
+    """
+    A single generate() run and its progress.
+
+    Every progress update is appended to an event log; readers keep the index
+    of the last event they have seen and ask for everything after it. Tokens and
+    progress counts are coalesced over EVENT_INTERVAL; an event is never changed
+    once it is in the log.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        self.job_id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"
+        self.stage = None
+        self.progress = {stage: {"status": "pending", "done": 0, "total": None} for stage in STAGES}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._events: List[Dict[str, Any]] = []
+        # Tokens and the stage with a progress update not yet in the log
+        self._pending_text: List[str] = []
+        self._pending_progress: Optional[str] = None
+        self._flushed_at = 0.0
+        self._lock = Lock()
+
+    def _flush(self) -> None:
+        # Called with self._lock held; write out the buffered tokens and progress
+        if self._pending_text:
+            self._events.append({"type": "token", "text": "".join(self._pending_text)})
+            self._pending_text = []
+        if self._pending_progress is not None:
+            stage, self._pending_progress = self._pending_progress, None
+            self._events.append({"type": "progress", "time": time.time(), "stage": stage,
+                                 "done": self.progress[stage]["done"], "total": self.progress[stage]["total"]})
+        self._flushed_at = time.monotonic()
+
+    def _flush_if_due(self) -> None:
+        # Called with self._lock held
+        if time.monotonic() - self._flushed_at >= EVENT_INTERVAL:
+            self._flush()
+
+    def _emit(self, event_type: str, **data) -> None:
+        # Called with self._lock held; buffered events go first, to keep the order
+        self._flush()
+        self._events.append({"type": event_type, "time": time.time(), **data})
+
+    def report(self, stage: str, done: Optional[int] = None, total: Optional[int] = None) -> None:
+        """
+        Record progress for a pipeline stage. Moving on to a new stage completes the previous one.
+
+        Args:
+            stage: One of STAGES
+            done: Number of items of the stage finished so far
+            total: Number of items the stage will process
+        """
+        with self._lock:
+            if stage != self.stage:
+                if self.stage is not None:
+                    self.progress[self.stage]["status"] = "completed"
+                    self._emit("stage_completed", stage=self.stage)
+                self.stage = stage
+                self.progress[stage]["status"] = "running"
+                self._emit("stage_started", stage=stage)
+            if done is not None:
+                self.progress[stage]["done"] = done
+            if total is not None:
+                self.progress[stage]["total"] = total
+            if done is not None or total is not None:
+                self._pending_progress = stage
+                if self.progress[stage]["done"] == self.progress[stage]["total"]:
+                    self._flush()
+                else:
+                    self._flush_if_due()
+
+    def emit_token(self, text: str) -> None:
+        """Record a piece of the streamed synthesis response"""
+        with self._lock:
+            self._pending_text.append(text)
+            self._flush_if_due()
+
+    def _start(self) -> None:
+        with self._lock:
+            self.status = "running"
+            self._emit("status", status=self.status)
+
+    def _finish(self, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            if self.stage is not None and error is None:
+                self.progress[self.stage]["status"] = "completed"
+                self._emit("stage_completed", stage=self.stage)
+            elif self.stage is not None:
+                self.progress[self.stage]["status"] = "failed"
+            self.result = result
+            self.error = error
+            self.status = "failed" if error is not None else "completed"
+            self.finished_at = time.time()
+            self._emit("status", status=self.status, error=error)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def events_since(self, index: int) -> List[Dict[str, Any]]:
+        """Return the events recorded after the first `index` ones"""
+        with self._lock:
+            self._flush()
+            return self._events[index:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status snapshot without the result"""
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": {stage: dict(info) for stage, info in self.progress.items()},
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps the most recent ones for lookup.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_jobs: int = 100):
+        self.max_workers = max_workers or ENV_CONFIG['max_concurrent_jobs']
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = Lock()
+
+    def submit(self, fn: Callable[..., Any], **params) -> Job:
+        """
+        Queue fn(**params, progress=job.report, on_token=job.emit_token) for execution.
+
+        Returns:
+            The new Job
+        """
+        job = Job(params)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn)
+        logger.info(f"Queued job {job.job_id}")
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any]) -> None:
+        job._start()
+        try:
+            # Spans recorded by fn are tagged with the job ID
+            with metrics.trace_request(job.job_id):
+                result = fn(**job.params, progress=job.report, on_token=job.emit_token)
+        except Exception as e:
+            logger.exception(f"Job {job.job_id} failed")
+            job._finish(error=str(e))
+            return
+        job._finish(result=result)
+        logger.info(f"Job {job.job_id} completed in {job.finished_at - job.created_at:.1f} seconds")
+
+    def _prune(self) -> None:
+        # Called with self._lock held; drop the oldest finished jobs beyond max_jobs
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,248 @@
+# metrics.py
+# Lightweight tracing and Prometheus metrics for the pipeline
+# Spans time the pipeline stages of a request and feed latency histograms;
+# render_prometheus() produces the text served on /metrics.
+# With METRICS_ENABLED=false every span is a shared no-op context manager.
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from .db_log import setup_logger
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+ENABLED = ENV_CONFIG['metrics_enabled']
+
+# Histogram buckets in seconds, from single embeddings to multi-minute LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple, float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', repr(float(bound))),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("pipeline_stage_duration_seconds", "Wall time of a pipeline stage")
+STAGE_ITEMS = Counter("pipeline_stage_items_total", "Items processed by a pipeline stage")
+REQUEST_SECONDS = Histogram("pipeline_request_duration_seconds", "Wall time of a whole generate() run")
+REQUESTS = Counter("pipeline_requests_total", "generate() runs by outcome")
+LLM_SECONDS = Histogram("llm_request_duration_seconds", "Latency of a single LLM API call")
+LLM_REQUESTS = Counter("llm_requests_total", "LLM API calls by outcome")
+LLM_TTFT_SECONDS = Histogram("llm_time_to_first_token_seconds", "Time to the first streamed token of an LLM call")
+
+REGISTRY = [STAGE_SECONDS, STAGE_ITEMS, REQUEST_SECONDS, REQUESTS, LLM_SECONDS, LLM_REQUESTS, LLM_TTFT_SECONDS]
+
+
+class Trace:
+    """Spans recorded for one request, in the order they finished"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.depth = 0
+        self.started = 0
+        # (start order, depth, name, seconds, tags)
+        self.spans: List[Tuple[int, int, str, float, Dict]] = []
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+
+class _Span:
+    __slots__ = ("name", "tags", "start", "order", "depth", "trace")
+
+    def __init__(self, name: str, tags: Dict):
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.order = self.trace.started
+            self.depth = self.trace.depth
+            self.trace.started += 1
+            self.trace.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def tag(self, **tags) -> None:
+        """Add tags once they are known, e.g. output sizes"""
+        self.tags.update(tags)
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(duration, stage=self.name)
+        for key, value in self.tags.items():
+            if isinstance(value, int) and not isinstance(value, bool):
+                STAGE_ITEMS.inc(value, stage=self.name, kind=key)
+        if self.trace is not None:
+            self.trace.depth -= 1
+            self.trace.spans.append((self.order, self.depth, self.name, duration, self.tags))
+        return False
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def tag(self, **tags) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **tags):
+    """
+    Time a pipeline stage.
+
+    Args:
+        name: Stage name, used as the `stage` label
+        **tags: Input sizes and other details; integer tags are also counted in pipeline_stage_items_total
+
+    Returns:
+        Context manager whose tag() method adds more tags before the span ends
+    """
+    if not ENABLED:
+        return _NOOP_SPAN
+    return _Span(name, tags)
+
+
+@contextmanager
+def trace_request(request_id: Optional[str] = None):
+    """
+    Group the spans of one request and log them as a tree when it ends.
+    Reuses the active trace if there already is one (e.g. one started for a job).
+
+    Yields:
+        The request ID
+    """
+    active = _current_trace.get()
+    if not ENABLED or active is not None:
+        yield active.request_id if active is not None else (request_id or uuid.uuid4().hex)
+        return
+
+    trace = Trace(request_id or uuid.uuid4().hex)
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield trace.request_id
+        status = "success"
+    finally:
+        _current_trace.reset(token)
+        duration = time.perf_counter() - start
+        REQUEST_SECONDS.observe(duration)
+        REQUESTS.inc(status=status)
+        _log_trace(trace, duration, status)
+
+
+def _log_trace(trace: Trace, duration: float, status: str) -> None:
+    # Spans are recorded when they end, so children come before their parents;
+    # order them by start to print the tree top-down
+    lines = [f"Trace {trace.request_id} ({status}): {duration:.3f}s"]
+    for _, depth, name, span_duration, tags in sorted(trace.spans, key=lambda entry: entry[0]):
+        details = " ".join(f"{key}={value}" for key, value in tags.items())
+        lines.append(f"{'  ' * (depth + 1)}{name}: {span_duration:.3f}s {details}".rstrip())
+    logger.info("\n".join(lines))
+
+
+def record_llm_call(provider: str, mode: str, outcome: str, seconds: Optional[float] = None) -> None:
+    """
+    Count one LLM API attempt.
+
+    Args:
+        provider: LLM provider name
+        mode: "sync", "async" or "stream"
+        outcome: "success", "retry", "error" or "cache_hit"
+        seconds: Latency of the attempt, if it reached the provider
+    """
+    if not ENABLED:
+        return
+    LLM_REQUESTS.inc(provider=provider, mode=mode, outcome=outcome)
+    if seconds is not None:
+        LLM_SECONDS.observe(seconds, provider=provider, mode=mode)
+
+
+def record_time_to_first_token(provider: str, seconds: float) -> None:
+    if ENABLED:
+        LLM_TTFT_SECONDS.observe(seconds, provider=provider)
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
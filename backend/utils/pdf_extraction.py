@@ -0,0 +1,189 @@
+# pdf_extraction.py
+# Parallel PDF text extraction
+# PyPDF2's extract_text is pure-Python CPU work, so threads serialize on the GIL.
+# Pages are extracted on the shared process pool instead, in page ranges, so a
+# long PDF is spread over every worker and short PDFs don't queue behind it.
+import os
+import threading
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from PyPDF2 import PdfReader
+from tqdm import tqdm
+
+from .db_log import setup_logger
+from .extraction_cache import ExtractionCache
+from . import worker_pool
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+# Page range sizes: a few ranges per worker for load balancing, but not so
+# small that reopening the PDF in a worker dominates
+MIN_PAGES_PER_TASK = 2
+MAX_PAGES_PER_TASK = 32
+RANGES_PER_WORKER = 4
+# Extract in-process when there are no more pages than this
+INLINE_MAX_PAGES = 8
+
+# Last PDF opened by each thread, reused by consecutive ranges of the same file.
+# PdfReader is not thread-safe, and the API process extracts small inputs and
+# counts pages on several threads at once, so every thread keeps its own.
+_readers = threading.local()
+
+
+def pdf_title(reader: Optional[PdfReader], source: str) -> str:
+    """Title from the PDF metadata, or the file name without its .pdf extension"""
+    if reader is not None and reader.metadata and reader.metadata.get('/Title'):
+        return reader.metadata.get('/Title')
+    title = os.path.basename(os.path.normpath(source))
+    if title.lower().endswith('.pdf'):
+        title = title[:-4]
+    return title
+
+
+def _open_reader(source: str) -> PdfReader:
+    stat = os.stat(source)
+    key = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+    if getattr(_readers, "key", None) != key:
+        _readers.key, _readers.reader = None, None
+        _readers.reader = PdfReader(source)
+        _readers.key = key
+    return _readers.reader
+
+
+def _extract_range(task: Tuple[str, int, int]) -> List[str]:
+    """Text of pages [start, stop) of a PDF; a page that fails to extract is empty"""
+    source, start, stop = task
+    reader = _open_reader(source)
+    texts = []
+    for index in range(start, stop):
+        try:
+            texts.append(reader.pages[index].extract_text() or '')
+        except Exception as e:
+            logger.warning(f"Could not extract page {index} of {source}: {str(e)}")
+            texts.append('')
+    return texts
+
+
+def plan_ranges(page_counts: Sequence[int], num_workers: int) -> List[Tuple[int, int, int]]:
+    """
+    Split documents into page ranges.
+
+    The range size depends on the total page count, not on each document, so
+    every task is about the same amount of work whatever the mix of file sizes.
+
+    Args:
+        page_counts: Number of pages of each document
+        num_workers: Number of processes the ranges are spread over
+
+    Returns:
+        (document index, start page, stop page) tuples, in document and page order
+    """
+    total = sum(page_counts)
+    size = total // (max(1, num_workers) * RANGES_PER_WORKER)
+    size = max(MIN_PAGES_PER_TASK, min(MAX_PAGES_PER_TASK, size))
+    return [(doc, start, min(start + size, count))
+            for doc, count in enumerate(page_counts)
+            for start in range(0, count, size)]
+
+
+def iter_pages(sources: Sequence[str], cache: Optional[ExtractionCache] = None, num_workers: int = 1,
+               pool_factory: Optional[Callable[[], Executor]] = None) -> Iterator[Tuple[int, int, Dict]]:
+    """
+    Extract the pages of several PDFs, in parallel when a pool is available.
+
+    All page ranges are submitted up front; pages are yielded in source and page
+    order as soon as every range before them has finished, so the caller can
+    start on the first document while later ones are still being extracted.
+
+    Args:
+        sources: Paths to the PDFs
+        cache: Extraction cache consulted before and filled after extraction
+        num_workers: Number of pool processes, used to size the page ranges
+        pool_factory: Returns the executor to extract on; pages are extracted
+            in-process when it is None or there are only a few pages
+
+    Yields:
+        (source index, page index, {'text': str, 'title': str}) tuples
+    """
+    documents = []
+    for source in sources:
+        cached = None
+        if cache is not None:
+            try:
+                cached = cache.get(source)
+            except OSError as e:
+                logger.warning(f"Extraction cache lookup failed for {source}: {str(e)}")
+        if cached is not None:
+            documents.append({'source': source, 'cached': cached})
+            continue
+        try:
+            reader = _open_reader(source)
+            documents.append({'source': source, 'title': pdf_title(reader, source), 'num_pages': len(reader.pages)})
+        except Exception as e:
+            logger.error(f"Error processing PDF {source}: {str(e)}")
+            documents.append({'source': source, 'cached': [{'text': '', 'title': pdf_title(None, source)}]})
+
+    pending = [i for i, doc in enumerate(documents) if 'cached' not in doc]
+    ranges = plan_ranges([documents[i]['num_pages'] for i in pending], num_workers)
+    tasks = [(documents[pending[doc]]['source'], start, stop) for doc, start, stop in ranges]
+    total_pages = sum(documents[i]['num_pages'] for i in pending)
+
+    futures: List[Optional[Future]] = [None] * len(tasks)
+    pool = None
+    if pool_factory is not None and num_workers > 1 and total_pages > INLINE_MAX_PAGES:
+        pool = pool_factory()
+        logger.info(f"Extracting {total_pages} pages of {len(pending)} PDFs in {len(tasks)} ranges "
+                    f"on {num_workers} processes")
+        futures = [pool.submit(_extract_range, task) for task in tasks]
+
+    def range_texts(task_index: int) -> List[str]:
+        nonlocal pool
+        future = futures[task_index]
+        if future is not None:
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                # A worker died; finish the remaining ranges in this process
+                logger.warning("PDF extraction worker pool broke; extracting the remaining pages in-process")
+                worker_pool.reset_pool(pool)
+                for i in range(task_index, len(futures)):
+                    futures[i] = None
+        return _extract_range(tasks[task_index])
+
+    progress = tqdm(total=total_pages, desc="Extracting PDF pages", unit="page")
+    try:
+        task_index = 0
+        for source_index, doc in enumerate(documents):
+            if 'cached' in doc:
+                for page_index, page in enumerate(doc['cached']):
+                    yield source_index, page_index, page
+                continue
+
+            pages, failed = [], False
+            while len(pages) < doc['num_pages']:
+                start = len(pages)
+                try:
+                    texts = range_texts(task_index)
+                except Exception as e:
+                    logger.error(f"Error processing pages {start}-{tasks[task_index][2]} of {doc['source']}: {str(e)}")
+                    texts, failed = [''] * (tasks[task_index][2] - start), True
+                task_index += 1
+                pages.extend({'text': text, 'title': doc['title']} for text in texts)
+                progress.update(len(texts))
+                for page_index in range(start, len(pages)):
+                    yield source_index, page_index, pages[page_index]
+
+            if cache is not None and not failed:
+                try:
+                    cache.put(doc['source'], pages)
+                except OSError as e:
+                    logger.warning(f"Could not cache extracted text for {doc['source']}: {str(e)}")
+    finally:
+        progress.close()
+        # The caller stopped early; don't leave the pool busy with unneeded ranges
+        for future in futures:
+            if future is not None:
+                future.cancel()
@@ -0,0 +1,234 @@
+# pipeline.py
+# Streaming execution of the ingestion stages of generate()
+# Pages are chunked as soon as they are extracted, chunks go to the LLM as soon
+# as they are merged, and ideas are embedded and indexed as soon as they are
+# extracted. The stages run in their own threads and are connected by bounded
+# queues, so a slow stage holds the ones before it back instead of letting work
+# pile up, and the total time approaches that of the slowest stage.
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .Database import Chunk, Idea
+from .db_log import setup_logger
+from .preprocessing import Preprocessor
+from .vector_store import VectorStore
+from .vectorize import IdeaIndexer
+from . import metrics
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# Marks the end of a stage's output
+_END = object()
+# How often a blocked stage checks whether the pipeline was stopped
+_POLL_SECONDS = 0.1
+
+
+def _put(items: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put an item, waiting for room; returns False if the pipeline was stopped meanwhile"""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(items: queue.Queue, stop: threading.Event):
+    """Take the next item, waiting for one; returns _END if the pipeline was stopped meanwhile"""
+    while not stop.is_set():
+        try:
+            return items.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _END
+
+
+class _StageTimer:
+    """Time a stage spends working, as opposed to waiting on its neighbours"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.items = 0
+
+    def timed(self, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.seconds += time.perf_counter() - start
+                return
+            self.seconds += time.perf_counter() - start
+            self.items += 1
+            yield item
+
+
+def prefetch(iterable: Iterable, maxsize: int, stop: threading.Event, name: str) -> Iterator:
+    """
+    Produce the items of an iterable in a background thread.
+
+    Args:
+        iterable: Items to produce; iterated in the background thread only
+        maxsize: Number of items produced ahead of the consumer at most
+        stop: Set to make the producer give up, e.g. when the consumer failed
+        name: Thread name
+
+    Yields:
+        The items, in order; an exception raised by the producer is re-raised here.
+        Ends early once stop is set.
+    """
+    items = queue.Queue(maxsize=maxsize)
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(items, (item, None), stop):
+                    return
+            _put(items, (_END, None), stop)
+        except BaseException as e:
+            _put(items, (_END, e), stop)
+
+    threading.Thread(target=produce, name=name, daemon=True).start()
+    while True:
+        entry = _get(items, stop)
+        if entry is _END:
+            return
+        item, error = entry
+        if item is _END:
+            if error is not None:
+                raise error
+            return
+        yield item
+
+
+class _IndexStage:
+    """Embeds and indexes batches of ideas in a background thread"""
+
+    def __init__(self, indexer: IdeaIndexer, maxsize: int, stop: threading.Event):
+        self.indexer = indexer
+        self.stop = stop
+        self.timer = _StageTimer()
+        self.error: Optional[BaseException] = None
+        self._items = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="pipeline-index", daemon=True)
+        self._thread.start()
+
+    def submit(self, ideas: List[Idea]) -> None:
+        """Queue the ideas of one chunk, blocking while the queue is full"""
+        if self.error is not None:
+            raise self.error
+        _put(self._items, ideas, self.stop)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                ideas = _get(self._items, self.stop)
+                if ideas is _END:
+                    return
+                # Take whatever else is waiting too; larger batches embed faster
+                batch = list(ideas)
+                done = False
+                while len(batch) < self.indexer.batch_size:
+                    try:
+                        more = self._items.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is _END:
+                        done = True
+                        break
+                    batch.extend(more)
+                start = time.perf_counter()
+                self.indexer.add(batch)
+                self.timer.seconds += time.perf_counter() - start
+                self.timer.items += len(batch)
+                if done:
+                    return
+        except BaseException as e:
+            self.error = e
+            # Nothing else can be indexed; stop the stages feeding this one
+            self.stop.set()
+
+    def close(self) -> None:
+        """Wait for the queued ideas to be indexed"""
+        _put(self._items, _END, self.stop)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def run_streaming(preprocessor: Preprocessor, sources: List[str], chunk_obj: Chunk, debug: bool = False,
+                  progress: Optional[Callable] = None,
+                  collection_name: str = "ideas") -> Tuple[List[Idea], VectorStore, np.ndarray]:
+    """
+    Extract, chunk, extract ideas from and index a set of PDFs as one streaming pipeline.
+
+    Stages overlap, so progress is reported in stage order: extraction when the run
+    starts, chunking when the first chunk is ready, idea_extraction chunk by chunk
+    (its total is known once chunking has finished), and indexing once the last
+    idea has been extracted.
+
+    Args:
+        preprocessor: Preprocessor that extracts and chunks the PDFs
+        sources: Paths of the PDFs
+        chunk_obj: Chunk that extracts the ideas and records their quotations
+        debug: Passed on to the LLM requests
+        progress: progress(stage, done=None, total=None) callback, as in generate()
+        collection_name: Name of the collection to index the ideas into
+
+    Returns:
+        The ideas in chunk order, the collection's VectorStore and one embedding row per idea
+    """
+    report = progress or (lambda stage, done=None, total=None: None)
+    queue_size = ENV_CONFIG['pipeline_queue_size']
+    stop = threading.Event()
+    chunk_timer = _StageTimer()
+
+    def chunk_stream() -> Iterator:
+        for index, chunk in enumerate(chunk_timer.timed(preprocessor.iter_pdf_chunks(sources))):
+            if index == 0:
+                report("chunking")
+            yield chunk
+
+    report("extraction", total=len(sources))
+    logger.info(f"Streaming {len(sources)} PDFs with queues of {queue_size}")
+    with metrics.span("pipeline", pdfs=len(sources)) as span:
+        start = time.perf_counter()
+        index_stage = _IndexStage(IdeaIndexer(collection_name), queue_size, stop)
+        chunks = prefetch(chunk_stream(), queue_size, stop, name="pipeline-chunks")
+
+        def on_done(done: int) -> None:
+            report("idea_extraction", done=done)
+
+        try:
+            ideas = chunk_obj.process_chunk_stream(
+                chunks, debug=debug, on_ideas=index_stage.submit, on_done=on_done, max_in_flight=queue_size
+            )
+            ideas_ready_seconds = time.perf_counter() - start
+            report("idea_extraction", total=chunk_timer.items)
+            report("indexing", total=len(ideas))
+            index_stage.close()
+        finally:
+            stop.set()
+        store, embeddings = index_stage.indexer.finish(ideas)
+
+        span.tag(
+            chunks=chunk_timer.items,
+            ideas=len(ideas),
+            extract_chunk_seconds=round(chunk_timer.seconds, 3),
+            ideas_ready_seconds=round(ideas_ready_seconds, 3),
+            index_seconds=round(index_stage.timer.seconds, 3),
+        )
+    logger.info(f"Streaming pipeline: {chunk_timer.items} chunks, {len(ideas)} ideas; busy time "
+                f"extract+chunk {chunk_timer.seconds:.2f}s, index {index_stage.timer.seconds:.2f}s, "
+                f"wall {time.perf_counter() - start:.2f}s")
+    return ideas, store, embeddings
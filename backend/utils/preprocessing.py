@@ -1,12 +1,10 @@
 # return list of strings
-from PyPDF2 import PdfReader
 import re
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 from multiprocessing import Pool, cpu_count
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from functools import partial
+from itertools import groupby
 import os
-import torch
 import logging
 from enum import Enum
 from dataclasses import dataclass
@@ -14,12 +12,98 @@ from .db_log import setup_logger
 from tqdm import tqdm
 from dotenv import load_dotenv
 from backend.utils.env_checker import get_environment_config
+from backend.utils.extraction_cache import ExtractionCache
+from backend.utils.chunker import StreamingChunker, SECTION_BREAKS, SEMANTIC_MARKERS
+from backend.utils.semantic_chunker import SemanticChunker
+from backend.utils import pdf_extraction, worker_pool
 # Get logger for this module
 load_dotenv()
 logger = setup_logger(__name__)
 
 ENV_CONFIG = get_environment_config()
 
+# Words that indicate the text should be a separate chunk
+SEPARATION_WORDS = [
+    'introduction', 'background', 'overview', 'summary',
+    'conclusion', 'recommendations', 'next steps',
+    'first', 'second', 'third', 'finally',
+    'in conclusion', 'to summarize', 'in summary',
+    'chapter', 'section', 'part',
+    'note:', 'important:', 'warning:',
+    'key points:', 'main points:',
+    'objectives:', 'goals:', 'aims:',
+    'methodology:', 'approach:', 'strategy:',
+    'results:', 'findings:', 'analysis:',
+    'discussion:', 'implications:', 'impact:',
+    'future work:', 'next steps:', 'recommendations:'
+]
+
+# Words that indicate reference to previous context
+COHESIVE_WORDS = [
+    # Demonstratives
+    'this', 'that', 'these', 'those',
+    # Personal pronouns
+    'he', 'him', 'his', 'she', 'her', 'hers',
+    'it', 'its', 'they', 'them', 'their', 'theirs',
+    'we', 'us', 'our', 'ours',
+    # Relative pronouns
+    'which', 'who', 'whom', 'whose',
+    # Possessive pronouns
+    'mine', 'yours', 'his', 'hers', 'its', 'ours', 'theirs',
+    # Reflexive pronouns
+    'myself', 'yourself', 'himself', 'herself', 'itself',
+    'ourselves', 'yourselves', 'themselves',
+    # Indefinite pronouns
+    'one', 'ones', 'such', 'same',
+    # Demonstrative adjectives
+    'this', 'that', 'these', 'those',
+    # Possessive adjectives
+    'my', 'your', 'his', 'her', 'its', 'our', 'their',
+    # Reference words
+    'former', 'latter', 'above', 'below', 'aforementioned',
+    'aforesaid', 'preceding', 'previous', 'prior',
+    # Temporal reference
+    'now', 'then', 'previously', 'earlier', 'before',
+    'after', 'subsequently', 'later'
+]
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Regex alternation of words with their common prefixes factored out, e.g.
+    ['the', 'them', 'then'] -> 'the(?:m|n)?'. Matching walks the word trie
+    instead of trying every word at every position.
+    """
+    trie = {}
+    for word in set(words):
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+# Both vocabularies as whole words in one pattern; the group name of a match tells them apart.
+# Phrases ending in ':' need no boundary after the colon. Every match starts with the
+# non-word character before the word (search ' ' + text), so the regex engine scans ahead
+# to the next separator instead of trying the vocabulary at every position.
+COHERENCE_PATTERN = re.compile(
+    r'\W(?:'
+    r'(?P<separation>' + _trie_pattern([w for w in SEPARATION_WORDS if not w.endswith(':')]) + r')(?!\w)'
+    r'|(?P<separation_label>' + _trie_pattern([w for w in SEPARATION_WORDS if w.endswith(':')]) + r')'
+    r'|(?P<cohesive>' + _trie_pattern(COHESIVE_WORDS) + r')(?!\w)'
+    r')'
+)
+
 class Environment(Enum):
     DEBUG = "debug"
     PRODUCTION = "production"
@@ -33,44 +117,44 @@ class ResourceConfig:
     gpu_memory_limits: Optional[List[int]] = None
 
 class Preprocessor:
+    # Hardware detection gives the same answer for every instance, so it runs once per process
+    _shared_resource_config: Optional[ResourceConfig] = None
+    _shared_devices: Optional[List[str]] = None
+
     def __init__(self):
         """Initialize the preprocessor with environment-aware configuration"""
         # Initialize logging
         self.logger = logger
         
         # Define chunking parameters from environment variables
-        print(f"Reading MIN_CHUNK from env: {os.getenv('MIN_CHUNK_SIZE')}")
-        print(f"Reading MAX_CHUNK from env: {os.getenv('MAX_CHUNK_SIZE')}")
+        self.logger.debug(f"Reading MIN_CHUNK from env: {os.getenv('MIN_CHUNK_SIZE')}")
+        self.logger.debug(f"Reading MAX_CHUNK from env: {os.getenv('MAX_CHUNK_SIZE')}")
         
         self.min_chunk_size = int(os.getenv('MIN_CHUNK_SIZE'))
         self.max_chunk_size = int(os.getenv('MAX_CHUNK_SIZE'))
         
-        # Define section break patterns
-        self.section_breaks = [
-            r'\n\s*\n',  # Double newlines
-            r'\.\s+(?=[A-Z])',  # Period followed by capital letter
-            r'[!?]\s+',  # Exclamation or question mark
-            r'\n(?=\d+\.\s)',  # Numbered lists
-            r'\n(?=[A-Z]\.\s)',  # Lettered lists
-            r'\n(?=•|\-|\*)',  # Bullet points
-        ]
+        # Define section break patterns and semantic markers
+        self.section_breaks = list(SECTION_BREAKS)
+        self.semantic_markers = list(SEMANTIC_MARKERS)
         
-        # Define semantic markers
-        self.semantic_markers = [
-            r'First,|Second,|Third,|Finally,',
-            r'In conclusion,|To summarize,|In summary,',
-            r'However,|Moreover,|Furthermore,|Additionally,',
-            r'For example,|Specifically,|In particular,',
-            r'On the other hand,|In contrast,',
-            r'Therefore,|Thus,|Hence,',
-        ]
+        # Chunking engine with the patterns compiled once
+        self.chunker = StreamingChunker(
+            self.min_chunk_size, self.max_chunk_size, self.section_breaks, self.semantic_markers
+        )
         
         # Initialize resource configuration
-        self.resource_config = self._initialize_resources()
-        self.logger.info(f"Initialized with resource config: {self.resource_config}")
+        if Preprocessor._shared_resource_config is None:
+            Preprocessor._shared_resource_config = self._initialize_resources()
+            self.logger.info(f"Initialized with resource config: {Preprocessor._shared_resource_config}")
+        self.resource_config = Preprocessor._shared_resource_config
         
         # Initialize device configuration
-        self.devices = self._initialize_devices()
+        if Preprocessor._shared_devices is None:
+            Preprocessor._shared_devices = self._initialize_devices()
+        self.devices = Preprocessor._shared_devices
+
+        # Extracted pages are cached on disk by file contents
+        self.extraction_cache = ExtractionCache()
 
     def _initialize_resources(self) -> ResourceConfig:
         """
@@ -79,6 +163,9 @@ class Preprocessor:
         env_type = Environment.DEBUG if ENV_CONFIG['debug_mode'] else Environment.PRODUCTION
         
         if env_type == Environment.PRODUCTION:
+            # torch is only needed to probe for GPUs; importing it is slow
+            import torch
+
             # In production, detect available GPUs
             num_gpus = torch.cuda.device_count() if torch.cuda.is_available() else 0
             num_cpus = cpu_count()
@@ -147,33 +234,26 @@ class Preprocessor:
         """Process PDFs using environment-appropriate resources"""
         self.logger.info(f"Processing {len(sources)} PDFs...")
         
-        # Determine optimal number of workers
-        if self.resource_config.env_type == Environment.PRODUCTION:
-            num_threads = min(len(sources), self.resource_config.num_cpus * 4, 32)
-        else:
-            num_threads = min(len(sources), 4)  # Limited threads in debug mode
-        
-        # First, use threads to read PDFs (I/O-bound)
-        with ThreadPoolExecutor(max_workers=num_threads) as thread_pool:
-            # Use tqdm to show progress of PDF processing
-            pdf_contents = list(tqdm(
-                thread_pool.map(self.process_1_pdf, sources),
-                total=len(sources),
-                desc="Processing PDFs",
-                unit="pdf"
-            ))
+        # Extract page ranges on the shared worker pool; PyPDF2 is CPU-bound,
+        # so threads would serialize on the GIL
+        num_workers = self.resource_config.num_cpus
+        pages = pdf_extraction.iter_pages(
+            sources,
+            self.extraction_cache,
+            num_workers,
+            pool_factory=lambda: worker_pool.get_pool(self.chunker, num_workers)
+        )
         
         # Flatten and prepare for processing
         text_with_sources = []
-        for source_idx, pages in enumerate(pdf_contents):
-            for page_idx, page in enumerate(pages):
-                if page['text'].strip():
-                    text_with_sources.append({
-                        'text': page['text'],
-                        'source': sources[source_idx],
-                        'title': page['title'],
-                        'page': page_idx
-                    })
+        for source_idx, page_idx, page in pages:
+            if page['text'].strip():
+                text_with_sources.append({
+                    'text': page['text'],
+                    'source': sources[source_idx],
+                    'title': page['title'],
+                    'page': page_idx
+                })
         
         if not text_with_sources:
             return []
@@ -184,56 +264,23 @@ class Preprocessor:
         )
         
         # Process in batches using available resources
+        if ENV_CONFIG['chunking_mode'] == 'semantic':
+            return self._process_semantic(text_with_sources)
         if self.resource_config.env_type == Environment.PRODUCTION and self.resource_config.num_gpus > 0:
             return self._process_with_gpu(text_with_sources, batch_size)
         else:
             return self._process_with_cpu(text_with_sources)
 
-    def _process_with_gpu(self, text_with_sources: List[Dict], batch_size: int) -> List[Dict]:
-        """Process texts using available GPUs"""
-        self.logger.info(f"Processing with {self.resource_config.num_gpus} GPUs, batch size {batch_size}")
-        
-        # Split work across available GPUs
-        chunks_per_gpu = len(text_with_sources) // self.resource_config.num_gpus
-        all_chunks = []
-        
-        with ProcessPoolExecutor(max_workers=self.resource_config.num_gpus) as executor:
-            futures = []
-            
-            # Create progress bar for GPU processing
-            with tqdm(total=len(text_with_sources), desc="GPU Processing", unit="text") as pbar:
-                for gpu_idx in range(self.resource_config.num_gpus):
-                    start_idx = gpu_idx * chunks_per_gpu
-                    end_idx = start_idx + chunks_per_gpu if gpu_idx < self.resource_config.num_gpus - 1 else len(text_with_sources)
-                    
-                    if start_idx < end_idx:
-                        future = executor.submit(
-                            self._process_batch_gpu,
-                            text_with_sources[start_idx:end_idx],
-                            f'cuda:{gpu_idx}',
-                            batch_size,
-                            end_idx - start_idx  # Pass chunk size for progress tracking
-                        )
-                        futures.append(future)
-                
-                # Collect results and update progress
-                for future in futures:
-                    chunks = future.result()
-                    all_chunks.extend(chunks)
-                    pbar.update(chunks_per_gpu)
-        
-        return all_chunks
+    def _process_semantic(self, text_with_sources: List[Dict]) -> List[Dict]:
+        """Chunk at similarity drops between sentence embeddings, on the devices from _initialize_devices"""
+        self.logger.info(f"Semantic chunking on {', '.join(self.devices)}")
+        chunker = SemanticChunker(self.min_chunk_size, self.max_chunk_size, devices=self.devices)
+        return chunker.chunk_pages(text_with_sources)
 
-    def _process_batch_gpu(self, texts: List[Dict], device: str, batch_size: int, chunk_size: int) -> List[Dict]:
-        """
-        Process a batch of texts on a specific GPU
-        """
-        chunks = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_chunks = [self._process_single_text(text) for text in batch]
-            chunks.extend([c for sublist in batch_chunks for c in sublist])
-        return chunks
+    def _process_with_gpu(self, text_with_sources: List[Dict], batch_size: int) -> List[Dict]:
+        """Regex chunking has no GPU work; use every CPU of the shared worker pool"""
+        self.logger.info(f"Processing with {self.resource_config.num_gpus} GPUs available, chunking on CPU workers")
+        return self._process_with_cpu(text_with_sources)
 
     def _process_with_cpu(self, text_with_sources: List[Dict]) -> List[Dict]:
         """Process texts using CPU resources"""
@@ -242,55 +289,12 @@ class Preprocessor:
             num_workers = min(num_workers, 4)
         
         self.logger.info(f"Processing with {num_workers} CPU workers")
-        
-        with ProcessPoolExecutor(max_workers=num_workers) as pool:
-            # Use tqdm to show progress of CPU processing
-            chunk_lists = list(tqdm(
-                pool.map(self._process_single_text, text_with_sources),
-                total=len(text_with_sources),
-                desc="Processing texts",
-                unit="text"
-            ))
-        
+        chunk_lists = worker_pool.chunk_pages(text_with_sources, self.chunker, num_workers, desc="Processing texts")
         return [chunk for sublist in chunk_lists for chunk in sublist]
 
     def process_1_pdf(self, source):
-        """Process a single PDF - this is I/O bound so we use it with ThreadPoolExecutor"""
-        text = []
-        try:
-            reader = PdfReader(source)
-            # Try to get title from PDF metadata, otherwise clean up filename
-            title = None
-            if reader.metadata and reader.metadata.get('/Title'):
-                title = reader.metadata.get('/Title')
-            if not title:
-                # Normalize path separators and get the file name
-                normalized_path = os.path.normpath(source)
-                # Split the path into components and get the last part
-                path_components = os.path.normpath(normalized_path).split(os.sep)
-                # Get the last component (filename)
-                title = path_components[-1]
-                if title.lower().endswith('.pdf'):
-                    title = title[:-4]  # Remove .pdf extension
-            
-            # Extract text from all pages
-            for page in tqdm(
-                reader.pages,
-                desc=f"Extracting text from {os.path.basename(source)}",
-                leave=False,
-                unit="page"
-            ):
-                text.append({'text': page.extract_text(), 'title': title})
-        except Exception as e:
-            self.logger.error(f"Error processing PDF {source}: {str(e)}")
-            # Even if there's an error, return with cleaned up filename as title
-            normalized_path = os.path.normpath(source)
-            path_components = normalized_path.split(os.sep)
-            title = path_components[-1]
-            if title.lower().endswith('.pdf'):
-                title = title[:-4]
-            text = [{'text': '', 'title': title}]
-        return text
+        """Extract the pages of a single PDF in this process, using the extraction cache"""
+        return [page for _, _, page in pdf_extraction.iter_pages([source], self.extraction_cache)]
 
     def _process_single_text(self, text_info: dict) -> List[Dict]:
         """
@@ -317,70 +321,76 @@ class Preprocessor:
             source = 'unknown'
             page_num = 0
             
-        # Ensure text is a string
-        text = str(text).strip()
-        if not text:  # Skip empty texts
-            return []
-        
-        # Combine all patterns for splitting
-        all_patterns = '|'.join(self.section_breaks + self.semantic_markers)
-        chunks = []
-        
-        # Clean the text
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Split by patterns
-        potential_chunks = re.split(f'({all_patterns})', text)
-        
-        current_chunk = ""
-        for i in range(0, len(potential_chunks), 2):
-            chunk = potential_chunks[i]
-            if i + 1 < len(potential_chunks):
-                chunk += potential_chunks[i + 1]
-            
-            if len(current_chunk) + len(chunk) > self.max_chunk_size and current_chunk:
-                if len(current_chunk) >= self.min_chunk_size:
-                    chunks.append({
-                        'text': current_chunk.strip(),
-                        'type': 'section',
-                        'size': len(current_chunk),
-                        'source': source,
-                        'page': page_num
-                    })
-                current_chunk = chunk
-            else:
-                current_chunk += chunk
-        
-        if current_chunk and len(current_chunk) >= self.min_chunk_size:
-            chunks.append({
-                'text': current_chunk.strip(),
-                'type': 'section',
-                'size': len(current_chunk),
-                'source': source,
-                'page': page_num
-            })
+        return self.chunker.chunk_text(text, source, page_num)
+
+    def iter_chunks(self, pages, across_pages: bool = False):
+        """Chunk a stream of pages lazily; see StreamingChunker.iter_chunks"""
+        return self.chunker.iter_chunks(pages, across_pages=across_pages)
+
+    def iter_pdf_chunks(self, sources) -> Iterator[Dict]:
+        """
+        Streaming version of process_pdfs followed by text_to_chunks.
+
+        Pages are chunked as soon as they are extracted and merged chunks are yielded
+        as soon as they are complete, so the first chunks are available while later
+        pages are still being extracted. Yields the same chunks in the same order.
+
+        In semantic mode the unit of streaming is a document rather than a page: the
+        breakpoints are a percentile of the distances over the whole document, so
+        each PDF's pages are collected before it is chunked, and its chunks are
+        yielded before the next PDF is read.
+        """
+        num_workers = self.resource_config.num_cpus
+        pages = pdf_extraction.iter_pages(
+            sources,
+            self.extraction_cache,
+            num_workers,
+            pool_factory=lambda: worker_pool.get_pool(self.chunker, num_workers)
+        )
+        page_infos = (
+            {'text': page['text'], 'source': sources[source_idx], 'title': page['title'], 'page': page_idx}
+            for source_idx, page_idx, page in pages
+            if page['text'].strip()
+        )
         
-        return chunks
+        if ENV_CONFIG['chunking_mode'] == 'semantic':
+            chunker = SemanticChunker(self.min_chunk_size, self.max_chunk_size, devices=self.devices)
+            semantic_chunks = (
+                chunk
+                for _, document in groupby(page_infos, key=lambda page_info: page_info['source'])
+                for chunk in chunker.chunk_pages(list(document))
+            )
+            return self._iter_semantic_chunks(semantic_chunks)
+        
+        # text_to_chunks chunks the chunks of process_pdfs once more before merging
+        chunks = (
+            chunk
+            for page_chunk in self.chunker.iter_chunks(page_infos)
+            for chunk in self.chunker.chunk_text(page_chunk.get('text', ''), page_chunk.get('source', 'direct_input'),
+                                                 page_chunk.get('page', 0))
+        )
+        return self._iter_merged_chunks(chunks)
 
-    def text_to_chunks(self, texts: List[str]) -> List[Dict]:
+    def text_to_chunks(self, texts: List) -> List[Dict]:
         """Convert a list of texts into meaningful chunks using multiple strategies."""
         self.logger.info(f"Converting {len(texts)} texts to chunks...")
         
-        # Convert texts to the format expected by _process_single_text
+        # Convert texts to the format expected by _process_single_text,
+        # keeping the source and page of chunks produced by process_pdfs
         text_infos = [
+            {'text': text.get('text', ''), 'source': text.get('source', 'direct_input'), 'page': text.get('page', i)}
+            if isinstance(text, dict) else
             {'text': text, 'source': 'direct_input', 'page': i}
             for i, text in enumerate(texts)
         ]
         
-        # Use process pool for CPU-intensive operations
-        with ProcessPoolExecutor(max_workers=self.resource_config.num_cpus) as pool:
-            # Use tqdm to show progress of chunk processing
-            chunk_lists = list(tqdm(
-                pool.map(self._process_single_text, text_infos),
-                total=len(text_infos),
-                desc="Creating chunks",
-                unit="text"
-            ))
+        # Semantic chunks from process_pdfs already end at topic shifts;
+        # re-chunking and merging them on keywords would undo that
+        if ENV_CONFIG['chunking_mode'] == 'semantic':
+            return list(self._iter_semantic_chunks(text_infos))
+        
+        # Use the shared process pool for CPU-intensive operations
+        chunk_lists = worker_pool.chunk_pages(text_infos, self.chunker, self.resource_config.num_cpus)
         
         # Flatten the results
         chunks = [chunk for sublist in chunk_lists for chunk in sublist]
@@ -391,49 +401,71 @@ class Preprocessor:
         
         return merged_chunks
 
+    def _iter_semantic_chunks(self, chunks: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Pass semantic chunks through in the shape of merged chunks. A chunk shorter than
+        min_chunk_size is folded into the previous chunk of the same source if it fits.
+        """
+        previous = None
+        for chunk in chunks:
+            text = chunk['text'].strip()
+            if not text:
+                continue
+            source = chunk.get('source', 'direct_input')
+            if (previous is not None and len(text) < self.min_chunk_size
+                    and source in previous['sources']
+                    and previous['size'] + 1 + len(text) <= self.max_chunk_size):
+                previous['text'] += ' ' + text
+                previous['size'] += 1 + len(text)
+                if (source, chunk.get('page', 0)) not in previous['pages']:
+                    previous['pages'].append((source, chunk.get('page', 0)))
+                continue
+            if previous is not None:
+                yield previous
+            previous = {
+                'text': text,
+                'type': 'merged_section',
+                'size': len(text),
+                'sources': [source],
+                'pages': [(source, chunk.get('page', 0))]
+            }
+        if previous is not None:
+            yield previous
+
     def _merge_chunks(self, chunks: List[Dict], pbar=None) -> List[Dict]:
         """Merge chunks while maintaining semantic coherence."""
-        merged_chunks = []
+        return list(self._iter_merged_chunks(chunks, pbar))
+
+    def _iter_merged_chunks(self, chunks: Iterable[Dict], pbar=None) -> Iterator[Dict]:
+        """Merge a stream of chunks lazily; a merged chunk is yielded as soon as the next one doesn't fit"""
         current_merged = ""
         current_metadata = {
             'sources': set(),
             'pages': set()
         }
         
+        def merged():
+            return {
+                'text': current_merged.strip(),
+                'type': 'merged_section',
+                'size': len(current_merged),
+                'sources': list(current_metadata['sources']),
+                'pages': list(current_metadata['pages'])
+            }
+        
         for chunk in chunks:
             if pbar is not None:
                 pbar.update(1)
                 
-            # Check if merging would exceed max size
-            if len(current_merged) + len(chunk['text']) <= self.max_chunk_size:
-                # Check for semantic coherence
-                if self._is_semantically_coherent(current_merged, chunk['text']):
-                    current_merged += " " + chunk['text']
-                    current_metadata['sources'].add(chunk['source'])
-                    current_metadata['pages'].add((chunk['source'], chunk['page']))
-                else:
-                    if current_merged:
-                        merged_chunks.append({
-                            'text': current_merged.strip(),
-                            'type': 'merged_section',
-                            'size': len(current_merged),
-                            'sources': list(current_metadata['sources']),
-                            'pages': list(current_metadata['pages'])
-                        })
-                    current_merged = chunk['text']
-                    current_metadata = {
-                        'sources': {chunk['source']},
-                        'pages': {(chunk['source'], chunk['page'])}
-                    }
+            # Check if merging would exceed max size and for semantic coherence
+            if (len(current_merged) + len(chunk['text']) <= self.max_chunk_size
+                    and self._is_semantically_coherent(current_merged, chunk['text'])):
+                current_merged += " " + chunk['text']
+                current_metadata['sources'].add(chunk['source'])
+                current_metadata['pages'].add((chunk['source'], chunk['page']))
             else:
                 if current_merged:
-                    merged_chunks.append({
-                        'text': current_merged.strip(),
-                        'type': 'merged_section',
-                        'size': len(current_merged),
-                        'sources': list(current_metadata['sources']),
-                        'pages': list(current_metadata['pages'])
-                    })
+                    yield merged()
                 current_merged = chunk['text']
                 current_metadata = {
                     'sources': {chunk['source']},
@@ -441,20 +473,13 @@ class Preprocessor:
                 }
         
         if current_merged:
-            merged_chunks.append({
-                'text': current_merged.strip(),
-                'type': 'merged_section',
-                'size': len(current_merged),
-                'sources': list(current_metadata['sources']),
-                'pages': list(current_metadata['pages'])
-            })
-        
-        return merged_chunks
+            yield merged()
 
     def _is_semantically_coherent(self, text1: str, text2: str) -> bool:
         """
         Check if two text chunks are semantically coherent enough to be merged.
         Returns False if text2 contains separation words, True if it contains cohesive words.
+        Words are matched whole, in one pass over text2.
         
         Args:
             text1: First text chunk
@@ -463,66 +488,14 @@ class Preprocessor:
         Returns:
             Boolean indicating if chunks are semantically coherent
         """
-        # Words that indicate the text should be a separate chunk
-        separation_words = [
-            'introduction', 'background', 'overview', 'summary',
-            'conclusion', 'recommendations', 'next steps',
-            'first', 'second', 'third', 'finally',
-            'in conclusion', 'to summarize', 'in summary',
-            'chapter', 'section', 'part',
-            'note:', 'important:', 'warning:',
-            'key points:', 'main points:',
-            'objectives:', 'goals:', 'aims:',
-            'methodology:', 'approach:', 'strategy:',
-            'results:', 'findings:', 'analysis:',
-            'discussion:', 'implications:', 'impact:',
-            'future work:', 'next steps:', 'recommendations:'
-        ]
-        
-        # Words that indicate reference to previous context
-        cohesive_words = [
-            # Demonstratives
-            'this', 'that', 'these', 'those',
-            # Personal pronouns
-            'he', 'him', 'his', 'she', 'her', 'hers',
-            'it', 'its', 'they', 'them', 'their', 'theirs',
-            'we', 'us', 'our', 'ours',
-            # Relative pronouns
-            'which', 'who', 'whom', 'whose',
-            # Possessive pronouns
-            'mine', 'yours', 'his', 'hers', 'its', 'ours', 'theirs',
-            # Reflexive pronouns
-            'myself', 'yourself', 'himself', 'herself', 'itself',
-            'ourselves', 'yourselves', 'themselves',
-            # Indefinite pronouns
-            'one', 'ones', 'such', 'same',
-            # Demonstrative adjectives
-            'this', 'that', 'these', 'those',
-            # Possessive adjectives
-            'my', 'your', 'his', 'her', 'its', 'our', 'their',
-            # Reference words
-            'former', 'latter', 'above', 'below', 'aforementioned',
-            'aforesaid', 'preceding', 'previous', 'prior',
-            # Temporal reference
-            'now', 'then', 'previously', 'earlier', 'before',
-            'after', 'subsequently', 'later'
-        ]
-        
-        # Convert text2 to lowercase for case-insensitive matching
-        text2_lower = text2.lower()
-        
-        # First check for separation words - if found, return False
-        for word in separation_words:
-            if word in text2_lower:
+        found_cohesive = False
+        for match in COHERENCE_PATTERN.finditer(' ' + text2.lower()):
+            if match.lastgroup != 'cohesive':
                 return False
-        
-        # Then check for cohesive words - if found, return True
-        for word in cohesive_words:
-            if word in text2_lower:
-                return True
+            found_cohesive = True
         
         # If no cohesive words are found, return False
-        return False
+        return found_cohesive
 
     #def pdf_to_text(self, pdf_path):
         #
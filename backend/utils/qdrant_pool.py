@@ -0,0 +1,145 @@
+# qdrant_pool.py
+# Process-wide Qdrant client
+# The client is created on first use and shared by every request. With
+# QDRANT_MODE=server it talks to the Qdrant server at QDRANT_URL over HTTP, or gRPC
+# with QDRANT_PREFER_GRPC, and the server handles concurrent requests itself.
+# Otherwise it opens the local store at QDRANT_PATH, which allows a single client
+# per directory and is not thread-safe, so calls go through a readers-writer
+# lock: searches run concurrently and updates one at a time.
+import atexit
+import functools
+from contextlib import contextmanager
+from threading import Condition, Lock
+from typing import Optional
+
+from qdrant_client import QdrantClient
+
+from .db_log import setup_logger
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# Storage of the local Qdrant instance
+QDRANT_PATH = "./qdrant_data"
+
+# QdrantClient methods that only read, and may run at the same time in local mode
+READ_METHODS = frozenset({
+    "collection_exists", "count", "get_collection", "get_collections", "query_batch_points",
+    "query_points", "recommend", "recommend_batch", "retrieve", "scroll", "search", "search_batch",
+})
+
+_client = None
+_client_lock = Lock()
+
+
+class ReadWriteLock:
+    """Any number of readers or one writer; waiting writers go before new readers"""
+
+    def __init__(self):
+        self._condition = Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class LockedQdrantClient:
+    """A QdrantClient whose calls hold a shared lock for reads and an exclusive one for updates"""
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = ReadWriteLock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        lock = self._lock.read if name in READ_METHODS else self._lock.write
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with lock():
+                return attr(*args, **kwargs)
+        return call
+
+
+def open_client(url: Optional[str] = None, path: Optional[str] = None):
+    """
+    Open a new Qdrant client; most callers want the shared one from get_client().
+
+    Args:
+        url: Qdrant server URL (defaults to QDRANT_URL with QDRANT_MODE=server); the local
+            store is used without one
+        path: Directory of the local store (defaults to QDRANT_PATH), if no URL is given
+
+    Returns:
+        QdrantClient for a server, LockedQdrantClient for the local store
+    """
+    if url is None and ENV_CONFIG['qdrant_mode'] == 'server':
+        url = ENV_CONFIG['qdrant_url']
+    if url:
+        transport = "gRPC" if ENV_CONFIG['qdrant_prefer_grpc'] else "HTTP"
+        logger.info(f"Connecting to Qdrant at {url} over {transport}")
+        return QdrantClient(
+            url=url,
+            api_key=ENV_CONFIG['qdrant_api_key'] or None,
+            prefer_grpc=ENV_CONFIG['qdrant_prefer_grpc'],
+            grpc_port=ENV_CONFIG['qdrant_grpc_port'],
+            timeout=ENV_CONFIG['qdrant_timeout']
+        )
+    path = path or QDRANT_PATH
+    logger.info(f"Initializing local Qdrant instance at {path}")
+    return LockedQdrantClient(QdrantClient(path=path))
+
+
+def get_client():
+    """Return the process-wide Qdrant client, opening it on the first call"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = open_client()
+    return _client
+
+
+def close_client() -> None:
+    """Close the process-wide client; the next get_client() opens a new one"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_client)
@@ -0,0 +1,101 @@
+# response_cache.py
+# Bounded on-disk cache of raw LLM responses
+# Entries expire after a TTL and the least recently used ones are evicted once
+# the cache grows past its size limit
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .db_log import setup_logger
+from .sqlite_cache import SQLiteCache
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# Marker returned by get() on a miss, since None is a valid cached response
+MISS = object()
+
+
+class ResponseCache(SQLiteCache):
+    """
+    SQLite-backed response store shared by threads and processes.
+
+    Every row records its size and last access time; eviction deletes the
+    least recently accessed rows until the total size fits in max_bytes.
+    """
+    schema = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "key TEXT PRIMARY KEY, "
+        "value TEXT NOT NULL, "
+        "size INTEGER NOT NULL, "
+        "created_at REAL NOT NULL, "
+        "accessed_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)",
+    )
+
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        if db_path is None:
+            db_path = ENV_CONFIG['llm_cache_path'] or str(Path(__file__).parent.parent / 'cache' / 'llm_responses.sqlite3')
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else ENV_CONFIG['llm_cache_ttl_seconds']
+        self.max_bytes = max_bytes if max_bytes is not None else ENV_CONFIG['llm_cache_max_mb'] * 1024 * 1024
+        super().__init__(db_path)
+
+    def get(self, key: str) -> Any:
+        """
+        Look up a response.
+
+        Returns:
+            The cached response, or MISS if there is no live entry
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, size FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(hit=row is not None, bytes_saved=row[1] if row is not None else 0)
+        if row is None:
+            return MISS
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Any) -> None:
+        """Store a response and evict expired and least recently used entries"""
+        value = json.dumps(response)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total)
+
+    def _evict(self, conn: sqlite3.Connection, total: int) -> None:
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} LLM responses from the cache")
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        """Hit/miss counters and response bytes served from the cache since the process started"""
+        stats = super().stats()
+        stats.setdefault("bytes_saved", 0)
+        return stats
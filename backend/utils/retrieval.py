@@ -0,0 +1,128 @@
+# retrieval.py
+# Prompt-conditioned selection of the synthesis context
+# Ideas are ranked by a fusion of dense similarity to the prompt and BM25 over
+# their main points and quotations; among ideas of (nearly) equal relevance,
+# ones from clusters not yet represented in the context come first
+import heapq
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .bm25 import BM25Index
+from .Database import Idea
+from .db_log import setup_logger
+from .vector_store import VectorStore
+from .vectorize import _as_store, embed_texts, load_bm25
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# Fused scores are compared at this precision when choosing between clusters
+TIE_DECIMALS = 2
+
+
+def _normalize(scores: Dict[str, float]) -> Dict[str, float]:
+    """Min-max scale scores to [0, 1]; equal scores all map to 1"""
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high - low <= 1e-12:
+        return {key: 1.0 for key in scores}
+    return {key: (value - low) / (high - low) for key, value in scores.items()}
+
+
+def _select_diverse(candidates: List[dict], limit: int) -> List[dict]:
+    """
+    Pick the limit best candidates by relevance score. Candidates whose scores are
+    equal at TIE_DECIMALS are ordered so that clusters not yet picked come first.
+    """
+    remaining = sorted(candidates, key=lambda candidate: -candidate["relevance_score"])
+    selected, covered = [], set()
+    while remaining and len(selected) < limit:
+        best = max(
+            range(len(remaining)),
+            key=lambda i: (round(remaining[i]["relevance_score"], TIE_DECIMALS),
+                           remaining[i]["cluster"] not in covered,
+                           remaining[i]["relevance_score"])
+        )
+        candidate = remaining.pop(best)
+        selected.append(candidate)
+        covered.add(candidate["cluster"])
+    return selected
+
+
+def retrieve_context(store: VectorStore, prompt: str, clusters: Optional[Dict[int, List[Idea]]] = None,
+                     collection_name: str = "ideas", bm25: Optional[BM25Index] = None,
+                     limit: Optional[int] = None, dense_weight: Optional[float] = None) -> List[dict]:
+    """
+    Select the ideas most relevant to a prompt.
+
+    The prompt is searched densely in the collection and with BM25 in the collection's
+    inverted index. Each side's top RETRIEVAL_CANDIDATES hits are pooled, every pooled
+    idea gets both scores, and the min-max scaled scores are combined as
+    dense_weight * dense + (1 - dense_weight) * bm25.
+
+    Args:
+        store: VectorStore of the collection (a QdrantClient is accepted too)
+        prompt: The user's question
+        clusters: Cluster ID to ideas, from cluster_ideas; used to keep the context diverse
+        collection_name: Name of the collection to search in, if store is a QdrantClient
+        bm25: BM25 index of the collection; loaded from next to the collection if not given
+        limit: Number of ideas to return (defaults to RETRIEVAL_TOP_K)
+        dense_weight: Weight of the dense score (defaults to HYBRID_DENSE_WEIGHT)
+
+    Returns:
+        Dictionaries with main_point, chunk_id, quotation_id, similarity_score (cosine
+        similarity to the prompt), relevance_score (the fused score) and cluster, best first
+    """
+    limit = limit or ENV_CONFIG['retrieval_top_k']
+    dense_weight = ENV_CONFIG['hybrid_dense_weight'] if dense_weight is None else dense_weight
+    num_candidates = max(limit, ENV_CONFIG['retrieval_candidates'])
+    store = _as_store(store, collection_name)
+    bm25 = bm25 if bm25 is not None else load_bm25(store.name)
+
+    query = embed_texts([prompt])[0]
+    dense_hits = store.search(query, num_candidates)
+    dense = {hit.id: hit.score for hit in dense_hits}
+    payloads = {hit.id: hit.payload for hit in dense_hits}
+
+    # Every idea sharing a term with the prompt has a BM25 score; only the best join the pool
+    sparse = bm25.scores(prompt)
+    sparse_top = heapq.nlargest(num_candidates, sparse, key=sparse.get)
+
+    # Ideas found only by BM25 need their payload and their dense score
+    missing = [point_id for point_id in sparse_top if point_id not in dense]
+    if missing:
+        for point in store.retrieve(missing, with_vectors=True):
+            dense[point.id] = float(point.vector @ query / (np.linalg.norm(point.vector) or 1.0))
+            payloads[point.id] = point.payload
+
+    candidate_ids = list(payloads)
+    dense_scores = _normalize({point_id: dense[point_id] for point_id in candidate_ids})
+    sparse_scores = _normalize({point_id: sparse.get(point_id, 0.0) for point_id in candidate_ids})
+
+    cluster_of = {}
+    for cluster_id, cluster_ideas in (clusters or {}).items():
+        for idea in cluster_ideas:
+            cluster_of[idea.quotation_id] = cluster_id
+
+    candidates = []
+    for point_id in candidate_ids:
+        payload = payloads[point_id]
+        candidates.append({
+            "main_point": payload["main_point"],
+            "chunk_id": payload["chunk_id"],
+            "quotation_id": payload["quotation_id"],
+            "similarity_score": dense[point_id],
+            "relevance_score": dense_weight * dense_scores[point_id]
+                               + (1.0 - dense_weight) * sparse_scores[point_id],
+            "cluster": cluster_of.get(payload["quotation_id"]),
+        })
+
+    selected = _select_diverse(candidates, limit)
+    logger.info(f"Retrieved {len(selected)} of {len(candidates)} candidate ideas "
+                f"({len(dense_hits)} dense, {len(sparse_top)} BM25) from {len({c['cluster'] for c in selected})} clusters")
+    return selected
@@ -0,0 +1,169 @@
+# semantic_chunker.py
+# Embedding-based chunking
+# Pages are split into sentences, every sentence is embedded with the shared
+# sentence transformer, and chunks end where the similarity between adjacent
+# sentences drops. Works on CPU, one GPU, or several GPUs.
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .db_log import setup_logger
+from .chunker import normalize_whitespace
+from backend.utils.env_checker import get_environment_config
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+ENV_CONFIG = get_environment_config()
+
+# A sentence ends at . ! or ? followed by whitespace and an upper-case letter or digit,
+# optionally behind an opening quote or bracket
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=["\'(\[]?[A-Z0-9])')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences after normalizing its whitespace"""
+    text = normalize_whitespace(text)
+    if not text:
+        return []
+    return _SENTENCE_END.split(text)
+
+
+class SemanticChunker:
+    """
+    Groups consecutive sentences of a document into chunks of at most
+    max_chunk_size characters. A chunk ends after a sentence whose distance
+    (1 - cosine similarity) to the next one is above the breakpoint_percentile
+    of the document's distances, once the chunk has min_chunk_size characters.
+    A sentence longer than max_chunk_size becomes a chunk of its own.
+    """
+
+    def __init__(self, min_chunk_size: int, max_chunk_size: int, devices: Optional[List[str]] = None,
+                 breakpoint_percentile: Optional[float] = None, batch_size: Optional[int] = None):
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.devices = devices or ['cpu']
+        self.breakpoint_percentile = breakpoint_percentile if breakpoint_percentile is not None \
+            else ENV_CONFIG['semantic_breakpoint_percentile']
+        self.batch_size = batch_size or ENV_CONFIG['embedding_batch_size']
+
+    def _encode(self, sentences: List[str]) -> np.ndarray:
+        """Embed sentences as unit vectors on the configured devices"""
+        # Deferred so that regex-only chunking never loads the model
+        from backend.utils.vectorize import get_model
+
+        model = get_model()
+        gpus = [device for device in self.devices if device.startswith('cuda')]
+        batch_size = self.batch_size or (256 if gpus else 64)
+
+        if len(gpus) > 1:
+            logger.info(f"Embedding {len(sentences)} sentences on {len(gpus)} GPUs, batch size {batch_size}")
+            pool = model.start_multi_process_pool(target_devices=gpus)
+            try:
+                embeddings = model.encode_multi_process(
+                    sentences, pool, batch_size=batch_size, normalize_embeddings=True
+                )
+            finally:
+                model.stop_multi_process_pool(pool)
+        else:
+            # Keep the model where it is if that is one of our devices, so the
+            # idea embeddings that follow don't pay for moving it back
+            device = str(model.device) if str(model.device) in self.devices else self.devices[0]
+            logger.info(f"Embedding {len(sentences)} sentences on {device}, batch size {batch_size}")
+            embeddings = model.encode(
+                sentences,
+                batch_size=batch_size,
+                device=device,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _breakpoints(self, embeddings: np.ndarray) -> np.ndarray:
+        """breaks[i] is True if a chunk may end after sentence i"""
+        if len(embeddings) < 2:
+            return np.zeros(max(len(embeddings) - 1, 0), dtype=bool)
+        distances = 1.0 - np.einsum('ij,ij->i', embeddings[:-1], embeddings[1:])
+        threshold = np.percentile(distances, self.breakpoint_percentile)
+        return distances > threshold
+
+    def _group(self, sentences: List[Tuple[str, int]], breaks: np.ndarray, source: str) -> List[Dict]:
+        chunks = []
+        current: List[str] = []
+        size = 0
+        page = None
+
+        def emit():
+            chunks.append({
+                'text': ' '.join(current),
+                'type': 'semantic',
+                'size': size,
+                'source': source,
+                'page': page
+            })
+
+        for i, (sentence, sentence_page) in enumerate(sentences):
+            added = len(sentence) + (1 if current else 0)
+            if current and size + added > self.max_chunk_size:
+                emit()
+                current, size = [], 0
+                added = len(sentence)
+            if not current:
+                page = sentence_page
+            current.append(sentence)
+            size += added
+            if i < len(breaks) and breaks[i] and size >= self.min_chunk_size:
+                emit()
+                current, size = [], 0
+
+        if current:
+            if size >= self.min_chunk_size:
+                emit()
+            elif chunks and chunks[-1]['size'] + 1 + size <= self.max_chunk_size:
+                # Too short to stand alone; finish the previous chunk with it
+                chunks[-1]['text'] += ' ' + ' '.join(current)
+                chunks[-1]['size'] += 1 + size
+        return chunks
+
+    def chunk_pages(self, pages: List[Dict]) -> List[Dict]:
+        """
+        Chunk pages, letting chunks continue across the pages of a document.
+
+        Args:
+            pages: Page dictionaries with 'text', 'source' and 'page', in reading order
+
+        Returns:
+            List of chunk dictionaries with text, type, size, source and page
+            (the page the chunk starts on)
+        """
+        # Sentences of consecutive pages from the same source form one document
+        documents: List[Tuple[str, List[Tuple[str, int]]]] = []
+        for index, page_info in enumerate(pages):
+            source = page_info.get('source', 'unknown')
+            page = page_info.get('page', index)
+            sentences = [(sentence, page) for sentence in split_sentences(str(page_info.get('text', '')))]
+            if not sentences:
+                continue
+            if documents and documents[-1][0] == source:
+                documents[-1][1].extend(sentences)
+            else:
+                documents.append((source, sentences))
+
+        all_sentences = [sentence for _, sentences in documents for sentence, _ in sentences]
+        if not all_sentences:
+            return []
+
+        # One encode call for the whole batch of pages keeps the device busy
+        embeddings = self._encode(all_sentences)
+
+        chunks = []
+        offset = 0
+        for source, sentences in documents:
+            document_embeddings = embeddings[offset:offset + len(sentences)]
+            offset += len(sentences)
+            chunks.extend(self._group(sentences, self._breakpoints(document_embeddings), source))
+
+        logger.info(f"Semantic chunking: {len(all_sentences)} sentences -> {len(chunks)} chunks")
+        return chunks
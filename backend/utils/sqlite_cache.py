@@ -0,0 +1,69 @@
+# sqlite_cache.py
+# Common ground of the SQLite-backed caches
+# Handles the database file, connections and the process-wide hit/miss counters;
+# subclasses define their tables and how keys and values are stored
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Sequence
+
+
+class SQLiteCache:
+    """
+    SQLite database shared by threads and processes.
+
+    A new connection is opened for every operation, and the database runs in WAL
+    mode so readers do not block the writer. Hits and misses are counted per cache
+    class, over every instance in the process.
+    """
+    # CREATE statements run when the cache is opened
+    schema: Sequence[str] = ()
+
+    _counters: Counter = Counter()
+    _stats_lock = Lock()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Each cache class counts on its own
+        cls._counters = Counter()
+        cls._stats_lock = Lock()
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.schema:
+                conn.execute(statement)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @classmethod
+    def _count(cls, hit: bool, **amounts: int) -> None:
+        """Record a lookup, and any other amounts to add up, such as bytes served"""
+        with cls._stats_lock:
+            cls._counters["hits" if hit else "misses"] += 1
+            cls._counters.update(amounts)
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        """Hit/miss counters since the process started"""
+        with cls._stats_lock:
+            counters = dict(cls._counters)
+        hits, misses = counters.pop("hits", 0), counters.pop("misses", 0)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            **counters,
+        }
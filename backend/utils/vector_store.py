@@ -0,0 +1,530 @@
+# vector_store.py
+# Storage and nearest-neighbour search of idea vectors
+# VectorStore is what indexing and retrieval talk to. InMemoryVectorStore keeps
+# the vectors in one contiguous float32 matrix and answers a search with a
+# single matrix product, which beats a local Qdrant instance for the few
+# thousand ideas of a request. QuantizedVectorStore holds int8 or binary codes
+# instead and rescores its candidates with float32 vectors kept on disk.
+# QdrantVectorStore keeps the collection in Qdrant, optionally quantized too.
+import os
+from abc import ABC, abstractmethod
+from threading import RLock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from qdrant_client.local.qdrant_local import QdrantLocal
+
+from .db_log import setup_logger
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+
+class SearchHit(NamedTuple):
+    id: str
+    score: float
+    payload: dict
+
+
+class StoredPoint(NamedTuple):
+    id: str
+    payload: dict
+    vector: Optional[np.ndarray]
+
+
+class VectorStore(ABC):
+    """A collection of points with unit-length vectors, compared by cosine similarity"""
+
+    name: str
+
+    @abstractmethod
+    def is_compatible(self, dim: int) -> bool:
+        """Whether the collection exists and holds vectors of this size"""
+
+    @abstractmethod
+    def recreate(self, dim: int) -> None:
+        """Empty the collection, or create it, for vectors of this size"""
+
+    @abstractmethod
+    def ids(self) -> Set[str]:
+        """IDs of every stored point"""
+
+    @abstractmethod
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[dict]) -> None:
+        """Insert or replace points"""
+
+    @abstractmethod
+    def set_payloads(self, payloads: Dict[str, dict]) -> None:
+        """Replace the payload of existing points"""
+
+    @abstractmethod
+    def delete(self, ids: Iterable[str]) -> None:
+        """Remove points; unknown IDs are ignored"""
+
+    @abstractmethod
+    def retrieve(self, ids: Sequence[str], with_vectors: bool = False) -> List[StoredPoint]:
+        """Fetch stored points by ID"""
+
+    @abstractmethod
+    def search(self, query: np.ndarray, limit: int) -> List[SearchHit]:
+        """The limit points most similar to the query vector, best first"""
+
+    @abstractmethod
+    def search_batch(self, queries: np.ndarray, limit: int,
+                     candidates: Optional[Sequence[Optional[Sequence[str]]]] = None) -> List[List[SearchHit]]:
+        """
+        Search several query vectors at once.
+
+        Args:
+            queries: Matrix with one query vector per row
+            limit: Number of results per query
+            candidates: Per query, the IDs of the points it may return, or None for any point
+
+        Returns:
+            The hits of each query, best first
+        """
+
+    def vectors(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Stored vectors by ID"""
+        return {point.id: point.vector for point in self.retrieve(ids, with_vectors=True)}
+
+    def __len__(self) -> int:
+        return len(self.ids())
+
+
+class InMemoryVectorStore(VectorStore):
+    """
+    Vectors in a preallocated float32 matrix, grown by doubling, with one row per point.
+    Rows are normalized on the way in, so a search is one matrix-vector product and an
+    argpartition for the top-k. Deleting a point moves the last row into its place.
+    """
+
+    quantization = "none"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.dim: Optional[int] = None
+        self._capacity = 0
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._ids: List[str] = []
+        self._payloads: List[dict] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def is_compatible(self, dim: int) -> bool:
+        return self.dim == dim
+
+    def recreate(self, dim: int) -> None:
+        with self._lock:
+            self.dim = dim
+            self._capacity = 0
+            self._clear()
+            self._ids, self._payloads, self._rows = [], [], {}
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            return set(self._ids)
+
+    def _reserve(self, rows: int) -> None:
+        if rows > self._capacity:
+            self._capacity = max(rows, 2 * self._capacity, 1024)
+            self._resize(self._capacity)
+
+    # Storage of the vectors; subclasses may keep them in another form
+
+    def _clear(self) -> None:
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+
+    def _resize(self, capacity: int) -> None:
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+        self._matrix = grown
+
+    def _write(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        self._matrix[rows] = vectors
+
+    def _move(self, source: int, target: int) -> None:
+        self._matrix[target] = self._matrix[source]
+
+    def _vector(self, row: int) -> np.ndarray:
+        return self._matrix[row].copy()
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Similarity of every stored point (rows) to every query (columns)"""
+        return self._matrix[:len(self._ids)] @ queries.T
+
+    def _rank(self, rows: np.ndarray, scores: np.ndarray, query: np.ndarray, limit: int):
+        """The limit best rows among the candidates and their final scores, best first"""
+        top = self._top(scores, limit)
+        return rows[top], scores[top]
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[dict]) -> None:
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        with self._lock:
+            if self.dim is None:
+                self.recreate(vectors.shape[1])
+            self._reserve(len(self._ids) + len(ids))
+            rows = np.empty(len(ids), dtype=np.int64)
+            for i, (point_id, payload) in enumerate(zip(ids, payloads)):
+                row = self._rows.get(point_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[point_id] = row
+                    self._ids.append(point_id)
+                    self._payloads.append(payload)
+                else:
+                    self._payloads[row] = payload
+                rows[i] = row
+            # A point repeated within the batch keeps its last vector, as with one write per point
+            rows, last = np.unique(rows[::-1], return_index=True)
+            self._write(rows, (vectors / norms)[len(ids) - 1 - last])
+
+    def set_payloads(self, payloads: Dict[str, dict]) -> None:
+        with self._lock:
+            for point_id, payload in payloads.items():
+                row = self._rows.get(point_id)
+                if row is not None:
+                    self._payloads[row] = payload
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for point_id in ids:
+                row = self._rows.pop(point_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    self._move(last, row)
+                    self._ids[row] = self._ids[last]
+                    self._payloads[row] = self._payloads[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                self._payloads.pop()
+
+    def retrieve(self, ids: Sequence[str], with_vectors: bool = False) -> List[StoredPoint]:
+        with self._lock:
+            return [
+                StoredPoint(point_id, self._payloads[row], self._vector(row) if with_vectors else None)
+                for point_id, row in ((point_id, self._rows.get(point_id)) for point_id in ids)
+                if row is not None
+            ]
+
+    @staticmethod
+    def _top(scores: np.ndarray, limit: int) -> np.ndarray:
+        """Positions of the limit highest scores, highest first"""
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            return top[np.argsort(-scores[top], kind="stable")]
+        return np.argsort(-scores, kind="stable")
+
+    def search(self, query: np.ndarray, limit: int) -> List[SearchHit]:
+        return self.search_batch(np.asarray(query, dtype=np.float32).reshape(1, -1), limit)[0]
+
+    def search_batch(self, queries: np.ndarray, limit: int,
+                     candidates: Optional[Sequence[Optional[Sequence[str]]]] = None) -> List[List[SearchHit]]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or limit <= 0:
+                return [[] for _ in range(len(queries))]
+            # One product scores every point against every query
+            scores = self._scores(queries)
+            results = []
+            for column in range(len(queries)):
+                allowed = candidates[column] if candidates is not None else None
+                if allowed is None:
+                    rows = np.arange(count)
+                else:
+                    rows = np.fromiter(dict.fromkeys(self._rows[point_id] for point_id in allowed
+                                                     if point_id in self._rows), dtype=np.int64)
+                rows, row_scores = self._rank(rows, scores[rows, column], queries[column], limit)
+                results.append([SearchHit(self._ids[row], float(score), self._payloads[row])
+                                for row, score in zip(rows, row_scores)])
+            return results
+
+    def matrix(self) -> np.ndarray:
+        """The stored unit vectors, one row per point (a view; do not modify)"""
+        return self._matrix[:len(self._ids)]
+
+    def memory_bytes(self) -> int:
+        """Bytes of RAM allocated for the vectors"""
+        return self._matrix.nbytes
+
+
+class QuantizedVectorStore(InMemoryVectorStore):
+    """
+    In-memory store that searches quantized vectors. With int8 each point keeps one
+    byte per dimension and a scale (its largest component over 127); with binary, one
+    bit per dimension, its sign. The full-precision vectors go to a memory-mapped file.
+
+    A search scores every point on its quantized vector, keeps the oversampling times
+    limit best as candidates and rescores them exactly against the file, so only the
+    candidates' vectors are read back.
+    """
+
+    # Rows decoded at a time when scoring, to bound the temporary float32 copy
+    block_rows = 1024
+
+    def __init__(self, name: str, path: str, quantization: str = "int8", oversampling: float = 4.0):
+        """
+        Args:
+            name: Name of the collection
+            path: File for the full-precision vectors; it is overwritten
+            quantization: 'int8' or 'binary'
+            oversampling: Candidates rescored per result, at least 1
+        """
+        if quantization not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization: {quantization}")
+        super().__init__(name)
+        self.path = path
+        self.quantization = quantization
+        self.oversampling = max(1.0, oversampling)
+        self._codes = np.zeros((0, 0), dtype=np.int8)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._full: Optional[np.memmap] = None
+
+    def _code_width(self) -> int:
+        return self.dim if self.quantization == "int8" else (self.dim + 7) // 8
+
+    def _clear(self) -> None:
+        self._codes = np.zeros((0, self._code_width()), dtype=np.int8 if self.quantization == "int8" else np.uint8)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._full = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        open(self.path, "wb").close()
+
+    def _resize(self, capacity: int) -> None:
+        count = len(self._ids)
+        codes = np.zeros((capacity, self._code_width()), dtype=self._codes.dtype)
+        codes[:count] = self._codes[:count]
+        self._codes = codes
+        if self.quantization == "int8":
+            scales = np.zeros(capacity, dtype=np.float32)
+            scales[:count] = self._scales[:count]
+            self._scales = scales
+        # Grow the file and map it again; rows already written stay in place
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * self.dim * np.dtype(np.float32).itemsize)
+        self._full = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _write(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        self._full[rows] = vectors
+        if self.quantization == "int8":
+            largest = np.abs(vectors).max(axis=1)
+            largest[largest == 0] = 1.0
+            self._codes[rows] = np.rint(vectors * (127.0 / largest[:, None])).astype(np.int8)
+            self._scales[rows] = largest / 127.0
+        else:
+            self._codes[rows] = np.packbits(vectors > 0, axis=1)
+
+    def _move(self, source: int, target: int) -> None:
+        self._full[target] = self._full[source]
+        self._codes[target] = self._codes[source]
+        if self.quantization == "int8":
+            self._scales[target] = self._scales[source]
+
+    def _vector(self, row: int) -> np.ndarray:
+        return np.array(self._full[row])
+
+    def _decode(self, start: int, stop: int) -> np.ndarray:
+        """Approximate vectors of a range of rows, up to the int8 scale of each row"""
+        if self.quantization == "int8":
+            return self._codes[start:stop].astype(np.float32)
+        signs = np.unpackbits(self._codes[start:stop], axis=1, count=self.dim).astype(np.float32)
+        return 2.0 * signs - 1.0
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        count = len(self._ids)
+        scores = np.empty((count, len(queries)), dtype=np.float32)
+        for start in range(0, count, self.block_rows):
+            stop = min(start + self.block_rows, count)
+            scores[start:stop] = self._decode(start, stop) @ queries.T
+        if self.quantization == "int8":
+            scores *= self._scales[:count, None]
+        return scores
+
+    def _rank(self, rows: np.ndarray, scores: np.ndarray, query: np.ndarray, limit: int):
+        shortlist = np.sort(rows[self._top(scores, int(np.ceil(limit * self.oversampling)))])
+        # Rescore the candidates with their full-precision vectors, read in file order
+        exact = self._full[shortlist] @ query
+        top = self._top(exact, limit)
+        return shortlist[top], exact[top]
+
+    def matrix(self) -> np.ndarray:
+        if self._full is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self._full[:len(self._ids)]
+
+    def memory_bytes(self) -> int:
+        return self._codes.nbytes + self._scales.nbytes
+
+
+class QdrantVectorStore(VectorStore):
+    """
+    A Qdrant collection with COSINE distance; the client is not owned by the store.
+
+    With int8 or binary quantization the collection keeps the quantized vectors in RAM
+    and the original ones on disk, and searches rescore oversampled candidates with
+    the originals.
+    """
+
+    batch_size = 100
+
+    def __init__(self, client: QdrantClient, name: str, quantization: str = "none", oversampling: float = 4.0):
+        self.client = client
+        self.name = name
+        self.quantization = quantization
+        self.oversampling = oversampling
+
+    def _quantization_config(self):
+        if self.quantization == "int8":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def _search_params(self) -> Optional[models.SearchParams]:
+        if self.quantization == "none":
+            return None
+        return models.SearchParams(quantization=models.QuantizationSearchParams(
+            rescore=True, oversampling=self.oversampling))
+
+    def is_compatible(self, dim: int) -> bool:
+        if not self.client.collection_exists(self.name):
+            return False
+        config = self.client.get_collection(self.name).config
+        quantization = config.quantization_config
+        kind = ("int8" if isinstance(quantization, models.ScalarQuantization)
+                else "binary" if isinstance(quantization, models.BinaryQuantization) else "none")
+        # The local store keeps no quantization config (it always searches exactly), so
+        # there a collection reporting none is taken as it is; a server collection with
+        # the wrong quantization is recreated
+        accepted = (self.quantization, "none") if self._is_local() else (self.quantization,)
+        return getattr(config.params.vectors, "size", None) == dim and kind in accepted
+
+    def _is_local(self) -> bool:
+        """Whether the client runs Qdrant in this process rather than talking to a server"""
+        # QdrantClient wraps its implementation in _client, and LockedQdrantClient wraps a QdrantClient
+        client = self.client
+        for _ in range(2):
+            client = getattr(client, "_client", None)
+            if isinstance(client, QdrantLocal):
+                return True
+        return False
+
+    def recreate(self, dim: int) -> None:
+        quantization_config = self._quantization_config()
+        self.client.recreate_collection(
+            collection_name=self.name,
+            vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE,
+                                               on_disk=quantization_config is not None),
+            quantization_config=quantization_config
+        )
+
+    def ids(self) -> Set[str]:
+        # Scroll through the collection without payloads or vectors
+        point_ids = set()
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.name,
+                limit=1000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            point_ids.update(str(record.id) for record in records)
+            if offset is None:
+                return point_ids
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[dict]) -> None:
+        points = [
+            models.PointStruct(id=point_id, vector=np.asarray(vector, dtype=np.float32).tolist(), payload=payload)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
+        ]
+        for i in range(0, len(points), self.batch_size):
+            self.client.upsert(collection_name=self.name, points=points[i:i + self.batch_size])
+
+    def set_payloads(self, payloads: Dict[str, dict]) -> None:
+        items = list(payloads.items())
+        for i in range(0, len(items), self.batch_size):
+            self.client.batch_update_points(
+                collection_name=self.name,
+                update_operations=[
+                    models.SetPayloadOperation(
+                        set_payload=models.SetPayload(payload=payload, points=[point_id])
+                    )
+                    for point_id, payload in items[i:i + self.batch_size]
+                ]
+            )
+
+    def delete(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if ids:
+            self.client.delete(collection_name=self.name, points_selector=models.PointIdsList(points=ids))
+
+    def retrieve(self, ids: Sequence[str], with_vectors: bool = False) -> List[StoredPoint]:
+        points = []
+        for i in range(0, len(ids), 1000):
+            records = self.client.retrieve(
+                collection_name=self.name,
+                ids=list(ids[i:i + 1000]),
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            points.extend(
+                StoredPoint(str(record.id), record.payload,
+                            np.asarray(record.vector, dtype=np.float32) if with_vectors else None)
+                for record in records
+            )
+        return points
+
+    def search(self, query: np.ndarray, limit: int) -> List[SearchHit]:
+        hits = self.client.search(
+            collection_name=self.name,
+            query_vector=np.asarray(query, dtype=np.float32).tolist(),
+            limit=limit,
+            with_payload=True,
+            search_params=self._search_params()
+        )
+        return [SearchHit(str(hit.id), float(hit.score), hit.payload) for hit in hits]
+
+    def search_batch(self, queries: np.ndarray, limit: int,
+                     candidates: Optional[Sequence[Optional[Sequence[str]]]] = None) -> List[List[SearchHit]]:
+        requests, positions = [], []
+        for i, query in enumerate(np.asarray(queries, dtype=np.float32)):
+            allowed = candidates[i] if candidates is not None else None
+            if allowed is not None and not allowed:
+                continue
+            requests.append(models.SearchRequest(
+                vector=query.tolist(),
+                limit=limit,
+                with_payload=True,
+                params=self._search_params(),
+                filter=None if allowed is None else models.Filter(
+                    must=[models.HasIdCondition(has_id=list(dict.fromkeys(allowed)))]
+                )
+            ))
+            positions.append(i)
+        results = [[] for _ in range(len(queries))]
+        if requests:
+            # All queries go to Qdrant in a single request
+            for i, hits in zip(positions, self.client.search_batch(collection_name=self.name, requests=requests)):
+                results[i] = [SearchHit(str(hit.id), float(hit.score), hit.payload) for hit in hits]
+        return results
+
+    def __len__(self) -> int:
+        return self.client.count(collection_name=self.name, exact=True).count
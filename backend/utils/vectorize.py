@@ -1,170 +1,507 @@
 # vectorize.py
 # We vectorize Ideas into embeddings and store them in a vector database
 # Sentence Transformers is used to vectorize the Ideas
-# Qdrant is used to store the embeddings
+# The embeddings are stored in a VectorStore: a matrix in memory or a Qdrant collection
+import hashlib
+import uuid
 import numpy as np
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams
 import os
-from sentence_transformers import SentenceTransformer
-from typing import List
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 from .Database import Idea
+from .bm25 import BM25Index
 from .db_log import setup_logger
+from .extraction_cache import file_digest
+from . import qdrant_pool
+from .vector_store import InMemoryVectorStore, QdrantVectorStore, QuantizedVectorStore, SearchHit, VectorStore
 from tqdm import tqdm
 from backend.utils.env_checker import get_environment_config
 
 # Get logger for this module
 logger = setup_logger(__name__)
 
-# Initialize the sentence transformer model
-logger.info("Loading sentence transformer model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
-logger.info("Model loaded successfully")
-
 ENV_CONFIG = get_environment_config()
 
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Storage of the local Qdrant instance; each collection's BM25 index, and the
+# full-precision vectors of a quantized in-memory collection, are saved under it
+QDRANT_PATH = qdrant_pool.QDRANT_PATH
+
+# The sentence transformer model is loaded on first use, once per process
+_model = None
+_model_lock = Lock()
+
+# In-memory stores by collection name, kept for the life of the process
+_memory_stores: Dict[str, InMemoryVectorStore] = {}
+# Collections moved to Qdrant after outgrowing memory; 'auto' opens them in Qdrant from then on
+_moved_to_qdrant: Set[str] = set()
+_memory_stores_lock = Lock()
+
+def get_model():
+    """
+    Return the sentence transformer model, loading it on the first call.
+    Importing sentence_transformers pulls in torch, so that import is deferred too.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                logger.info("Loading sentence transformer model...")
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+                logger.info("Model loaded successfully")
+    return _model
+
+def __getattr__(name):
+    # Keep `from backend.utils.vectorize import model` working
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def get_qdrant_client():
     """
-    Initialize Qdrant client based on environment
+    Return the Qdrant client shared by the process, see qdrant_pool
     Returns:
         client: QdrantClient instance
     """
-    from backend.api import ENV_CONFIG
-    
-    if True:#ENV_CONFIG['debug_mode']:
-        # Use local Qdrant instance in debug mode
-        logger.info("Initializing local Qdrant instance (Debug mode)")
-        client = QdrantClient(path="./qdrant_data")
-    else:
-        # Use production Qdrant instance
-        logger.info(f"Connecting to Qdrant at {ENV_CONFIG['qdrant_url']}")
-        client = QdrantClient(
-            url=ENV_CONFIG['qdrant_url'],
-            api_key=ENV_CONFIG['qdrant_api_key'] if ENV_CONFIG['qdrant_api_key'] else None
-        )
-    
-    return client
+    return qdrant_pool.get_client()
 
 def get_embedding(text: str) -> List[float]:
     """Convert text to embedding vector."""
     logger.debug(f"Generating embedding for text: {text[:50]}...")
-    return model.encode(text).tolist()
+    return get_model().encode(text).tolist()
 
-def create_vector_db(sources: List[Idea], collection_name: str = "ideas") -> QdrantClient:
+def _embedding_batch_size() -> int:
+    """Batch size for model.encode: EMBEDDING_BATCH_SIZE if set, otherwise sized for the model's device"""
+    if ENV_CONFIG['embedding_batch_size']:
+        return ENV_CONFIG['embedding_batch_size']
+    return 256 if str(get_model().device).startswith('cuda') else 64
+
+def embed_texts(texts: List[str], batch_size: int = None, normalize: bool = True) -> np.ndarray:
     """
-    Create a vector database from a list of Idea objects.
+    Convert a list of texts to embeddings in batches.
     
     Args:
-        sources: List of Idea objects
-        collection_name: Name of the collection to create
+        texts: Texts to embed
+        batch_size: Number of texts per model.encode batch (defaults to EMBEDDING_BATCH_SIZE)
+        normalize: Scale every embedding to unit length, matching the COSINE collection
         
     Returns:
-        QdrantClient instance
+        float32 matrix of shape (len(texts), embedding_dim)
     """
-    logger.info(f"Creating vector database with {len(sources)} ideas")
+    model = get_model()
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    batch_size = batch_size or _embedding_batch_size()
+    logger.info(f"Embedding {len(texts)} texts with batch size {batch_size}")
+    embeddings = model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=normalize,
+        show_progress_bar=len(texts) > batch_size
+    )
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+def bm25_path(collection_name: str) -> str:
+    """File the BM25 index of a collection is saved in"""
+    return os.path.join(QDRANT_PATH, "bm25", f"{collection_name}.json")
+
+def vectors_path(collection_name: str) -> str:
+    """File the full-precision vectors of a quantized in-memory collection are kept in"""
+    return os.path.join(QDRANT_PATH, "vectors", f"{collection_name}.f32")
+
+def load_bm25(collection_name: str = "ideas") -> BM25Index:
+    """Load the BM25 index kept alongside a collection"""
+    return BM25Index.load(bm25_path(collection_name))
+
+def _idea_document(idea: Idea) -> str:
+    """Text of an idea in the BM25 index"""
+    return f"{idea.main_point} {idea.quotation or ''}"
+
+def _source_digests(ideas: List[Idea]) -> Dict[str, str]:
+    """Map every source path referenced by the ideas to the digest of its contents"""
+    digests = {}
+    for idea in ideas:
+        for source in idea.sources:
+            if source not in digests:
+                digests[source] = file_digest(source) if os.path.isfile(source) else source
+    return digests
+
+def idea_point_id(idea: Idea, source_digests: Dict[str, str]) -> str:
+    """
+    Derive a stable point ID from an idea's content and the contents of its sources.
+    The same idea from an unchanged PDF always maps to the same point.
+    """
+    hasher = hashlib.sha256()
+    parts = [idea.main_point, idea.quotation or ""] + [source_digests.get(s, s) for s in idea.sources]
+    for part in parts:
+        hasher.update(str(part).encode("utf-8"))
+        hasher.update(b"\x1f")
+    return str(uuid.UUID(hex=hasher.hexdigest()[:32]))
+
+def _idea_payload(idea: Idea, source_digests: Dict[str, str]) -> dict:
+    return {
+        "main_point": idea.main_point,
+        "chunk_id": idea.chunk_id,
+        "quotation_id": idea.quotation_id,
+        "sources": idea.sources,
+        "source_digests": [source_digests.get(s, s) for s in idea.sources]
+    }
+
+def open_vector_store(collection_name: str = "ideas", backend: str = None) -> VectorStore:
+    """
+    Open the store of a collection.
     
-    # Initialize Qdrant client based on environment
-    client = get_qdrant_client()
+    Args:
+        collection_name: Name of the collection
+        backend: 'memory', 'qdrant' or 'auto' (defaults to VECTOR_STORE from the environment).
+            'auto' opens the in-memory store; IdeaIndexer moves it to Qdrant once it
+            holds more than VECTOR_STORE_MEMORY_LIMIT points, and it stays there.
     
-    # Create a new collection
-    logger.info(f"Creating collection: {collection_name}")
-    client.recreate_collection(
-        collection_name=collection_name,
-        vectors_config=models.VectorParams(
-            size=model.get_sentence_embedding_dimension(),
-            distance=models.Distance.COSINE
-        )
-    )
+    Returns:
+        The collection's VectorStore. In-memory stores live as long as the process,
+        so a collection indexed by one request can be updated by the next. Either kind
+        is quantized as set by VECTOR_QUANTIZATION.
+    """
+    backend = backend or ENV_CONFIG['vector_store']
+    if backend == 'qdrant' or (backend == 'auto' and collection_name in _moved_to_qdrant):
+        return _qdrant_store(get_qdrant_client(), collection_name)
+    with _memory_stores_lock:
+        if collection_name not in _memory_stores:
+            if ENV_CONFIG['vector_quantization'] == 'none':
+                store = InMemoryVectorStore(collection_name)
+            else:
+                store = QuantizedVectorStore(collection_name, vectors_path(collection_name),
+                                             ENV_CONFIG['vector_quantization'],
+                                             ENV_CONFIG['quantization_oversampling'])
+            _memory_stores[collection_name] = store
+        return _memory_stores[collection_name]
+
+def _qdrant_store(client, collection_name: str) -> QdrantVectorStore:
+    return QdrantVectorStore(client, collection_name, ENV_CONFIG['vector_quantization'],
+                             ENV_CONFIG['quantization_oversampling'])
+
+def _as_store(store, collection_name: str) -> VectorStore:
+    """Accept a Qdrant client where a VectorStore is expected"""
+    if not isinstance(store, VectorStore):
+        return _qdrant_store(store, collection_name)
+    return store
+
+def _remove_vectors_file(collection_name: str) -> None:
+    path = vectors_path(collection_name)
+    if os.path.exists(path):
+        os.remove(path)
+
+def move_to_qdrant(store: VectorStore) -> VectorStore:
+    """
+    Copy an in-memory collection into Qdrant and drop it from memory.
+    
+    Args:
+        store: The collection's store
+    
+    Returns:
+        The Qdrant store now holding the collection
+    """
+    if not isinstance(store, InMemoryVectorStore):
+        return store
+    logger.info(f"Moving collection {store.name} with {len(store)} points to Qdrant")
+    qdrant = _qdrant_store(get_qdrant_client(), store.name)
+    qdrant.recreate(store.dim)
+    point_ids = list(store.ids())
+    for i in range(0, len(point_ids), 1000):
+        points = store.retrieve(point_ids[i:i + 1000], with_vectors=True)
+        qdrant.upsert([point.id for point in points], np.stack([point.vector for point in points]),
+                      [point.payload for point in points])
+    with _memory_stores_lock:
+        if _memory_stores.get(store.name) is store:
+            del _memory_stores[store.name]
+        _moved_to_qdrant.add(store.name)
+    _remove_vectors_file(store.name)
+    return qdrant
+
+def drop_collection(collection_name: str, backend: str) -> None:
+    """
+    Delete a collection, its BM25 index and any file of full-precision vectors.
+    
+    Args:
+        collection_name: Name of the collection
+        backend: 'memory' or 'qdrant', the store holding the collection
+    """
+    if backend == 'qdrant':
+        client = get_qdrant_client()
+        if client.collection_exists(collection_name):
+            client.delete_collection(collection_name)
+    else:
+        with _memory_stores_lock:
+            _memory_stores.pop(collection_name, None)
+        _remove_vectors_file(collection_name)
+    path = bm25_path(collection_name)
+    if os.path.exists(path):
+        os.remove(path)
+
+def point_ids(ideas: List[Idea]) -> List[str]:
+    """Point IDs of the ideas, as IdeaIndexer assigns them"""
+    source_digests = _source_digests(ideas)
+    return [idea_point_id(idea, source_digests) for idea in ideas]
+
+class IdeaIndexer:
+    """
+    Index ideas in the vector store batch by batch, as they are extracted.
+    
+    In incremental mode, point IDs are derived from the content of each idea and its
+    source PDFs. Only ideas that are not yet in the collection are embedded and upserted,
+    points that no longer correspond to a current idea (e.g. their PDF was removed or
+    changed) are deleted when the indexer finishes, and the remaining points only get
+    their payload refreshed. Vectors of unchanged points are read back from the
+    collection, so every text is encoded at most once.
+    
+    A BM25 index over each idea's main point and quotation is kept in step with the
+    collection, under the same point IDs, and saved next to it by finish().
+    """
+    
+    batch_size = 100
+    
+    def __init__(self, collection_name: str = "ideas", incremental: bool = None, backend: str = None):
+        """
+        Open the collection, creating it unless it can be updated in place.
+        
+        Args:
+            collection_name: Name of the collection to index into
+            incremental: Update the collection in place instead of recreating it.
+                Defaults to VECTOR_INDEX_MODE from the environment.
+            backend: Vector store backend, see open_vector_store
+        """
+        if incremental is None:
+            incremental = ENV_CONFIG['vector_index_mode'] == 'incremental'
+        self.collection_name = collection_name
+        self.backend = backend or ENV_CONFIG['vector_store']
+        self.store = open_vector_store(collection_name, self.backend)
+        dim = get_model().get_sentence_embedding_dimension()
+        
+        if incremental and self.store.is_compatible(dim):
+            self.existing_ids = self.store.ids()
+            logger.info(f"Updating collection {collection_name} with {len(self.existing_ids)} existing points")
+            self.bm25 = load_bm25(collection_name)
+            # Drop documents whose points are gone, e.g. after an interrupted run
+            self.bm25.remove_many([doc_id for doc_id in self.bm25.doc_lengths if doc_id not in self.existing_ids])
+        else:
+            # Create a new collection
+            logger.info(f"Creating collection: {collection_name} ({type(self.store).__name__})")
+            self.store.recreate(dim)
+            self.existing_ids = set()
+            self.bm25 = BM25Index()
+        
+        self.source_digests: Dict[str, str] = {}
+        # Ideas indexed so far by point ID; identical ideas collapse onto one point
+        self.ideas: Dict[str, Idea] = {}
+        # Vectors of the points upserted by this indexer
+        self.vectors: Dict[str, np.ndarray] = {}
+    
+    def _point_id(self, idea: Idea) -> str:
+        for source in idea.sources:
+            if source not in self.source_digests:
+                self.source_digests.update(_source_digests([idea]))
+                break
+        return idea_point_id(idea, self.source_digests)
+    
+    def add(self, ideas: List[Idea]) -> None:
+        """
+        Embed and upsert the ideas that are new to the collection, and refresh
+        the payload of the ones it already holds.
+        
+        Args:
+            ideas: List of Idea objects
+        """
+        # Point IDs in first-seen order; a repeated idea keeps the payload of the last copy
+        new_ids, refresh_ids = {}, {}
+        for idea in ideas:
+            point_id = self._point_id(idea)
+            self.ideas[point_id] = idea
+            if point_id not in self.bm25:
+                self.bm25.add(point_id, _idea_document(idea))
+            # Chunk and quotation IDs are assigned per run, so points that are already
+            # stored, before this run or by an earlier add(), need a fresh payload
+            if point_id in self.existing_ids or point_id in self.vectors:
+                refresh_ids[point_id] = None
+            else:
+                new_ids[point_id] = None
+        new_ids = list(new_ids)
+        
+        self.store.set_payloads({
+            point_id: _idea_payload(self.ideas[point_id], self.source_digests)
+            for point_id in refresh_ids
+        })
+        
+        # Embed only the new ideas, in batches
+        new_embeddings = embed_texts([self.ideas[point_id].main_point for point_id in new_ids])
+        self.vectors.update(zip(new_ids, new_embeddings))
+        payloads = [_idea_payload(self.ideas[point_id], self.source_digests) for point_id in new_ids]
+        with tqdm(total=len(new_ids), desc="Uploading to vector DB", unit="point", leave=False) as pbar:
+            for i in range(0, len(new_ids), self.batch_size):
+                self.store.upsert(new_ids[i:i + self.batch_size], new_embeddings[i:i + self.batch_size],
+                                  payloads[i:i + self.batch_size])
+                pbar.update(len(new_ids[i:i + self.batch_size]))
+        
+        if self.backend == 'auto' and isinstance(self.store, InMemoryVectorStore) \
+                and len(self.store) > ENV_CONFIG['vector_store_memory_limit']:
+            self.store = move_to_qdrant(self.store)
+    
+    def finish(self, ideas: List[Idea]) -> Tuple[VectorStore, np.ndarray]:
+        """
+        Delete the points that no longer correspond to an indexed idea and collect
+        the embeddings of the given ideas.
+        
+        Args:
+            ideas: The indexed ideas, in the order the embedding rows should follow
+        
+        Returns:
+            The collection's VectorStore and a float32 matrix with one unit-length embedding per idea
+        """
+        stale_ids = [point_id for point_id in self.existing_ids if point_id not in self.ideas]
+        kept_ids = [point_id for point_id in self.ideas if point_id in self.existing_ids]
+        logger.info(f"Index delta: {len(self.vectors)} new, {len(kept_ids)} unchanged, {len(stale_ids)} stale")
+        
+        if stale_ids:
+            logger.info(f"Deleting {len(stale_ids)} stale points...")
+            self.store.delete(stale_ids)
+            self.bm25.remove_many(stale_ids)
+        try:
+            self.bm25.save(bm25_path(self.collection_name))
+        except OSError as e:
+            logger.warning(f"Could not save the BM25 index of {self.collection_name}: {e}")
+        
+        vectors = self.store.vectors(kept_ids) if kept_ids else {}
+        vectors.update(self.vectors)
+        embeddings = np.empty((len(ideas), get_model().get_sentence_embedding_dimension()), dtype=np.float32)
+        for row, idea in enumerate(ideas):
+            embeddings[row] = vectors[self._point_id(idea)]
+        
+        logger.info("Vector database creation completed successfully")
+        return self.store, embeddings
+
+def index_ideas(sources: List[Idea], collection_name: str = "ideas", incremental: bool = None,
+                backend: str = None) -> Tuple[VectorStore, np.ndarray]:
+    """
+    Index a list of Idea objects in the vector store and return their embeddings.
+    See IdeaIndexer for how an existing collection is updated.
+    
+    Args:
+        sources: List of Idea objects
+        collection_name: Name of the collection to create
+        incremental: Update the collection in place instead of recreating it.
+            Defaults to VECTOR_INDEX_MODE from the environment.
+        backend: Vector store backend, see open_vector_store
     
-    # Prepare points for insertion
+    Returns:
+        The collection's VectorStore and a float32 matrix with one unit-length embedding per idea
+    """
+    logger.info(f"Creating vector database with {len(sources)} ideas")
+    indexer = IdeaIndexer(collection_name, incremental, backend)
     logger.info("Generating embeddings for ideas...")
-    points = []
+    indexer.add(sources)
+    return indexer.finish(sources)
+
+def create_vector_db(sources: List[Idea], collection_name: str = "ideas", incremental: bool = None,
+                     backend: str = None) -> VectorStore:
+    """
+    Create a vector database from a list of Idea objects.
     
-    # Use tqdm to show progress of embedding generation
-    for i, idea in enumerate(tqdm(sources, desc="Generating embeddings", unit="idea")):
-        embedding = get_embedding(idea.main_point)
+    Args:
+        sources: List of Idea objects
+        collection_name: Name of the collection to create
+        incremental: Update the collection in place instead of recreating it
+        backend: Vector store backend, see open_vector_store
+    
+    Returns:
+        The collection's VectorStore
+    """
+    store, _ = index_ideas(sources, collection_name=collection_name, incremental=incremental, backend=backend)
+    return store
+
+def _format_hits(hits: List[SearchHit]) -> List[dict]:
+    return [
+        {
+            "main_point": hit.payload["main_point"],
+            "chunk_id": hit.payload["chunk_id"],
+            "quotation_id": hit.payload["quotation_id"],
+            "similarity_score": hit.score
+        }
+        for hit in hits
+    ]
+
+def find_similar_ideas_batch(store: VectorStore,
+                             embeddings: np.ndarray,
+                             limit: int = 1,
+                             candidates: Optional[Sequence[Optional[Sequence[str]]]] = None,
+                             collection_name: str = "ideas") -> List[List[dict]]:
+    """
+    Find the most similar ideas to each of several embedding vectors, in one search.
+    The in-memory store scores all queries with one matrix product; Qdrant receives
+    them as a single batch request.
+    
+    Args:
+        store: VectorStore of the collection (a QdrantClient is accepted too)
+        embeddings: Matrix with one query vector per row, e.g. cluster centroids
+        limit: Number of results per query
+        candidates: Per query, the point IDs it may return (see point_ids), or None for any idea
+        collection_name: Name of the collection to search in, if store is a QdrantClient
         
-        points.append(models.PointStruct(
-            id=i,
-            vector=embedding,
-            payload={
-                "main_point": idea.main_point,
-                "chunk_id": idea.chunk_id,
-                "quotation_id": idea.quotation_id
-            }
-        ))
-    
-    # Upload points in batches for better progress tracking
-    batch_size = 100
-    total_batches = (len(points) + batch_size - 1) // batch_size
-    
-    logger.info("Uploading points to Qdrant...")
-    with tqdm(total=len(points), desc="Uploading to vector DB", unit="point") as pbar:
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i + batch_size]
-            client.upsert(
-                collection_name=collection_name,
-                points=batch
-            )
-            pbar.update(len(batch))
-    
-    logger.info("Vector database creation completed successfully")
-    return client
-
-def find_similar_idea_from_embedding(client: QdrantClient, 
-                               embedding: List[float], 
-                               collection_name: str = "ideas", 
+    Returns:
+        For each query, a list of dictionaries containing the similar ideas and their metadata
+    """
+    store = _as_store(store, collection_name)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    logger.debug(f"Querying collection '{store.name}' for {limit} similar ideas to each of {len(embeddings)} vectors")
+    results = [_format_hits(hits) for hits in store.search_batch(embeddings, limit, candidates)]
+    logger.info(f"Found {sum(len(hits) for hits in results)} similar ideas for {len(embeddings)} vectors")
+    return results
+
+def find_similar_idea_from_embedding(store: VectorStore,
+                               embedding: List[float],
+                               collection_name: str = "ideas",
                                limit: int = 1) -> List[dict]:
     """
     Find the most similar ideas to a given embedding vector.
     
     Args:
-        client: QdrantClient instance
+        store: VectorStore of the collection (a QdrantClient is accepted too)
         embedding: Pre-computed embedding vector
-        collection_name: Name of the collection to search in
+        collection_name: Name of the collection to search in, if store is a QdrantClient
         limit: Number of results to return
-        
+    
     Returns:
         List of dictionaries containing the similar ideas and their metadata
     """
     logger.info("Searching for ideas similar to provided embedding...")
+    store = _as_store(store, collection_name)
     
     # Search for similar vectors
-    logger.debug(f"Querying collection '{collection_name}' for {limit} similar ideas")
+    logger.debug(f"Querying collection '{store.name}' for {limit} similar ideas")
     with tqdm(total=1, desc="Searching vector DB", leave=False) as pbar:
-        search_result = client.search(
-            collection_name=collection_name,
-            query_vector=embedding,
-            limit=limit
-        )
+        search_result = store.search(np.asarray(embedding, dtype=np.float32), limit)
         pbar.update(1)
     
     # Format results
-    results = []
-    for hit in search_result:
-        results.append({
-            "main_point": hit.payload["main_point"],
-            "chunk_id": hit.payload["chunk_id"],
-            "quotation_id": hit.payload["quotation_id"],
-            "similarity_score": hit.score
-        })
+    results = _format_hits(search_result)
     
     logger.info(f"Found {len(results)} similar ideas")
     logger.debug(f"Search results: {results}")
     
     return results
 
-def find_similar_idea(client: QdrantClient, prompt: str, collection_name: str = "ideas", limit: int = 1) -> List[dict]:
+def find_similar_idea(store: VectorStore, prompt: str, collection_name: str = "ideas", limit: int = 1) -> List[dict]:
     """
     Find the most similar ideas to a given prompt.
     
     Args:
-        client: QdrantClient instance
+        store: VectorStore of the collection (a QdrantClient is accepted too)
         prompt: Text prompt to search for
-        collection_name: Name of the collection to search in
+        collection_name: Name of the collection to search in, if store is a QdrantClient
         limit: Number of results to return
-        
+    
     Returns:
         List of dictionaries containing the similar ideas and their metadata
     """
@@ -177,7 +514,7 @@ def find_similar_idea(client: QdrantClient, prompt: str, collection_name: str =
     
     # Use the embedding-based search function
     return find_similar_idea_from_embedding(
-        client=client,
+        store=store,
         embedding=prompt_embedding,
         collection_name=collection_name,
         limit=limit
@@ -0,0 +1,164 @@
+# worker_pool.py
+# Process-wide pool for CPU-bound preprocessing
+# The pool is created on first use and reused by every request, for PDF page
+# extraction (see pdf_extraction.py) as well as chunking. Each worker
+# builds its chunker once, in the pool initializer, so a task is only the page
+# text and its metadata. Large page texts are handed over through one shared
+# memory block per batch instead of being pickled.
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from .chunker import StreamingChunker
+from .db_log import setup_logger
+
+# Get logger for this module
+logger = setup_logger(__name__)
+
+# Pages with at least this many characters go through shared memory
+SHARED_MEMORY_MIN_CHARS = 64 * 1024
+# Batches smaller than this (in characters) are chunked in-process; starting
+# tasks on the pool would cost more than the work
+INLINE_MAX_CHARS = 200_000
+# Aim for this many task batches per worker, for load balancing
+BATCHES_PER_WORKER = 4
+MAX_TASKS_PER_BATCH = 64
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[Tuple] = None
+_pool_lock = Lock()
+
+# Set in each worker process by _init_worker
+_worker_chunker: Optional[StreamingChunker] = None
+
+
+def _init_worker(min_chunk_size, max_chunk_size, section_breaks, semantic_markers):
+    global _worker_chunker
+    _worker_chunker = StreamingChunker(min_chunk_size, max_chunk_size, list(section_breaks), list(semantic_markers))
+
+
+def _read_shared_text(name: str, offset: int, length: int) -> str:
+    # Pool workers share the parent's resource tracker (see get_pool), so attaching
+    # here does not make this process responsible for the block; the parent unlinks it
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(block.buf[offset:offset + length]).decode('utf-8')
+    finally:
+        block.close()
+
+
+def _chunk_task(task: Tuple) -> List[Dict]:
+    text, source, page = task
+    if isinstance(text, tuple):
+        text = _read_shared_text(*text)
+    return _worker_chunker.chunk_text(text, source, page)
+
+
+def _shutdown() -> None:
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_key = None, None
+
+
+atexit.register(_shutdown)
+
+
+def get_pool(chunker: StreamingChunker, num_workers: int) -> ProcessPoolExecutor:
+    """
+    Return the shared pool, creating it on first use. It is recreated only when
+    the chunker configuration or the number of workers changes.
+    """
+    global _pool, _pool_key
+    key = (chunker.config(), num_workers)
+    with _pool_lock:
+        if _pool is not None and _pool_key == key:
+            return _pool
+        if _pool is not None:
+            logger.info("Worker pool configuration changed; restarting it")
+            _pool.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Starting worker pool with {num_workers} processes")
+        # Workers must inherit this process's resource tracker; one they started
+        # themselves would report the shared memory blocks they attach to as leaked
+        resource_tracker.ensure_running()
+        _pool = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                    initargs=chunker.config())
+        _pool_key = key
+        return _pool
+
+
+def reset_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so that the next get_pool call starts a new one"""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is pool:
+            _pool, _pool_key = None, None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def adaptive_chunksize(num_tasks: int, num_workers: int) -> int:
+    """Tasks per batch sent to a worker: a few batches per worker, capped to keep them balanced"""
+    return max(1, min(MAX_TASKS_PER_BATCH, num_tasks // (num_workers * BATCHES_PER_WORKER)))
+
+
+def chunk_pages(pages: List[Dict], chunker: StreamingChunker, num_workers: int,
+                desc: str = "Creating chunks") -> List[List[Dict]]:
+    """
+    Chunk pages on the shared worker pool.
+
+    Args:
+        pages: Page dictionaries with 'text', 'source' and 'page'
+        chunker: Chunker whose configuration the workers use
+        num_workers: Pool size
+        desc: Label of the progress bar
+
+    Returns:
+        One list of chunk dictionaries per page, in page order
+    """
+    tasks = [(str(page.get('text', '')), page.get('source', 'unknown'), page.get('page', i))
+             for i, page in enumerate(pages)]
+    total_chars = sum(len(text) for text, _, _ in tasks)
+    if num_workers <= 1 or total_chars < INLINE_MAX_CHARS:
+        return [chunker.chunk_text(text, source, page) for text, source, page in tqdm(tasks, desc=desc, unit="text")]
+
+    # Pack the large pages into one shared memory block
+    block = None
+    encoded = {i: task[0].encode('utf-8') for i, task in enumerate(tasks)
+               if len(task[0]) >= SHARED_MEMORY_MIN_CHARS}
+    if encoded:
+        block = shared_memory.SharedMemory(create=True, size=sum(len(data) for data in encoded.values()))
+        offset = 0
+        for i, data in encoded.items():
+            block.buf[offset:offset + len(data)] = data
+            _, source, page = tasks[i]
+            tasks[i] = ((block.name, offset, len(data)), source, page)
+            offset += len(data)
+        logger.debug(f"Passing {len(encoded)} large pages ({offset} bytes) through shared memory")
+
+    chunksize = adaptive_chunksize(len(tasks), num_workers)
+    try:
+        for attempt in range(2):
+            pool = get_pool(chunker, num_workers)
+            try:
+                return list(tqdm(
+                    pool.map(_chunk_task, tasks, chunksize=chunksize),
+                    total=len(tasks),
+                    desc=desc,
+                    unit="text"
+                ))
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool once
+                reset_pool(pool)
+                if attempt == 1:
+                    raise
+                logger.warning("Chunking worker pool broke; retrying with a new pool")
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
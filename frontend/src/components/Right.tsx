@@ -36,6 +36,7 @@ export function Right() {
   const [input, setInput] = useState("");
   const [messages, setMessages] = useState<Message[]>([]);
   const [isLoading, setIsLoading] = useState(false);
+  const [progress, setProgress] = useState("");
 
   // Handler for image upload
   const handleImageUpload = (event: React.ChangeEvent<HTMLInputElement>) => {
@@ -47,6 +48,46 @@ export function Right() {
   };
 
   const PDF_DIR = "backend/files";
+  const API_URL = "http://localhost:8000";
+
+  const STAGE_LABELS: Record<string, string> = {
+    extraction: "Extracting text",
+    chunking: "Chunking",
+    idea_extraction: "Extracting ideas",
+    indexing: "Indexing",
+    clustering: "Clustering",
+    synthesis: "Writing response",
+  };
+
+  // Follow a job's progress events until it completes or fails;
+  // pieces of the response are passed to onToken as they are generated
+  const waitForJob = (jobId: string, onToken: (text: string) => void) =>
+    new Promise<void>((resolve) => {
+      const events = new EventSource(`${API_URL}/api/jobs/${jobId}/events`);
+      const finish = () => {
+        events.close();
+        setProgress("");
+        resolve();
+      };
+      events.addEventListener("stage_started", (e) => {
+        const { stage } = JSON.parse((e as MessageEvent).data);
+        setProgress(`${STAGE_LABELS[stage] ?? stage}...`);
+      });
+      events.addEventListener("progress", (e) => {
+        const { stage, done, total } = JSON.parse((e as MessageEvent).data);
+        setProgress(`${STAGE_LABELS[stage] ?? stage}${total ? ` (${done}/${total})` : ""}...`);
+      });
+      events.addEventListener("token", (e) => {
+        const { text } = JSON.parse((e as MessageEvent).data);
+        setProgress("");
+        onToken(text);
+      });
+      events.addEventListener("status", (e) => {
+        const { status } = JSON.parse((e as MessageEvent).data);
+        if (status === "completed" || status === "failed") finish();
+      });
+      events.onerror = finish;
+    });
   
   const handleSend = async () => {
     if (!input.trim() || isLoading) return;
@@ -63,21 +104,33 @@ export function Right() {
     setIsLoading(true);
 
     try {
-      // Call backend API (adjust the URL if needed)
-      const res = await fetch("http://localhost:8000/api/generate", {
+      // Start a generate job on the backend and follow its progress
+      const jobRes = await fetch(`${API_URL}/api/jobs`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ prompt: userMessage.content, source_dir: PDF_DIR })
       });
-      console.log(res);
+      const { job_id } = await jobRes.json();
+
+      // Render the response token by token while it is being written
+      const assistantId = (Date.now() + 1).toString();
+      let streamed = "";
+      await waitForJob(job_id, (text) => {
+        streamed += text;
+        const content = streamed;
+        setMessages(prev => prev.some(m => m.id === assistantId)
+          ? prev.map(m => m.id === assistantId ? { ...m, content } : m)
+          : [...prev, { id: assistantId, content, role: 'assistant', timestamp: new Date() }]);
+      });
+      const res = await fetch(`${API_URL}/api/jobs/${job_id}/result`);
       const data = await res.json();
       const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        content: data.response || "No response from backend.",
+        id: assistantId,
+        content: data.response?.response || data.error || "No response from backend.",
         role: 'assistant',
         timestamp: new Date()
       };
-      setMessages(prev => [...prev, assistantMessage]);
+      setMessages(prev => [...prev.filter(m => m.id !== assistantId), assistantMessage]);
       // Save latest assistant message to backend for outline.txt
       try {
         await fetch('http://localhost:8000/files/outline.txt', {
@@ -98,6 +151,7 @@ export function Right() {
       ]);
     } finally {
       setIsLoading(false);
+      setProgress("");
     }
   };
 
@@ -127,6 +181,9 @@ export function Right() {
               </div>
             </div>
           ))}
+          {isLoading && progress && (
+            <p className="text-xs text-muted-foreground px-3">{progress}</p>
+          )}
         </div>
 
         {/* Unified input box */}